@@ -0,0 +1,119 @@
+"""
+Micro-benchmarks for modules/data_cleaner.py on synthetic pytrends-shaped frames.
+
+    python benchmarks/bench_data_cleaner.py                      # print timings
+    python benchmarks/bench_data_cleaner.py --save base.json     # record a baseline
+    python benchmarks/bench_data_cleaner.py --compare base.json  # exit 1 on regressions
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from modules.data_cleaner import (  # noqa: E402
+    df_reset_and_fill,
+    timeline_to_list,
+    region_to_list,
+    related_topics_to_list,
+    related_queries_to_list,
+)
+
+SIZES = (100, 1_000, 10_000, 100_000)
+TERMS = ["alpha", "beta", "gamma", "delta", "epsilon"]
+
+def make_timeline(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    # Same layout as interest_over_time(): date index, one int column per term, isPartial
+    idx = pd.date_range("2004-01-01", periods=n, freq="D", name="date")
+    df = pd.DataFrame({t: rng.integers(0, 101, n) for t in TERMS}, index=idx)
+    df["isPartial"] = False
+    return df_reset_and_fill(df)
+
+def make_region(n: int, rng: np.random.Generator) -> pd.DataFrame:
+    idx = pd.Index([f"City {i}" for i in range(n)], name="geoName")
+    df = df_reset_and_fill(pd.DataFrame({t: rng.integers(0, 101, n) for t in TERMS}, index=idx))
+    df["geoCode"] = None
+    return df
+
+def make_related(n: int, rng: np.random.Generator, topics: bool) -> Dict[str, Dict[str, pd.DataFrame]]:
+    # n rows per bucket and term, with repeated labels so dedupe has work to do
+    labels = np.array([f"label {i}" for i in range(max(n // 4, 1))])
+    out: Dict[str, Dict[str, pd.DataFrame]] = {}
+    for term in TERMS:
+        buckets = {}
+        for bucket in ("top", "rising"):
+            if topics:
+                df = pd.DataFrame(
+                    {
+                        "topic_title": rng.choice(labels, n),
+                        "topic_type": rng.choice(["Topic", "Company", "Software"], n),
+                        "value": rng.integers(0, 5000, n),
+                    }
+                )
+            else:
+                df = pd.DataFrame({"query": rng.choice(labels, n), "value": rng.integers(0, 5000, n)})
+            buckets[bucket] = df
+        out[term] = buckets
+    return out
+
+def cases(n: int) -> List[Tuple[str, Callable[[], object]]]:
+    rng = np.random.default_rng(n)
+    timeline = make_timeline(n, rng)
+    region = make_region(n, rng)
+    # related frames are capped by Google at a few dozen rows; scale them down
+    m = max(n // 100, 10)
+    topics = make_related(m, rng, topics=True)
+    queries = make_related(m, rng, topics=False)
+    value_cols = [c for c in timeline.columns if c not in ("date", "isPartial")]
+    return [
+        ("timeline_to_list", lambda: timeline_to_list(timeline, value_cols)),
+        ("region_to_list", lambda: region_to_list(region)),
+        ("related_topics_to_list", lambda: related_topics_to_list(topics)),
+        ("related_queries_to_list", lambda: related_queries_to_list(queries)),
+    ]
+
+def run(sizes: Tuple[int, ...], repeat: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    for n in sizes:
+        for name, fn in cases(n):
+            number = max(1, 10_000 // n)
+            best = min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+            results[f"{name}[{n}]"] = best
+            print(f"{name:<26} n={n:<8} {best * 1e3:10.3f} ms")
+    return results
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Benchmark data_cleaner conversions.")
+    p.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="Comma-separated row counts.")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--save", help="Write timings to this JSON file.")
+    p.add_argument("--compare", help="Baseline JSON to compare against.")
+    p.add_argument("--tolerance", type=float, default=1.25, help="Allowed slowdown ratio vs the baseline.")
+    args = p.parse_args()
+
+    sizes = tuple(int(s) for s in args.sizes.split(",") if s.strip())
+    results = run(sizes, args.repeat)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = [
+            (k, baseline[k], v) for k, v in results.items() if k in baseline and v > baseline[k] * args.tolerance
+        ]
+        for k, old, new in regressions:
+            print(f"REGRESSION {k}: {old * 1e3:.3f} ms -> {new * 1e3:.3f} ms")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
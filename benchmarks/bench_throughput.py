@@ -0,0 +1,167 @@
+"""
+End-to-end throughput benchmark of src/main.py against the local Trends
+stand-in (benchmarks/trends_standin.py). Each batch size runs in its own
+process so peak RSS is measured per run.
+
+    python benchmarks/bench_throughput.py                          # 10, 1k and 10k inputs
+    python benchmarks/bench_throughput.py --sizes 10,1000 --latency 0.05 --rate-429 0.01
+    python benchmarks/bench_throughput.py --save base.json         # record a baseline
+    python benchmarks/bench_throughput.py --compare base.json      # exit 1 on regressions
+
+Reports items/sec, p50/p99 per-input latency (from the run's metrics
+report) and peak RSS of the scraper process.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+SIZES = (10, 1_000, 10_000)
+# metric -> True when higher is better
+METRICS = {"items_per_sec": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+def start_standin(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    cmd = [
+        sys.executable,
+        str(ROOT / "benchmarks" / "trends_standin.py"),
+        "--port", "0",
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--rate-429", str(args.rate_429),
+        "--max-rate", str(args.max_rate),
+    ]
+    if args.fixtures:
+        cmd += ["--fixtures", args.fixtures]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if "http://" not in line:
+        proc.kill()
+        raise RuntimeError(f"Stand-in failed to start: {line!r}")
+    return proc, line[line.index("http://"):]
+
+def bench_settings(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    with open(ROOT / "src" / "config" / "settings.json", "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    settings.update(
+        {
+            "trends_base_url": base_url,
+            "batch_workers": args.workers,
+            "batch_log_every": 3600,
+            # measure the scraper, not our politeness towards Google
+            "rate_limit_per_minute": args.rate_limit,
+            "rate_state_file": "",
+            "sleep": 0.05,
+            "cache_enabled": False,
+            # synthetic results must not end up in the real history store
+            "store_enabled": False,
+            "metrics_enabled": True,
+            "stream_exports": args.stream,
+            "default_formats": args.formats.split(","),
+            "sections": args.sections.split(","),
+        }
+    )
+    return settings
+
+def run_size(n: int, args: argparse.Namespace, base_url: str) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory(prefix="trends-bench-") as tmp:
+        tmp_path = Path(tmp)
+        inputs = [{"input": f"bench term {i}"} for i in range(n)]
+        (tmp_path / "inputs.json").write_text(json.dumps(inputs), encoding="utf-8")
+        (tmp_path / "settings.json").write_text(json.dumps(bench_settings(args, base_url)), encoding="utf-8")
+        cmd = [
+            sys.executable,
+            str(ROOT / "src" / "main.py"),
+            "--config", str(tmp_path / "settings.json"),
+            "--input-file", str(tmp_path / "inputs.json"),
+            "--export-dir", str(tmp_path / "out"),
+            "--log-level", "WARNING",
+        ]
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(f"main.py exited with {proc.returncode} for n={n}")
+
+        report = json.loads(next((tmp_path / "out").glob("*.report.json")).read_text(encoding="utf-8"))
+        done = report["counters"].get("trends_inputs_total", {}).get("outcome=ok", 0)
+        latency = report["histograms"].get("trends_input_seconds", {}).get("total", {})
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        return {
+            "items_per_sec": done / wall if wall else 0.0,
+            "p50_ms": latency.get("p50", 0.0) * 1e3,
+            "p99_ms": latency.get("p99", 0.0) * 1e3,
+            "peak_rss_mb": rss_mb,
+            "failed": report["run"]["failed"],
+            "wall_s": wall,
+        }
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Benchmark main.py end to end against the local stand-in.")
+    p.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="Comma-separated batch sizes.")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--sections", default="timeline,subregion,city,related_topics,related_queries")
+    p.add_argument("--formats", default="json,csv")
+    p.add_argument("--stream", action="store_true", help="Use streaming exports.")
+    p.add_argument("--latency", type=float, default=0.02, help="Stand-in response latency (s).")
+    p.add_argument("--jitter", type=float, default=0.01)
+    p.add_argument("--rate-429", type=float, default=0.0)
+    p.add_argument("--max-rate", type=float, default=0.0, help="Stand-in quota in requests/minute (0 = none).")
+    p.add_argument("--rate-limit", type=float, default=0.0, help="Scraper's starting rate in requests/minute (0 = no limiter).")
+    p.add_argument("--fixtures", default="", help="Replay recorded responses from this directory.")
+    p.add_argument("--save", help="Write results to this JSON file.")
+    p.add_argument("--compare", help="Baseline JSON to compare against.")
+    p.add_argument("--tolerance", type=float, default=1.25, help="Allowed worsening ratio vs the baseline.")
+    args = p.parse_args()
+
+    sizes = tuple(int(s) for s in args.sizes.split(",") if s.strip())
+    standin, base_url = start_standin(args)
+    results: Dict[str, float] = {}
+    try:
+        for n in sizes:
+            r = run_size(n, args, base_url)
+            print(
+                f"n={n:<7} {r['items_per_sec']:9.1f} items/s  p50 {r['p50_ms']:8.1f} ms  "
+                f"p99 {r['p99_ms']:8.1f} ms  peak RSS {r['peak_rss_mb']:7.1f} MB  "
+                f"({r['wall_s']:.1f}s, {r['failed']} failed)"
+            )
+            for metric in METRICS:
+                results[f"{metric}[{n}]"] = r[metric]
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions: List[Tuple[str, float, float]] = []
+        for key, value in results.items():
+            if key not in baseline or not baseline[key]:
+                continue
+            # a zero (no successful items) is a regression, not a division by zero
+            if value == 0:
+                regressions.append((key, baseline[key], value))
+                continue
+            higher_is_better = METRICS[key.split("[", 1)[0]]
+            ratio = baseline[key] / value if higher_is_better else value / baseline[key]
+            if ratio > args.tolerance:
+                regressions.append((key, baseline[key], value))
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {old:.2f} -> {new:.2f}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+"""
+Local stand-in for the Google Trends endpoints pytrends talks to
+(explore, widgetdata/multiline, widgetdata/comparedgeo,
+widgetdata/relatedsearches), for load tests and benchmarks without Google.
+
+Responses are replayed from recorded fixtures when one matches the request
+and synthesized deterministically from the request otherwise, so any
+keyword, timeframe or resolution works. Latency, jitter and 429s can be
+injected.
+
+    python benchmarks/trends_standin.py --port 8123 --latency 0.05 --jitter 0.02 --rate-429 0.01
+    python benchmarks/trends_standin.py --port 8123 --max-rate 300   # 429 above 300 requests/minute
+    python src/main.py --base-url http://127.0.0.1:8123/trends --input "python"
+
+    # record real responses as fixtures (needs access to Google)
+    python benchmarks/trends_standin.py --port 8123 --record --fixtures benchmarks/fixtures
+
+GET /__stats returns request counts per endpoint and status as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+UPSTREAM = "https://trends.google.com"
+# pytrends strips these prefixes (trim_chars=4 for explore, 5 for widgetdata)
+EXPLORE_PREFIX = ")]}'"
+WIDGET_PREFIX = ")]}',\n"
+ENDPOINTS = ("explore", "multiline", "comparedgeo", "relatedsearches")
+
+@dataclass
+class StandinConfig:
+    latency: float = 0.0  # seconds added to every response
+    jitter: float = 0.0  # +/- uniform noise on top of latency
+    rate_429: float = 0.0  # probability of answering 429 instead
+    max_rate: float = 0.0  # requests/minute above which everything gets 429 (0 = unlimited)
+    fixtures: Optional[Path] = None
+    record: bool = False  # forward to Google and store the responses as fixtures
+    seed: int = 0
+    stats: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.seed)
+        # token bucket with a 10-second burst, like a per-client quota
+        self._allowance = self.max_rate / 6.0
+        self._updated = time.monotonic()
+
+    def count(self, endpoint: str, status: int) -> None:
+        with self._lock:
+            key = f"{endpoint} {status}"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def draw(self) -> Tuple[float, bool]:
+        """
+        (delay, throttle) for the next response.
+        """
+        with self._lock:
+            delay = max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0.0)
+            throttle = self._rng.random() < self.rate_429
+            if self.max_rate > 0:
+                now = time.monotonic()
+                per_sec = self.max_rate / 60.0
+                self._allowance = min(self._allowance + (now - self._updated) * per_sec, self.max_rate / 6.0)
+                self._updated = now
+                if self._allowance >= 1:
+                    self._allowance -= 1
+                else:
+                    throttle = True
+            return delay, throttle
+
+# -- synthetic responses ------------------------------------------------------
+
+_SPAN = re.compile(r"^(today|now)\s+(\d+)-([ymdH])$")
+_RANGE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:T\d{2})?\s+(\d{4}-\d{2}-\d{2})(?:T\d{2})?$")
+
+def _series_times(timeframe: str, now: Optional[datetime] = None) -> Tuple[List[int], bool]:
+    """
+    Point timestamps Google would return for a timeframe, and whether the
+    last point is partial. Resolution follows Google's rules of thumb:
+    minutes/hours for ``now``, days up to ~9 months, weeks up to 5 years,
+    months beyond.
+    """
+    now = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    tf = " ".join((timeframe or "today 12-m").split())
+    m = _SPAN.match(tf)
+    if m:
+        n, unit = int(m.group(2)), m.group(3)
+        span = {
+            "y": timedelta(days=365 * n),
+            "m": timedelta(days=30 * n),
+            "d": timedelta(days=n),
+            "H": timedelta(hours=n),
+        }[unit]
+        start, end, partial = now - span, now, True
+    elif tf == "all":
+        start, end, partial = datetime(2004, 1, 1, tzinfo=timezone.utc), now, True
+    else:
+        r = _RANGE.match(tf)
+        if r:
+            start = datetime.fromisoformat(r.group(1)).replace(tzinfo=timezone.utc)
+            end = datetime.fromisoformat(r.group(2)).replace(tzinfo=timezone.utc)
+        else:
+            start, end = now - timedelta(days=365), now
+        partial = end >= now - timedelta(days=1)
+    days = (end - start).total_seconds() / 86400
+    if days <= 1:
+        step = 60 * 8
+    elif days <= 7:
+        step = 3600
+    elif days <= 270:
+        step = 86400
+    elif days <= 5 * 366:
+        step = 7 * 86400
+    else:
+        step = 30 * 86400
+    t0 = int(start.timestamp()) // step * step
+    times = list(range(t0, int(end.timestamp()) + 1, step))
+    return times, partial
+
+def _rng_for(*parts: Any) -> random.Random:
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+def _keywords(items: List[Dict[str, Any]]) -> List[str]:
+    out = []
+    for it in items:
+        if "keyword" in it:
+            out.append(str(it["keyword"]))
+        else:
+            kws = it.get("complexKeywordsRestriction", {}).get("keyword", [{}])
+            out.append(str(kws[0].get("value", "")))
+    return out
+
+def synth_explore(req: Dict[str, Any], hl: str) -> Dict[str, Any]:
+    items = req.get("comparisonItem", [])
+    keywords = _keywords(items)
+    timeframe = items[0].get("time", "today 12-m") if items else "today 12-m"
+    geo = items[0].get("geo", "") if items else ""
+    geo_obj = {"country": geo} if geo else {}
+    options = {"property": req.get("property", ""), "backend": "IZG", "category": req.get("category", 0)}
+    comparison = [
+        {"geo": geo_obj, "complexKeywordsRestriction": {"keyword": [{"type": "BROAD", "value": kw}]}}
+        for kw in keywords
+    ]
+    widgets: List[Dict[str, Any]] = [
+        {
+            "id": "TIMESERIES",
+            "token": "standin-ts",
+            "request": {"time": timeframe, "resolution": "", "locale": hl, "comparisonItem": comparison, "requestOptions": options},
+        },
+        {
+            "id": "GEO_MAP",
+            "token": "standin-geo",
+            "request": {
+                "geo": geo_obj,
+                "comparisonItem": [dict(c, time=timeframe) for c in comparison],
+                # like Google: one level below the requested geo
+                "resolution": ("DMA" if "-" in geo else "REGION") if geo else "COUNTRY",
+                "locale": hl,
+                "requestOptions": options,
+            },
+        },
+    ]
+    for i, kw in enumerate(keywords):
+        suffix = f"_{i}" if len(keywords) > 1 else ""
+        for wid, kind in (("RELATED_TOPICS", "ENTITY"), ("RELATED_QUERIES", "QUERY")):
+            widgets.append(
+                {
+                    "id": wid + suffix,
+                    "token": f"standin-{kind.lower()}",
+                    "request": {
+                        "restriction": {
+                            "geo": geo_obj,
+                            "time": timeframe,
+                            "complexKeywordsRestriction": {"keyword": [{"type": "BROAD", "value": kw}]},
+                        },
+                        "keywordType": kind,
+                        "metric": ["TOP", "RISING"],
+                        "language": hl[:2],
+                        "requestOptions": options,
+                    },
+                }
+            )
+    return {"widgets": widgets}
+
+def _normalized(raw: List[List[float]]) -> List[List[int]]:
+    peak = max((v for row in raw for v in row), default=0) or 1
+    return [[int(round(v * 100 / peak)) for v in row] for row in raw]
+
+def synth_multiline(req: Dict[str, Any]) -> Dict[str, Any]:
+    keywords = _keywords(req.get("comparisonItem", []))
+    times, partial = _series_times(req.get("time", ""))
+    rng = _rng_for("multiline", keywords, req.get("time"))
+    levels = [rng.uniform(10, 100) for _ in keywords]
+    raw = [[max(lv * (1 + 0.3 * rng.uniform(-1, 1)), 0) for lv in levels] for _ in times]
+    values = _normalized(raw)
+    data = []
+    for i, (t, vals) in enumerate(zip(times, values)):
+        label = datetime.fromtimestamp(t, tz=timezone.utc).strftime("%b %d, %Y")
+        point = {
+            "time": str(t),
+            "formattedTime": label,
+            "formattedAxisTime": label,
+            "value": vals,
+            "hasData": [v > 0 for v in vals],
+            "formattedValue": [str(v) for v in vals],
+        }
+        if partial and i == len(times) - 1:
+            point["isPartial"] = True
+        data.append(point)
+    return {"default": {"timelineData": data, "averages": []}}
+
+def synth_comparedgeo(req: Dict[str, Any]) -> Dict[str, Any]:
+    keywords = _keywords(req.get("comparisonItem", []))
+    resolution = req.get("resolution", "COUNTRY")
+    country = req.get("geo", {}).get("country", "")
+    rng = _rng_for("comparedgeo", keywords, resolution, country)
+    n = {"COUNTRY": 60, "REGION": 50, "DMA": 200, "CITY": 100}.get(resolution, 50)
+    values = _normalized([[rng.uniform(0, 100) for _ in keywords] for _ in range(n)])
+    data = []
+    for i, vals in enumerate(values):
+        item: Dict[str, Any] = {
+            "geoName": f"{resolution.title()} {i:03d}",
+            "value": vals,
+            "formattedValue": [str(v) for v in vals],
+            "maxValueIndex": vals.index(max(vals)) if vals else 0,
+            "hasData": [v > 0 for v in vals],
+        }
+        if resolution == "CITY":
+            item["coordinates"] = {"lat": round(rng.uniform(-60, 70), 4), "lng": round(rng.uniform(-180, 180), 4)}
+        else:
+            item["geoCode"] = f"{country}-{i:03d}" if country else f"C{i:02d}"
+        data.append(item)
+    return {"default": {"geoMapData": data}}
+
+def synth_relatedsearches(req: Dict[str, Any]) -> Dict[str, Any]:
+    restriction = req.get("restriction", {})
+    kw = _keywords([restriction])[0] if restriction else ""
+    topics = req.get("keywordType") == "ENTITY"
+    rng = _rng_for("related", kw, topics, restriction.get("time"))
+    ranked = []
+    for bucket in ("top", "rising"):
+        items = []
+        for i in range(25 if bucket == "top" else 10):
+            value = int(rng.uniform(1, 100)) if bucket == "top" else int(rng.uniform(50, 5000))
+            if topics:
+                item = {
+                    "topic": {"mid": f"/m/{rng.getrandbits(32):08x}", "title": f"{kw} topic {i}", "type": "Topic"},
+                    "value": value,
+                    "formattedValue": str(value) if bucket == "top" else f"+{value}%",
+                    "hasData": True,
+                    "link": "/trends/explore",
+                }
+            else:
+                item = {
+                    "query": f"{kw} query {i}",
+                    "value": value,
+                    "formattedValue": str(value) if bucket == "top" else f"+{value}%",
+                    "hasData": True,
+                    "link": "/trends/explore",
+                }
+            items.append(item)
+        ranked.append({"rankedKeyword": items})
+    return {"default": {"rankedList": ranked}}
+
+SYNTH = {
+    "multiline": synth_multiline,
+    "comparedgeo": synth_comparedgeo,
+    "relatedsearches": synth_relatedsearches,
+}
+
+# -- fixtures -----------------------------------------------------------------
+
+def fixture_path(root: Path, endpoint: str, req: Dict[str, Any]) -> Path:
+    # tokens and tz change between sessions; the request itself identifies the data
+    digest = hashlib.sha1(json.dumps(req, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+    return root / endpoint / f"{digest}.txt"
+
+def record(config: StandinConfig, session: Any, path: str, query: str, method: str, endpoint: str, req: Dict[str, Any]) -> Tuple[int, str]:
+    resp = session.request(method, f"{UPSTREAM}{path}?{query}", timeout=(5, 20))
+    if resp.status_code == 200 and config.fixtures is not None:
+        out = fixture_path(config.fixtures, endpoint, req)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(resp.text, encoding="utf-8")
+    return resp.status_code, resp.text
+
+# -- server -------------------------------------------------------------------
+
+class StandinHandler(BaseHTTPRequestHandler):
+    config: StandinConfig
+    upstream: Any = None  # requests.Session in record mode
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 (BaseHTTPRequestHandler signature)
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "application/json; charset=utf-8", cookie: str = "") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        self.do_GET()
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/__stats":
+            self._send(200, json.dumps(self.config.stats, sort_keys=True))
+            return
+        # drain any request body so keep-alive connections stay usable
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if url.path.rstrip("/") == "/trends/explore":
+            endpoint = "cookie"
+        elif endpoint not in ENDPOINTS:
+            self.config.count(endpoint or "/", 404)
+            self._send(404, "not found", "text/plain")
+            return
+
+        delay, throttle = self.config.draw()
+        if delay:
+            time.sleep(delay)
+        if throttle:
+            self.config.count(endpoint, 429)
+            self._send(429, "<html>Too Many Requests</html>", "text/html")
+            return
+        if endpoint == "cookie":
+            self.config.count(endpoint, 200)
+            self._send(200, "<html></html>", "text/html", cookie="NID=standin; Path=/")
+            return
+
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            req = json.loads(qs.get("req", "{}"))
+        except ValueError:
+            self.config.count(endpoint, 400)
+            self._send(400, "bad req", "text/plain")
+            return
+        prefix = EXPLORE_PREFIX if endpoint == "explore" else WIDGET_PREFIX
+
+        status, body = 200, ""
+        if self.config.record and self.upstream is not None:
+            status, body = record(self.config, self.upstream, url.path, url.query, self.command, endpoint, req)
+        else:
+            path = fixture_path(self.config.fixtures, endpoint, req) if self.config.fixtures else None
+            if path is not None and path.exists():
+                body = path.read_text(encoding="utf-8")
+            elif endpoint == "explore":
+                body = prefix + json.dumps(synth_explore(req, qs.get("hl", "en-US")))
+            else:
+                body = prefix + json.dumps(SYNTH[endpoint](req))
+        self.config.count(endpoint, status)
+        self._send(status, body)
+
+def serve(config: StandinConfig, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+    """
+    Start the stand-in in a background thread; returns (server, thread).
+    ``server.server_address[1]`` is the bound port.
+    """
+    handler = type("Handler", (StandinHandler,), {"config": config})
+    if config.record:
+        import requests
+
+        session = requests.Session()
+        session.get(f"{UPSTREAM}/trends/explore/?geo=US", timeout=(5, 20))
+        handler.upstream = session
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="trends-standin", daemon=True)
+    thread.start()
+    return server, thread
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Local Google Trends stand-in server.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8123, help="0 picks a free port.")
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds added to each response.")
+    p.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- noise on the latency.")
+    p.add_argument("--rate-429", type=float, default=0.0, help="Probability of answering 429.")
+    p.add_argument("--max-rate", type=float, default=0.0, help="Requests/minute above which requests get 429.")
+    p.add_argument("--fixtures", default="", help="Directory of recorded responses to replay.")
+    p.add_argument("--record", action="store_true", help="Proxy to Google and save responses under --fixtures.")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    config = StandinConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        max_rate=args.max_rate,
+        fixtures=Path(args.fixtures) if args.fixtures else None,
+        record=args.record,
+        seed=args.seed,
+    )
+    server, thread = serve(config, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Trends stand-in listening on http://{host}:{port}/trends", flush=True)
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
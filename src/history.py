@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from modules.store import COLUMNS, DAY, SECTIONS, TrendStore
+from utils.config import DEFAULT_SETTINGS, load_settings
+from utils.logger import get_logger
+
+OUTPUT_FORMATS = ("table", "csv", "json", "ndjson", "parquet")
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        description="Google Trends history - query the results stored by previous runs."
+    )
+    p.add_argument("--config", help="Settings file to use instead of src/config/settings.json.", default="")
+    p.add_argument("--db", help="History store to read (default: store_path from settings.json).", default="")
+    p.add_argument("--section", choices=SECTIONS, help="Stored section to read.", default="timeline")
+    p.add_argument("--term", help="Search term.", default=None)
+    p.add_argument("--geo", help="Region code (e.g., US, US-CA); WORLD or '' for worldwide.", default=None)
+    p.add_argument("--timeframe", help="Time window the results were fetched with (e.g., 'today 12-m').", default=None)
+    p.add_argument("--gprop", help="Property the results were fetched with.", default=None)
+    p.add_argument("--category", type=int, help="Category the results were fetched with.", default=None)
+    p.add_argument("--comparison", help="Full search term set (e.g., 'python, java') the values were scaled against.", default=None)
+    p.add_argument("--mode", help="Fetch mode of the results: plain, packed, long_range or incremental.", default=None)
+    p.add_argument("--since", help="First date (YYYY-MM-DD) of timeline points or fetch days.", default="")
+    p.add_argument("--until", help="Last date (YYYY-MM-DD) of timeline points or fetch days.", default="")
+    p.add_argument("--last-days", type=int, help="Only rows written by fetches of the last N days.", default=0)
+    p.add_argument("--latest", action="store_true", help="Regions/related: only the most recent fetch day.")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format.", default="table")
+    p.add_argument("--output", "-o", help="Write to this file instead of stdout (required for parquet).", default="")
+    p.add_argument("--log-level", help="Logging level.", default="INFO")
+    return p.parse_args()
+
+def parse_day(value: str, end: bool = False) -> Optional[int]:
+    if not value:
+        return None
+    start = int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    return start + DAY - 1 if end else start
+
+def readable(df: pd.DataFrame) -> pd.DataFrame:
+    # epoch columns as dates for the terminal table
+    out = df.copy()
+    for col in ("timestamp", "fetched_at"):
+        out[col] = pd.to_datetime(out[col], unit="s", utc=True).dt.strftime("%Y-%m-%d %H:%M")
+    return out
+
+def write_output(df: pd.DataFrame, fmt: str, output: str) -> None:
+    if fmt == "parquet":
+        df.to_parquet(output, index=False)
+    elif fmt == "table":
+        text = readable(df).to_string(index=False) if not df.empty else "No stored rows match."
+        _emit(text + "\n", output)
+    elif fmt == "csv":
+        _emit(df.to_csv(index=False), output)
+    elif fmt == "json":
+        _emit(json.dumps(df.to_dict(orient="records"), ensure_ascii=False, indent=2) + "\n", output)
+    else:
+        _emit("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in df.to_dict(orient="records")), output)
+
+def _emit(text: str, output: str) -> None:
+    if output:
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+def main() -> int:
+    args = parse_args()
+    settings = load_settings(Path(args.config) if args.config else DEFAULT_SETTINGS)
+    log = get_logger("trends", level=args.log_level)
+
+    db = Path(args.db or settings.get("store_path", "data/trends.db"))
+    if not db.is_file():
+        log.error(f"History store not found: {db}")
+        return 1
+    if args.format == "parquet" and not args.output:
+        log.error("--format parquet needs --output.")
+        return 2
+    try:
+        since, until = parse_day(args.since), parse_day(args.until, end=True)
+    except ValueError as e:
+        log.error(f"Invalid date: {e}")
+        return 2
+
+    filters = {
+        "timeframe": args.timeframe,
+        "gprop": args.gprop,
+        "category": args.category,
+        "comparison": args.comparison,
+        "mode": args.mode,
+        "since": since,
+        "until": until,
+        "fetched_since": int(time.time()) - args.last_days * DAY if args.last_days > 0 else None,
+        "latest": args.latest,
+    }
+    try:
+        with TrendStore(db, readonly=True) as store:
+            rows: List[Dict[str, Any]] = list(store.query(args.section, args.term, args.geo, **filters))
+    except sqlite3.Error as e:
+        log.error(f"Cannot read the history store {db}: {e}")
+        return 1
+
+    write_output(pd.DataFrame(rows, columns=list(COLUMNS[args.section])), args.format, args.output)
+    if args.output:
+        log.info(f"Wrote {len(rows)} {args.section} rows: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,75 @@
 from __future__ import annotations
 
 import argparse
-import json
+import hashlib
+import logging
+import signal
+import sqlite3
 import sys
+import time
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 import pandas as pd
 
-from modules.trends_parser import TrendsClient, TrendsOptions
+from modules.trends_parser import TrendsClient, TrendsOptions, SECTIONS, normalize_sections
+from modules.cache import ResponseCache, DEFAULT_TTL
+from modules.batch import BatchExecutor
+from modules.ratelimit import AdaptiveRateLimiter, TokenBucket
+from modules.packing import options_key, plan_packs
+from modules.geosweep import plan_geo_sweep
+from modules.sessions import SessionPool
+from modules.checkpoint import CheckpointManifest, input_key
+from modules.incremental import HistoryStore
+from modules.dedup import SingleFlight
+from modules.service import TrendsService, make_server
+from modules.store import TrendStore
 from modules.exporter import (
-    export_json,
-    export_csv,
-    export_excel,
+    COMPRESSION_SUFFIXES,
+    TABLE_FORMATS,
+    as_dict,
+    check_compression,
     export_html,
-    export_xml,
+    export_formats,
+    ExportDataset,
+    JSONArrayWriter,
+    NDJSONWriter,
+    XMLStreamWriter,
+    CSVRowWriter,
+    ExcelRowWriter,
+    ColumnarWriter,
+    ThreadedWriter,
 )
+from utils.config import DEFAULT_SETTINGS, load_settings
 from utils.logger import get_logger
-
-def load_settings(config_path: Path) -> Dict[str, Any]:
-    if config_path.exists():
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+from utils.metrics import METRICS, ProfileCollector
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(
         description="Google Trends Scraper - extract trends by keyword, URL, region, and timeframe."
     )
     p.add_argument("--input", "-i", help="Search term or full Google Trends URL.", default="")
-    p.add_argument("--input-file", "-f", help="Path to JSON file with batch inputs.", default="")
+    p.add_argument("--input-file", "-f", help="Path to a JSON, JSONL or CSV file with batch inputs.", default="")
+    p.add_argument(
+        "--input-format",
+        choices=["json", "jsonl", "csv", "tsv"],
+        help="Format of --input-file (default: from its extension).",
+        default="",
+    )
+    p.add_argument("--config", help="Settings file to use instead of src/config/settings.json.", default="")
+    p.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="Run as a service on host:port or unix:/path.sock instead of fetching once (POST /fetch).",
+        default="",
+    )
+    p.add_argument(
+        "--base-url",
+        help="Send requests to this Trends base URL instead of Google's (e.g. a local stand-in server).",
+        default="",
+    )
     p.add_argument("--geo", help="Region code (e.g., US, PK).", default="")
     p.add_argument("--timeframe", help="Time window (e.g., 'now 7-d', 'today 12-m', '2024-01-01 2024-12-31').", default="")
     p.add_argument("--hl", help="Language code (e.g., en-US).", default="")
@@ -39,11 +78,76 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--category", type=int, help="Google Trends category (int).", default=0)
     p.add_argument(
         "--formats",
-        help="Comma-separated export formats (json,csv,excel,xml,html).",
+        help="Comma-separated export formats (json,csv,excel,xml,html,parquet,arrow), or 'none' to only fill the store.",
         default="",
     )
+    p.add_argument(
+        "--sections",
+        help=f"Comma-separated sections to fetch ({','.join(SECTIONS)}). Default: all.",
+        default="",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each result as it is fetched (JSON becomes NDJSON, CSV/XML are appended).",
+    )
+    p.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted --input-file run, skipping inputs already fetched.",
+    )
     p.add_argument("--export-dir", help="Output directory (default from settings.json).", default="")
+    p.add_argument(
+        "--compress",
+        choices=sorted(COMPRESSION_SUFFIXES),
+        help="Compress the JSON/NDJSON and CSV exports (default from settings.json).",
+        default="",
+    )
     p.add_argument("--log-level", help="Logging level.", default="INFO")
+    p.add_argument("--workers", type=int, help="Concurrent fetch workers (default from settings.json).", default=0)
+    p.add_argument(
+        "--section-workers",
+        type=int,
+        help="Concurrent section requests per input (default from settings.json; 0 = all sections for --input, 1 for batches).",
+        default=-1,
+    )
+    p.add_argument(
+        "--pack",
+        action="store_true",
+        help="Fetch up to 5 inputs with identical options per request and split the results.",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Refresh timelines against the stored history, fetching only a short recent window.",
+    )
+    p.add_argument(
+        "--long-range",
+        action="store_true",
+        help="Fetch date ranges longer than ~9 months as stitched daily windows.",
+    )
+    p.add_argument("--pack-anchor", help="Anchor keyword added to every packed request.", default="")
+    p.add_argument(
+        "--geo-sweep",
+        metavar="GEOS",
+        help=(
+            "Fetch --input for each of these comma-separated geos (e.g. US-CA,US-NY or US-* for every US state); "
+            "per-geo interest comes from one region request per parent geo, other sections only if --sections is given."
+        ),
+        default="",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk response cache.")
+    p.add_argument("--no-store", action="store_true", help="Do not write results into the history store.")
+    p.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile fetching and export with cProfile (single worker); stats are written next to the exports.",
+    )
+    p.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached responses but store the freshly fetched ones.",
+    )
     return p.parse_args()
 
 def build_options(args: argparse.Namespace, defaults: Dict[str, Any]) -> TrendsOptions:
@@ -57,21 +161,227 @@ def build_options(args: argparse.Namespace, defaults: Dict[str, Any]) -> TrendsO
         sleep=float(defaults.get("sleep", 1.0)),
     )
 
+def build_cache(args: argparse.Namespace, settings: Dict[str, Any]) -> Optional[ResponseCache]:
+    if args.no_cache or not settings.get("cache_enabled", True):
+        return None
+    ttl = dict(DEFAULT_TTL)
+    ttl.update({k: int(v) for k, v in (settings.get("cache_ttl") or {}).items()})
+    return ResponseCache(
+        root=Path(settings.get("cache_dir", "data/cache")),
+        max_bytes=int(float(settings.get("cache_max_mb", 256)) * 1024 * 1024),
+        ttl=ttl,
+        refresh=args.refresh_cache,
+    )
+
+def batch_run_id(args: argparse.Namespace, settings: Dict[str, Any], opts: TrendsOptions, sections: List[str]) -> str:
+    """
+    Checkpoint id of a batch run: the input file plus everything that
+    changes what is fetched for it, so --resume never continues a run made
+    with another fetch mode or other options.
+    """
+    packed = bool(args.pack or settings.get("pack_keywords", False)) and not (args.incremental or args.long_range)
+    mode = "incremental" if args.incremental else "long_range" if args.long_range else "packed" if packed else "plain"
+    parts = [str(Path(args.input_file).resolve()), ",".join(sections), mode, repr(options_key(opts))]
+    if packed:
+        parts.append(args.pack_anchor or settings.get("pack_anchor", ""))
+    elif args.long_range:
+        parts += [str(settings.get("long_range_window_days", 250)), str(settings.get("long_range_overlap_days", 30))]
+    elif args.incremental:
+        parts += [str(settings.get("incremental_overlap_points", 4)), str(settings.get("incremental_drift_threshold", 0.15))]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+def build_store(args: argparse.Namespace, settings: Dict[str, Any]) -> Optional[TrendStore]:
+    if args.no_store or not settings.get("store_enabled", False):
+        return None
+    return TrendStore(
+        Path(settings.get("store_path", "data/trends.db")),
+        commit_every=int(settings.get("store_commit_every", 50)),
+    )
+
+def section_workers(args: argparse.Namespace, settings: Dict[str, Any], n_sections: int) -> int:
+    if args.profile:
+        # cProfile only records the thread that enabled it
+        return 1
+    workers = args.section_workers if args.section_workers >= 0 else int(settings.get("section_workers", 0))
+    if workers > 0:
+        return workers
+    # auto: a single lookup waits on its sections, a batch already runs inputs in parallel
+    return n_sections if args.serve or (args.input and not args.input_file and not args.geo_sweep) else 1
+
+def build_limiter(settings: Dict[str, Any], log: logging.Logger) -> Optional[TokenBucket]:
+    per_minute = float(settings.get("rate_limit_per_minute", 0) or 0)
+    if per_minute <= 0:
+        return None
+    burst = int(settings.get("rate_limit_burst", 1))
+    if not settings.get("rate_adaptive", False):
+        return TokenBucket.per_minute(per_minute, burst=burst)
+    limiter = AdaptiveRateLimiter.per_minute(
+        per_minute,
+        burst=burst,
+        min_rate=float(settings.get("rate_min_per_minute", 6)),
+        max_rate=float(settings.get("rate_max_per_minute", 240)),
+        increase=float(settings.get("rate_increase_per_success", 1)),
+        decrease=float(settings.get("rate_decrease_factor", 0.5)),
+        breaker_errors=int(settings.get("breaker_errors", 5)),
+        breaker_window=float(settings.get("breaker_window", 60)),
+        cooldown=float(settings.get("breaker_cooldown", 60)),
+    )
+    state = settings.get("rate_state_file", "")
+    if state and limiter.load(state):
+        log.info(f"Rate limit: resuming at the learned {limiter.rate_per_minute:.1f}/min")
+    return limiter
+
 def decide_formats(args: argparse.Namespace, defaults: Dict[str, Any]) -> List[str]:
     if args.formats:
-        return [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
-    return [f.lower() for f in defaults.get("default_formats", ["json", "csv"])]
+        formats = [fmt.strip().lower() for fmt in args.formats.split(",") if fmt.strip()]
+    else:
+        formats = [f.lower() for f in defaults.get("default_formats", ["json", "csv"])]
+    # "none": results only go to the history store
+    return [f for f in formats if f != "none"]
 
-def main() -> int:
-    root = Path(__file__).resolve().parents[1]
-    config_path = root / "src" / "config" / "settings.json"
-    settings = load_settings(config_path)
+# Export labels used in log lines.
+FORMAT_LABELS = {
+    "json": "JSON",
+    "csv": "CSV",
+    "excel": "Excel",
+    "html": "HTML",
+    "xml": "XML",
+    "parquet": "Parquet dataset",
+    "arrow": "Arrow dataset",
+}
+
+def export_all(
+    payloads: List[Dict[str, Any]], formats: List[str], base: Path, log: logging.Logger, compression: str = "", processes: bool = True
+) -> None:
+    # materialized once (payloads plus the summary table for CSV/Excel/HTML), then
+    # every format is written concurrently from it
+    dataset = ExportDataset([as_dict(p) for p in payloads], TrendsClient.to_rows_for_tabular(payloads))
+    if dataset.table.empty and set(TABLE_FORMATS) & set(formats):
+        log.warning("No tabular data available for CSV/Excel/HTML export.")
+    for fmt, out in export_formats(dataset, formats, base, compression=compression, processes=processes).items():
+        log.info(f"Wrote {FORMAT_LABELS[fmt]}: {out}")
+
+def write_metrics(base: Path, log: logging.Logger, summary: Dict[str, Any]) -> None:
+    """
+    Prometheus textfile and JSON run report next to the exports.
+    """
+    prom = METRICS.write_textfile(f"{base}.metrics.prom")
+    report = METRICS.write_report(f"{base}.report.json", extra={"run": summary})
+    log.info(f"Wrote metrics: {prom}, {report}")
+
+class StreamExport:
+    """
+    Write each payload as soon as it is fetched: JSON as NDJSON, XML through
+    an incremental writer and the summary CSV row by row. Only the small
+    summary rows are kept, and only when Excel/HTML need them at the end.
+    With ``json_array`` the JSON export is the regular indented array
+    (used to export a finished batch from its checkpoint). Excel rows are
+    streamed too; only HTML needs the rows kept until the end. With
+    ``concurrent`` every format is written on its own thread
+    (ThreadedWriter) from the single pass over the payloads.
+    """
+
+    def __init__(
+        self,
+        base: Path,
+        formats: List[str],
+        log: logging.Logger,
+        json_array: bool = False,
+        compression: str = "",
+        concurrent: bool = False,
+    ) -> None:
+        self.base = base
+        self.formats = formats
+        self.log = log
+        self.concurrent = concurrent
+        # (log label, output path, writer)
+        self.writers: List[Tuple[str, Path, Any]] = []
+        self.row_writers: List[Tuple[str, Path, Any]] = []
+        if "json" in formats:
+            if json_array:
+                self._add(self.writers, "JSON", JSONArrayWriter(f"{base}.json", compression))
+            else:
+                self._add(self.writers, "NDJSON", NDJSONWriter(f"{base}.ndjson", compression))
+        if "xml" in formats:
+            self._add(self.writers, "XML", XMLStreamWriter(f"{base}.xml"))
+        for fmt in ("parquet", "arrow"):
+            if fmt in formats:
+                self._add(self.writers, FORMAT_LABELS[fmt], ColumnarWriter(base.parent / fmt, fmt=fmt))
+        if "csv" in formats:
+            self._add(self.row_writers, "CSV", CSVRowWriter(f"{base}.csv", compression))
+        if "excel" in formats:
+            self._add(self.row_writers, "Excel", ExcelRowWriter(f"{base}.xlsx"))
+        self.rows: Optional[List[Dict[str, Any]]] = [] if "html" in formats else None
+
+    def _add(self, target: List[Tuple[str, Path, Any]], label: str, writer: Any) -> None:
+        target.append((label, writer.path, ThreadedWriter(writer) if self.concurrent else writer))
+
+    def write(self, payload: Dict[str, Any]) -> None:
+        for _, _, w in self.writers:
+            w.write(payload)
+        if self.row_writers or self.rows is not None:
+            row = TrendsClient.summary_row(payload)
+            for _, _, w in self.row_writers:
+                w.write(row)
+            if self.rows is not None:
+                self.rows.append(row)
 
+    def close(self) -> None:
+        for label, path, w in self.writers + self.row_writers:
+            w.close()
+            self.log.info(f"Wrote {label}: {path}")
+
+    def finish(self) -> None:
+        if not self.rows:
+            return
+        out = export_html(pd.DataFrame(self.rows), f"{self.base}.html")
+        self.log.info(f"Wrote HTML: {out}")
+
+def serve(address: str, settings: Dict[str, Any], client: TrendsClient, limiter: Any, log: logging.Logger) -> int:
+    """
+    Serve TrendsClient.fetch over HTTP until interrupted (SIGINT/SIGTERM),
+    keeping sessions, cache and rate state warm between requests.
+    """
+    service = TrendsService(
+        client,
+        workers=int(settings.get("service_workers", 4)),
+        queue_size=int(settings.get("service_queue_size", 64)),
+        timeout=float(settings.get("service_timeout", 120)),
+    )
+    try:
+        server, url = make_server(service, address)
+    except (OSError, ValueError) as e:
+        log.error(f"Cannot listen on {address}: {e}")
+        return 2
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    service.warm()
+    service.start()
+    log.info(f"Serving on {url} ({service.workers} workers, queue of {settings.get('service_queue_size', 64)}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Shutting down.")
+    finally:
+        server.server_close()
+        service.stop()
+        client.pool.close()
+        if isinstance(limiter, AdaptiveRateLimiter) and settings.get("rate_state_file"):
+            limiter.save(settings["rate_state_file"])
+        if address.startswith("unix:"):
+            Path(address[len("unix:"):]).unlink(missing_ok=True)
+    return 0
+
+def main() -> int:
     args = parse_args()
+    settings = load_settings(Path(args.config) if args.config else DEFAULT_SETTINGS)
     log = get_logger("trends", level=args.log_level)
 
-    if not args.input and not args.input_file:
-        log.error("Please provide --input or --input-file.")
+    if not args.input and not args.input_file and not args.serve:
+        log.error("Please provide --input, --input-file or --serve.")
         return 2
 
     export_dir = Path(args.export_dir or settings.get("export_dir", "data/exports"))
@@ -79,54 +389,357 @@ def main() -> int:
 
     opts = build_options(args, settings)
     formats = decide_formats(args, settings)
+    compression = args.compress or settings.get("export_compression", "")
+    try:
+        check_compression(compression)
+    except (ValueError, ImportError) as e:
+        log.error(str(e))
+        return 2
+    try:
+        sections = normalize_sections(args.sections.split(",") if args.sections else settings.get("sections"))
+    except ValueError as e:
+        log.error(str(e))
+        return 2
+
+    cache = build_cache(args, settings)
+    limiter = build_limiter(settings, log)
+    adaptive = isinstance(limiter, AdaptiveRateLimiter)
+    pool = SessionPool(
+        max_uses=int(settings.get("session_max_uses", 200)),
+        max_age=float(settings.get("session_max_age", 1800)),
+        backoff_factor=opts.sleep,
+        base_url=args.base_url or settings.get("trends_base_url", ""),
+        feedback=limiter.feedback if adaptive else None,
+        retry_throttled=not adaptive,
+    )
+    client = TrendsClient(
+        opts=opts,
+        cache=cache,
+        limiter=limiter,
+        pool=pool,
+        proxy=settings.get("proxy", ""),
+        sections=sections,
+        history=HistoryStore(Path(settings.get("history_dir", "data/history"))) if args.incremental else None,
+        # a service outlives any batch: only collapse calls in flight, never keep results
+        flights=SingleFlight(0 if args.serve else int(settings.get("dedup_keep", 256))) if settings.get("dedup_requests", True) else None,
+        throttle_retries=int(settings.get("throttle_retries", 3)) if adaptive else 0,
+        section_workers=section_workers(args, settings, len(sections)),
+    )
+    METRICS.enabled = bool(settings.get("metrics_enabled", True))
+
+    if args.serve:
+        return serve(args.serve, settings, client, limiter, log)
+
+    # geo sweep targets by geo, planned from the parent breakdowns up front
+    sweep: Dict[str, Any] = {}
+    sweep_sections: Tuple[str, ...] = ()
+    if args.geo_sweep:
+        if args.input_file or not args.input:
+            log.error("--geo-sweep needs a single --input.")
+            return 2
+        if args.pack or args.incremental or args.long_range:
+            log.error("--geo-sweep cannot be combined with --pack, --incremental or --long-range.")
+            return 2
+        geos = args.geo_sweep.split(",")
+        try:
+            groups = plan_geo_sweep(geos)
+            # per-geo requests only for sections asked for explicitly
+            wanted = args.sections.split(",") if args.sections else settings.get("geo_sweep_sections") or []
+            sweep_sections = normalize_sections(wanted) if wanted else ()
+        except ValueError as e:
+            log.error(str(e))
+            return 2
+        try:
+            targets = client.sweep_targets(args.input, geos, opts)
+        except Exception as e:
+            log.error(f"Failed to fetch the region breakdown for the geo sweep: {e}")
+            return 1
+        sweep = {t.geo: t for t in targets}
+        log.info(
+            f"Geo sweep: {len(sweep)} geos from {len(groups)} region requests"
+            + (f", then {', '.join(sweep_sections)} per geo." if sweep_sections else ".")
+        )
+
+    if args.input_file:
+        if not Path(args.input_file).is_file():
+            log.error(f"Input file not found: {args.input_file}")
+            return 1
 
-    client = TrendsClient(opts=opts)
+        def items(on_invalid=None):
+            # streamed, so batches of any size are read with flat memory
+            return client.iter_input_file(args.input_file, args.input_format or None, on_invalid=on_invalid)
+    elif args.geo_sweep:
 
-    payloads: List[Dict[str, Any]] = []
+        def items(on_invalid=None):
+            return iter([(args.input, replace(opts, geo=geo)) for geo in sweep])
+    else:
+
+        def items(on_invalid=None):
+            return iter([(args.input, opts)])
+
+    # Resumable progress record for batch runs
+    checkpoint: Optional[CheckpointManifest] = None
+    if args.input_file:
+        checkpoint = CheckpointManifest.open(export_dir, batch_run_id(args, settings, opts, sections), resume=args.resume)
+        if args.resume:
+            log.info(f"Resuming: {checkpoint.completed_count} inputs already completed.")
+    elif args.resume:
+        log.warning("--resume only applies to --input-file runs.")
 
     try:
-        if args.input_file:
-            items = client.parse_input_file(args.input_file)
-            for term, specific_opts in items:
+        store = build_store(args, settings)
+    except sqlite3.Error as e:
+        log.error(f"Cannot open the history store: {e}")
+        return 2
+    if store is None and not formats:
+        log.warning("No export formats and the history store is disabled; results will not be kept.")
+
+    read_errors: List[BaseException] = []
+    # inputs whose options do not validate; each counts as one failed input
+    invalid: List[Tuple[str, BaseException]] = []
+
+    def reject(term: str, error: ValueError) -> None:
+        log.error(f"Failed to fetch data for {term!r}: {error}")
+        invalid.append((term, error))
+
+    def runnable():
+        try:
+            for term, specific_opts in items(reject):
                 if not term:
                     log.warning("Skipping an entry with empty 'input'.")
                     continue
-                log.info(f"Fetching trends for: {term}")
-                payloads.append(client.fetch(term, override=specific_opts))
+                if checkpoint is not None and checkpoint.completed(input_key(term, specific_opts)):
+                    continue
+                yield term, specific_opts
+        except (OSError, ValueError) as e:
+            # stop feeding the batch but keep (and export) what was fetched
+            log.error(f"Failed to read input file: {e}")
+            read_errors.append(e)
+
+    def input_keys():
+        try:
+            # invalid inputs were reported while fetching and have no result
+            for term, specific_opts in items(lambda term, error: None):
+                if term:
+                    yield input_key(term, specific_opts)
+        except (OSError, ValueError):
+            return  # already reported while fetching
+
+    def run_one(item):
+        with METRICS.timer("trends_input_seconds"):
+            return fetch_one(item)
+
+    def fetch_one(item):
+        term, specific_opts = item
+        log.info(f"Fetching trends for: {term}" + (f" in {specific_opts.geo}" if args.geo_sweep else ""))
+        if args.geo_sweep:
+            payload = client.fetch_sweep_target(term, sweep[specific_opts.geo], override=specific_opts, sections=sweep_sections)
+        elif args.incremental:
+            payload = client.fetch_incremental(
+                term,
+                override=specific_opts,
+                overlap_points=int(settings.get("incremental_overlap_points", 4)),
+                drift_threshold=float(settings.get("incremental_drift_threshold", 0.15)),
+            )
+        elif args.long_range:
+            payload = client.fetch_long_range(
+                term,
+                override=specific_opts,
+                window_days=int(settings.get("long_range_window_days", 250)),
+                overlap_days=int(settings.get("long_range_overlap_days", 30)),
+                workers=1 if args.profile else int(settings.get("long_range_workers", 4)),
+            )
         else:
-            log.info(f"Fetching trends for: {args.input}")
-            payloads.append(client.fetch(args.input, override=opts))
-    except Exception as e:
-        log.exception(f"Failed to fetch data: {e}")
-        return 1
+            payload = client.fetch(term, override=specific_opts)
+        return [(None, item, payload)]
+
+    profiler = ProfileCollector() if args.profile else None
+    workers = args.workers or int(settings.get("batch_workers", 4))
+    if profiler is not None and workers > 1:
+        log.info("Profiling: running with a single worker, sections and windows one after another.")
+        workers = 1
+    executor = BatchExecutor(
+        workers=workers,
+        log_every=float(settings.get("batch_log_every", 30)),
+        logger=log,
+        status=limiter.describe if adaptive else None,
+    )
 
-    # Export
+    # packed inputs by batch position, dropped once their result is consumed
+    work: Dict[int, Any] = {}
+    packing = {"inputs": 0, "requests": 0, "aliases": 0}
+
+    def packed_groups():
+        # plan in windows so only a bounded slice of the input is held at once
+        window = max(int(settings.get("pack_window", 5000)), 1)
+        anchor = args.pack_anchor or settings.get("pack_anchor", "")
+        offset = 0
+        source = runnable()
+        while True:
+            chunk = [item for _, item in zip(range(window), source)]
+            if not chunk:
+                return
+            groups = plan_packs(chunk, client.resolve, anchor=anchor)
+            for g in groups:
+                for m in g.members:
+                    m.index += offset
+                    work[m.index] = chunk[m.index - offset]
+                    packing["aliases"] += m.alias
+            packing["inputs"] += len(chunk)
+            packing["requests"] += len(groups)
+            offset += len(chunk)
+            yield from groups
+
+    if (args.pack or settings.get("pack_keywords", False)) and not (args.incremental or args.long_range):
+
+        def run_group(group):
+            log.info(f"Fetching trends for: {', '.join(m.input for m in group.members)}")
+            started = time.perf_counter()
+            out = [(idx, work[idx], payload) for idx, payload in client.fetch_packed(group)]
+            for _ in out:
+                METRICS.observe("trends_input_seconds", time.perf_counter() - started)
+            return out
+
+        results = executor.run(packed_groups(), profiler.wrap(run_group) if profiler else run_group)
+    else:
+        results = executor.run(runnable(), profiler.wrap(run_one) if profiler else run_one)
+
+    # Export target (also used by streaming writers while fetching)
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     base = export_dir / f"google_trends_{ts}"
 
-    # JSON export (full fidelity)
-    if "json" in formats:
-        out = export_json(payloads, f"{base}.json")
-        log.info(f"Wrote JSON: {out}")
+    stream = StreamExport(base, formats, log, compression=compression) if args.stream or settings.get("stream_exports", False) else None
+    if stream is not None and checkpoint is not None and args.resume:
+        # results of the interrupted run go first
+        for payload in checkpoint.iter_completed():
+            stream.write(payload)
+    if store is not None and checkpoint is not None and args.resume:
+        # results of the interrupted run may not have been committed to the store
+        store.write_many(checkpoint.iter_completed())
+    indexed: List[tuple] = []
+    fetched = failures = stored = 0
+    try:
+        for res in results:
+            if res.ok:
+                for idx, item, payload in res.value:
+                    work.pop(idx, None)
+                    fetched += 1
+                    METRICS.inc("trends_inputs_total", outcome="ok")
+                    if checkpoint is not None:
+                        checkpoint.record_done(input_key(*item), payload)
+                    if store is not None:
+                        stored += store.write(payload)
+                    if stream is not None:
+                        stream.write(payload)
+                    elif checkpoint is None and formats:
+                        indexed.append((res.index if idx is None else idx, payload))
+            else:
+                failed = [work.pop(m.index) for m in res.item.members] if hasattr(res.item, "members") else [res.item]
+                failures += len(failed)
+                METRICS.inc("trends_inputs_total", len(failed), outcome="failed")
+                for item in failed:
+                    log.error(f"Failed to fetch data for {item[0]!r}: {res.error}")
+                    if checkpoint is not None:
+                        checkpoint.record_failed(input_key(*item), res.error)
+        if invalid:
+            failures += len(invalid)
+            METRICS.inc("trends_inputs_total", len(invalid), outcome="failed")
+    finally:
+        if stream is not None:
+            stream.close()
+        if store is not None:
+            store.close()
+            log.info(f"Stored {stored} rows in {store.path}")
 
-    # Tabular view for CSV/Excel/HTML
-    df = TrendsClient.to_rows_for_tabular(payloads)
-    if not df.empty:
-        if "csv" in formats:
-            out = export_csv(df, f"{base}.csv")
-            log.info(f"Wrote CSV: {out}")
-        if "excel" in formats:
-            out = export_excel(df, f"{base}.xlsx")
-            log.info(f"Wrote Excel: {out}")
-        if "html" in formats:
-            out = export_html(df, f"{base}.html")
-            log.info(f"Wrote HTML: {out}")
-    else:
-        log.warning("No tabular data available for CSV/Excel/HTML export.")
+    if packing["requests"]:
+        log.info(
+            f"Packed {packing['inputs']} inputs into {packing['requests']} requests "
+            f"({packing['aliases']} duplicate inputs collapsed)."
+        )
+    sessions = pool.stats()
+    log.info(
+        f"Sessions: {sessions['handshakes']} handshakes, {sessions['reuses']} reuses, "
+        f"~{sessions['handshake_seconds_saved']}s of handshakes saved"
+    )
+    pool.close()
+    if client.flights is not None and client.flights.saved:
+        dedup = client.flights.stats()
+        log.info(f"Dedup: {dedup['saved']} of {dedup['requests']} requests saved by identical-request sharing")
+    if cache is not None:
+        stats = cache.stats()
+        log.info(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+    if adaptive:
+        rate = limiter.stats()
+        log.info(
+            f"Rate limit: ended at {rate['rate_per_minute']}/min after {rate['throttles']} throttled responses, "
+            f"circuit opened {rate['breaker_opened']} times"
+        )
+        if settings.get("rate_state_file"):
+            limiter.save(settings["rate_state_file"])
+
+    resumed = checkpoint.completed_count - fetched if checkpoint is not None else 0
+    summary = {"fetched": fetched, "failed": failures, "resumed": resumed, "sessions": sessions}
+    if cache is not None:
+        summary["cache"] = stats
+    if client.flights is not None:
+        summary["dedup"] = client.flights.stats()
+    if adaptive:
+        summary["rate_limit"] = rate
+    if store is not None:
+        summary["store"] = {"path": str(store.path), "rows": stored}
+    if failures and not fetched and not resumed:
+        log.error("All fetches failed; nothing to export.")
+        if settings.get("metrics_enabled", True):
+            write_metrics(base, log, summary)
+        return 1
 
-    if "xml" in formats:
-        out = export_xml(payloads, f"{base}.xml")
-        log.info(f"Wrote XML: {out}")
+    # worker processes only pay off once serialization outweighs their start-up
+    process_min = int(settings.get("export_process_min", 500))
+
+    def export() -> None:
+        if not formats:
+            return
+        if stream is not None:
+            stream.finish()
+        elif checkpoint is not None and profiler is None and (
+            process_min <= checkpoint.completed_count <= int(settings.get("export_process_max", 50000))
+        ):
+            # big enough for worker processes, small enough to hold in memory at once
+            export_all(list(checkpoint.iter_payloads(input_keys())), formats, base, log, compression=compression)
+        elif checkpoint is not None:
+            # old and new results, back in input order, streamed from the checkpoint
+            sink = StreamExport(base, formats, log, json_array=True, compression=compression, concurrent=profiler is None)
+            try:
+                for payload in checkpoint.iter_payloads(input_keys()):
+                    sink.write(payload)
+            finally:
+                sink.close()
+            sink.finish()
+        else:
+            # packed groups complete out of input order
+            indexed.sort(key=lambda x: x[0])
+            payloads = [p for _, p in indexed]
+            processes = profiler is None and len(payloads) >= process_min
+            export_all(payloads, formats, base, log, compression=compression, processes=processes)
+
+    (profiler.wrap(export) if profiler else export)()
+    if settings.get("metrics_enabled", True):
+        write_metrics(base, log, summary)
+    if profiler is not None:
+        out = profiler.dump(f"{base}.pstats")
+        if out is not None:
+            log.info(f"Wrote profile: {out} (summary in {out.name}.txt)")
+
+    if checkpoint is not None:
+        if failures or read_errors:
+            checkpoint.close()
+            if failures:
+                log.info(f"{failures} inputs failed; rerun with --resume to retry only those.")
+        else:
+            checkpoint.remove()
+    if read_errors:
+        log.error("The input file could not be read completely; exported the inputs read so far.")
+        return 1
 
     log.info("Done.")
     return 0
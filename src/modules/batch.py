@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+@dataclass
+class BatchResult(Generic[T]):
+    index: int
+    item: T
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+@dataclass
+class BatchExecutor:
+    """
+    Run a function over a batch of items with a bounded worker pool.
+
+    Items are pulled from the input iterable lazily (at most ``max_in_flight``
+    are submitted at once) and results are yielded in input order as soon as
+    every earlier item has finished. Finished results held back behind a
+    slow earlier item count against ``max_buffered``, so memory stays
+    bounded however long the input is. A failing item yields a BatchResult
+    with ``error`` set instead of aborting the batch.
+    """
+    workers: int = 4
+    max_in_flight: int = 0  # 0 -> 2 * workers
+    max_buffered: int = 0  # 0 -> 16 * max_in_flight
+    log_every: float = 30.0
+    logger: Optional[logging.Logger] = None
+    status: Optional[Callable[[], str]] = None  # extra state appended to progress lines
+
+    def run(self, items: Iterable[T], fn: Callable[[T], Any]) -> Iterator[BatchResult[T]]:
+        workers = max(int(self.workers), 1)
+        limit = self.max_in_flight or workers * 2
+        buffered = self.max_buffered or limit * 16
+        source = iter(enumerate(items))
+        pending: Dict[Future, int] = {}
+        submitted: Dict[int, T] = {}
+        ready: Dict[int, BatchResult[T]] = {}
+        next_index = 0
+        exhausted = False
+        done = failed = 0
+        started = last_log = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trends") as pool:
+            while True:
+                while not exhausted and len(pending) < limit and len(ready) < buffered:
+                    try:
+                        idx, item = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    submitted[idx] = item
+                    pending[pool.submit(fn, item)] = idx
+                if not pending:
+                    break
+
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    idx = pending.pop(fut)
+                    item = submitted.pop(idx)
+                    err = fut.exception()
+                    if err is None:
+                        ready[idx] = BatchResult(idx, item, value=fut.result())
+                        done += 1
+                    else:
+                        ready[idx] = BatchResult(idx, item, error=err)
+                        failed += 1
+
+                while next_index in ready:
+                    yield ready.pop(next_index)
+                    next_index += 1
+
+                now = time.monotonic()
+                if self.logger and now - last_log >= self.log_every:
+                    last_log = now
+                    self._log_progress(done, failed, len(pending), now - started)
+
+        if self.logger:
+            self._log_progress(done, failed, 0, time.monotonic() - started)
+
+    def _log_progress(self, done: int, failed: int, in_flight: int, elapsed: float) -> None:
+        per_min = (done + failed) / elapsed * 60.0 if elapsed > 0 else 0.0
+        extra = f", {self.status()}" if self.status is not None else ""
+        self.logger.info(
+            f"Batch progress: {done} done, {failed} failed, {in_flight} in flight, {per_min:.1f} items/min{extra}"
+        )
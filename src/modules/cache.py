@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compact import json_default
+
+# TTL (seconds) per timeframe class. Hourly windows move every few minutes,
+# fixed historical ranges never change once Google has finalized them.
+DEFAULT_TTL: Dict[str, int] = {
+    "hourly": 5 * 60,
+    "recent": 60 * 60,
+    "rolling": 12 * 60 * 60,
+    "historical": 30 * 24 * 60 * 60,
+}
+
+_DATE_RANGE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:T\d{2})?\s+(\d{4}-\d{2}-\d{2})(?:T\d{2})?$")
+
+def timeframe_class(timeframe: str, today: Optional[date] = None) -> str:
+    """
+    Classify a pytrends timeframe string for TTL purposes:
+    - 'now 1-H', 'now 4-H'           -> hourly
+    - 'now 1-d', 'now 7-d'           -> recent
+    - 'today 12-m', 'all', ...       -> rolling
+    - 'YYYY-MM-DD YYYY-MM-DD' (past) -> historical
+    """
+    tf = (timeframe or "").strip()
+    if tf.startswith("now "):
+        return "hourly" if tf.endswith("-H") else "recent"
+    m = _DATE_RANGE.match(tf)
+    if m:
+        today = today or date.today()
+        try:
+            end = date.fromisoformat(m.group(2))
+        except ValueError:
+            return "rolling"
+        # Google keeps revising the last couple of days of a range
+        return "historical" if end < today - timedelta(days=2) else "rolling"
+    return "rolling"
+
+@dataclass
+class ResponseCache:
+    """
+    On-disk cache of converted Trends sections.
+
+    Each (request key, section) pair is stored as its own JSON file so a
+    timeline hit does not depend on the related queries still being fresh.
+    Eviction is least-recently-used (by file mtime, refreshed on every hit)
+    once the directory grows beyond ``max_bytes``.
+    """
+    root: Path
+    max_bytes: int = 256 * 1024 * 1024
+    ttl: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_TTL))
+    refresh: bool = False  # skip reads but keep writing fresh entries
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def __post_init__(self) -> None:
+        self.root = Path(self.root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def key(kw_list: List[str], opts: Any) -> str:
+        """
+        Stable key over the normalized request options and keyword list.
+        Keyword order is kept: it determines the order of the value arrays.
+        Case is not, so related items read back carry the spelling of the
+        request that stored them (callers relabel them, see relabel_related).
+        """
+        norm = {
+            "kw": [k.strip().lower() for k in kw_list],
+            "hl": (opts.hl or "").lower(),
+            "tz": int(opts.tz or 0),
+            "geo": (opts.geo or "").upper(),
+            "timeframe": " ".join((opts.timeframe or "").split()),
+            "gprop": opts.gprop or "",
+            "category": int(opts.category or 0),
+        }
+        raw = json.dumps(norm, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key: str, section: str) -> Path:
+        return self.root / f"{key}.{section}.json"
+
+    def get(self, key: str, section: str) -> Optional[Any]:
+        """
+        Return the cached section data, or None on a miss/expired entry.
+        """
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        path = self._path(key, section)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        if entry.get("expires", 0) < time.time():
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # bump recency for LRU eviction
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry.get("data")
+
+    def put(self, key: str, section: str, timeframe: str, data: Any) -> None:
+        ttl = self.ttl.get(timeframe_class(timeframe), DEFAULT_TTL["rolling"])
+        entry = {"expires": time.time() + ttl, "timeframe": timeframe, "data": data}
+        path = self._path(key, section)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, default=json_default)
+        old = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += path.stat().st_size - old
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("*.json"))
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self) -> None:
+        """
+        Drop least-recently-used entries until the cache fits in max_bytes.
+        Caller must hold the lock.
+        """
+        entries: List[Tuple[float, int, Path]] = []
+        for p in self.root.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        for _, sz, p in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            size -= sz
+            self.evictions += 1
+        self._size = size
+
+    def clear(self) -> None:
+        for p in self.root.glob("*.json"):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
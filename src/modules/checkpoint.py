@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+from .compact import json_default
+
+def input_key(term: str, opts: Any) -> str:
+    """
+    Canonical key of one batch input: the raw input plus the options that
+    affect what is fetched.
+    """
+    raw = json.dumps(
+        {
+            "input": term,
+            "hl": opts.hl,
+            "tz": int(opts.tz or 0),
+            "geo": opts.geo,
+            "timeframe": opts.timeframe,
+            "gprop": opts.gprop,
+            "category": int(opts.category or 0),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+@dataclass
+class CheckpointManifest:
+    """
+    Progress record of a batch run, kept next to the exports.
+
+    ``<name>.manifest.jsonl`` gets one line per finished input
+    ({key, status, offset, length[, error]}) and ``<name>.results.ndjson``
+    holds the payloads themselves; ``offset`` is the byte offset of the
+    payload in that file. Both are append-only and flushed per item, so a
+    killed run loses at most the items that were in flight. In memory only
+    (offset, length) per finished input is kept, so batches of millions of
+    inputs stay cheap.
+    """
+    manifest_path: Path
+    results_path: Path
+    done: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.manifest_path = Path(self.manifest_path)
+        self.results_path = Path(self.results_path)
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._results = None
+
+    @classmethod
+    def open(cls, export_dir: str | Path, run_id: str, resume: bool = False) -> "CheckpointManifest":
+        """
+        Open the checkpoint of ``run_id``; unless resuming, start from scratch.
+        """
+        export_dir = Path(export_dir)
+        export_dir.mkdir(parents=True, exist_ok=True)
+        cp = cls(
+            manifest_path=export_dir / f"checkpoint_{run_id}.manifest.jsonl",
+            results_path=export_dir / f"checkpoint_{run_id}.results.ndjson",
+        )
+        if resume:
+            cp._load()
+        mode = "a" if resume else "w"
+        cp._manifest = open(cp.manifest_path, mode, encoding="utf-8")
+        cp._results = open(cp.results_path, mode + "b")
+        return cp
+
+    def _load(self) -> None:
+        if not self.manifest_path.exists():
+            return
+        size = self.results_path.stat().st_size if self.results_path.exists() else 0
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of a killed run
+                if entry.get("status") == "done":
+                    if entry.get("offset", 0) + entry.get("length", 0) > size:
+                        continue  # payload never made it to disk
+                    self.done[entry["key"]] = (entry["offset"], entry["length"])
+
+    def completed(self, key: str) -> bool:
+        return key in self.done
+
+    @property
+    def completed_count(self) -> int:
+        return len(self.done)
+
+    def record_done(self, key: str, payload: Mapping[str, Any]) -> None:
+        data = (json.dumps(dict(payload), ensure_ascii=False, default=json_default) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._results.tell()
+            self._results.write(data)
+            self._results.flush()
+            self._append({"key": key, "status": "done", "offset": offset, "length": len(data)})
+            self.done[key] = (offset, len(data))
+
+    def record_failed(self, key: str, error: BaseException) -> None:
+        with self._lock:
+            if self.completed(key):
+                return
+            self._append({"key": key, "status": "failed", "error": str(error)})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._manifest.flush()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read back the stored payload of a completed input.
+        """
+        return next(self.iter_payloads([key]), None)
+
+    def iter_payloads(self, keys: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Read back the stored payloads of ``keys`` in order through one file
+        handle, skipping keys that have not completed.
+        """
+        with self._lock:
+            if self._results is not None and not self._results.closed:
+                self._results.flush()
+        with open(self.results_path, "rb") as f:
+            for key in keys:
+                span = self.done.get(key)
+                if span is None:
+                    continue
+                f.seek(span[0])
+                yield json.loads(f.read(span[1]).decode("utf-8"))
+
+    def iter_completed(self) -> Iterator[Dict[str, Any]]:
+        yield from self.iter_payloads(list(self.done))
+
+    def close(self) -> None:
+        for f in (self._manifest, self._results):
+            if f is not None:
+                f.close()
+
+    def remove(self) -> None:
+        self.close()
+        for p in (self.manifest_path, self.results_path):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
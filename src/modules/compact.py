@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import sys
+import time
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    # shared between payloads (single-flight, pack splits), so never mutated in place
+    arr.flags.writeable = False
+    return arr
+
+def _values(values: Any, rows: int) -> np.ndarray:
+    arr = np.asarray(values, dtype=np.int32)
+    return _frozen(arr.reshape(rows, -1) if arr.size or rows else np.zeros((0, 0), dtype=np.int32))
+
+def format_time(t: int) -> str:
+    # same label as timeline_to_list ("%b %d, %Y" of the UTC timestamp)
+    return time.strftime("%b %d, %Y", time.gmtime(t))
+
+class TimelineArray(Sequence):
+    """
+    Compact interestOverTime timeline: epoch seconds, an int32 (points x
+    terms) value matrix and a partial-point mask. Iterating or indexing
+    yields the usual {time, formattedTime, value, formattedValue[,
+    isPartial]} dicts, built on demand, so code written for the list form
+    keeps working; formatted strings only exist once exported.
+    """
+    __slots__ = ("times", "values", "partial")
+
+    def __init__(self, times: Any, values: Any, partial: Any = None) -> None:
+        self.times = _frozen(np.asarray(times, dtype=np.int64).reshape(-1))
+        self.values = _values(values, len(self.times))
+        self.partial = _frozen(
+            np.zeros(len(self.times), dtype=bool) if partial is None else np.asarray(partial, dtype=bool).reshape(-1)
+        )
+
+    @classmethod
+    def from_list(cls, timeline: Iterable[Dict[str, Any]]) -> "TimelineArray":
+        if isinstance(timeline, cls):
+            return timeline
+        rows = list(timeline)
+        return cls(
+            [int(p["time"]) for p in rows],
+            [p.get("value", []) for p in rows],
+            [bool(p.get("isPartial", False)) for p in rows],
+        )
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return TimelineArray(self.times[i], self.values[i], self.partial[i])
+        t = int(self.times[i])
+        vals = self.values[i].tolist()
+        row: Dict[str, Any] = {
+            "time": t,
+            "formattedTime": format_time(t),
+            "value": vals,
+            "formattedValue": [str(v) for v in vals],
+        }
+        if self.partial[i]:
+            row["isPartial"] = True
+        return row
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_list())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (TimelineArray, list)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"TimelineArray({len(self)} points x {self.width} terms)"
+
+    def __reduce__(self) -> Any:
+        # rebuilt through __init__ so unpickled arrays are read-only again
+        return (TimelineArray, (self.times, self.values, self.partial))
+
+    @property
+    def width(self) -> int:
+        return self.values.shape[1] if self.values.ndim == 2 else 0
+
+    def select(self, columns: List[int]) -> "TimelineArray":
+        """
+        Same points with only the given value columns, in that order.
+        """
+        return TimelineArray(self.times, self.values[:, columns], self.partial)
+
+    def with_values(self, values: np.ndarray) -> "TimelineArray":
+        return TimelineArray(self.times, values, self.partial)
+
+    def mean(self) -> Optional[float]:
+        return float(self.values.mean()) if self.values.size else None
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        times = self.times.tolist()
+        values = self.values.tolist()
+        partial = self.partial.tolist()
+        out: List[Dict[str, Any]] = []
+        for t, vals, part in zip(times, values, partial):
+            row: Dict[str, Any] = {
+                "time": t,
+                "formattedTime": format_time(t),
+                "value": vals,
+                "formattedValue": [str(v) for v in vals],
+            }
+            if part:
+                row["isPartial"] = True
+            out.append(row)
+        return out
+
+class RegionArray(Sequence):
+    """
+    Compact interestBySubregion / interestByCity list: interned region
+    names and codes plus an int32 (regions x terms) value matrix. Rows read
+    as {geoCode, geoName, value, formattedValue} dicts.
+    """
+    __slots__ = ("codes", "names", "values")
+
+    def __init__(self, codes: Iterable[Optional[str]], names: Iterable[str], values: Any) -> None:
+        self.names: Tuple[str, ...] = tuple(sys.intern(str(n)) for n in names)
+        self.codes: Tuple[Optional[str], ...] = tuple(
+            sys.intern(c) if isinstance(c, str) else c for c in codes
+        )
+        self.values = _values(values, len(self.names))
+
+    @classmethod
+    def from_list(cls, regions: Iterable[Dict[str, Any]]) -> "RegionArray":
+        if isinstance(regions, cls):
+            return regions
+        rows = list(regions)
+        return cls(
+            [r.get("geoCode") for r in rows],
+            [r.get("geoName", "") for r in rows],
+            [r.get("value", []) for r in rows],
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return RegionArray(self.codes[i], self.names[i], self.values[i])
+        vals = self.values[i].tolist()
+        return {"geoCode": self.codes[i], "geoName": self.names[i], "value": vals, "formattedValue": [str(v) for v in vals]}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_list())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (RegionArray, list)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"RegionArray({len(self)} regions x {self.width} terms)"
+
+    def __reduce__(self) -> Any:
+        return (RegionArray, (self.codes, self.names, self.values))
+
+    @property
+    def width(self) -> int:
+        return self.values.shape[1] if self.values.ndim == 2 else 0
+
+    def select(self, columns: List[int]) -> "RegionArray":
+        return RegionArray(self.codes, self.names, self.values[:, columns])
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [
+            {"geoCode": code, "geoName": name, "value": vals, "formattedValue": [str(v) for v in vals]}
+            for code, name, vals in zip(self.codes, self.names, self.values.tolist())
+        ]
+
+COMPACT_TYPES = (TimelineArray, RegionArray)
+# Sections held as RegionArray (including the parent breakdowns of geo sweeps).
+REGION_SECTIONS = ("subregion", "city", "geo_country", "geo_region", "geo_metro")
+
+def json_default(obj: Any) -> Any:
+    """
+    ``default=`` hook for json.dump(s): compact sections serialize as the
+    plain list form (this is where formatted strings get generated).
+    """
+    if isinstance(obj, COMPACT_TYPES):
+        return obj.to_list()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def compact_section(section: str, value: Any) -> Any:
+    """
+    Compact form of a converted section read back in list form (cache,
+    checkpoint); other sections are returned unchanged.
+    """
+    if section == "timeline" and isinstance(value, list):
+        return TimelineArray.from_list(value)
+    if section in REGION_SECTIONS and isinstance(value, list):
+        return RegionArray.from_list(value)
+    return value
+
+def timeline_arrays(timeline: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (times, float values, partial) of a timeline in either form.
+    """
+    t = TimelineArray.from_list(timeline or [])
+    return t.times, t.values.astype(float), t.partial
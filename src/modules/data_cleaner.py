@@ -1,8 +1,15 @@
 from __future__ import annotations
 
 from typing import Dict, Any, List, Optional
+import numpy as np
 import pandas as pd
 
+from .compact import RegionArray, TimelineArray
+from utils.metrics import timed
+
+# Identifier columns that may sit next to the per-keyword values in a region frame.
+REGION_ID_COLUMNS = ("geoName", "geoCode", "coordinates")
+
 def df_reset_and_fill(df: Optional[pd.DataFrame]) -> pd.DataFrame:
     if df is None:
         return pd.DataFrame()
@@ -11,124 +18,155 @@ def df_reset_and_fill(df: Optional[pd.DataFrame]) -> pd.DataFrame:
     out = out.fillna(0)
     return out
 
-def timeline_to_list(df: pd.DataFrame, value_cols: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+def _int_columns(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """
+    (rows x cols) int matrix of the given columns (NaN -> 0).
+    """
+    if not cols:
+        return np.zeros((len(df), 0), dtype=np.int64)
+    return df[cols].fillna(0).astype("int64").to_numpy()
+
+def _epoch_seconds(dates: pd.Series) -> np.ndarray:
+    # naive timestamps are treated as UTC, like pd.Timestamp.timestamp()
+    epoch = pd.Timestamp("1970-01-01", tz="UTC") if dates.dt.tz is not None else pd.Timestamp("1970-01-01")
+    return ((dates - epoch) // pd.Timedelta(seconds=1)).astype("int64").to_numpy()
+
+@timed("trends_conversion_seconds", converter="timeline_to_list")
+def timeline_to_list(df: pd.DataFrame, value_cols: Optional[List[str]] = None) -> TimelineArray:
     """
-    Convert interest_over_time DataFrame to the expected JSON-like list.
+    Convert interest_over_time DataFrame to the expected JSON-like list, held
+    as a compact TimelineArray (reads as the list of point dicts).
     """
     if df.empty:
-        return []
-    df = df.copy()
-    # pytrends timeline has a 'isPartial' column; drop it for values
+        return TimelineArray([], [])
+    # pytrends timeline has a 'isPartial' column; drop it for values and,
+    # like Google's own timelineData, flag only the partial points
+    partial = np.zeros(len(df), dtype=bool)
     if "isPartial" in df.columns:
+        partial = (df["isPartial"] == True).to_numpy(dtype=bool)  # noqa: E712 (column may hold 0 after fillna)
         df = df.drop(columns=["isPartial"])
     if value_cols is None:
         value_cols = [c for c in df.columns if c != "date"]
-    rows: List[Dict[str, Any]] = []
-    for _, r in df.iterrows():
-        values = [int(r[c]) if pd.notna(r[c]) else 0 for c in value_cols]
-        rows.append(
-            {
-                "time": int(pd.Timestamp(r["date"]).timestamp()),
-                "formattedTime": pd.Timestamp(r["date"]).strftime("%b %d, %Y"),
-                "value": values,
-                "formattedValue": [str(v) for v in values],
-            }
-        )
-    return rows
+    times = _epoch_seconds(pd.to_datetime(df["date"]))
+    return TimelineArray(times, _int_columns(df, value_cols), partial)
 
-def region_to_list(df: pd.DataFrame) -> List[Dict[str, Any]]:
+@timed("trends_conversion_seconds", converter="region_to_list")
+def region_to_list(df: pd.DataFrame) -> RegionArray:
     """
     Convert interest_by_region DataFrame to list of dicts like:
     { geoCode, geoName, value: [..], formattedValue: [".."] }
+    held as a compact RegionArray with interned names.
+    Accepts the raw pytrends frame (region name in the index) or one that
+    has already been reset so that 'geoName' is a column.
     """
     if df.empty:
-        return []
-    df = df.copy()
-    # Index holds region name; columns are query terms
-    df = df.reset_index()
-    name_field = df.columns[0]
-    value_cols = [c for c in df.columns if c != name_field]
-    out: List[Dict[str, Any]] = []
-    for _, r in df.iterrows():
-        values = [int(r[c]) if pd.notna(r[c]) else 0 for c in value_cols]
-        out.append(
-            {
-                "geoCode": r.get("geoCode", None),
-                "geoName": str(r[name_field]),
-                "value": values,
-                "formattedValue": [str(v) for v in values],
-            }
-        )
-    return out
+        return RegionArray([], [], [])
+    if "geoName" not in df.columns:
+        # Index holds region name; columns are query terms
+        df = df.reset_index()
+        name_field = df.columns[0]
+    else:
+        name_field = "geoName"
+    value_cols = [c for c in df.columns if c != name_field and c not in REGION_ID_COLUMNS]
+    names = df[name_field].astype(str).tolist()
+    codes = df["geoCode"].tolist() if "geoCode" in df.columns else [None] * len(df)
+    return RegionArray(codes, names, _int_columns(df, value_cols))
 
-def related_topics_to_list(related_topics: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, List[Dict[str, Any]]]:
+def _column(df: pd.DataFrame, *names: str, default: Any = "") -> pd.Series:
     """
-    Convert related_topics dict to top/rising arrays.
-    Structure from pytrends: { '<term>': {'top': df, 'rising': df}, ...}
-    We merge across terms and keep top scores.
+    First existing column among ``names``, or a constant column.
     """
-    top: List[Dict[str, Any]] = []
-    rising: List[Dict[str, Any]] = []
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return pd.Series([default] * len(df), index=df.index)
 
-    for term, buckets in (related_topics or {}).items():
+def _collect(related: Dict[str, Dict[str, pd.DataFrame]], build) -> Dict[str, List[pd.DataFrame]]:
+    """
+    Apply ``build(term, df)`` to every non-empty top/rising frame, per bucket,
+    in pytrends' term order.
+    """
+    frames: Dict[str, List[pd.DataFrame]] = {"top": [], "rising": []}
+    for term, buckets in (related or {}).items():
         for bucket_name in ["top", "rising"]:
             df = buckets.get(bucket_name)
             if isinstance(df, pd.DataFrame) and not df.empty:
-                df = df.copy().fillna("")
-                for _, row in df.iterrows():
-                    item = {
-                        "topic": {
-                            "title": str(row.get("topic_title", row.get("title", ""))),
-                            "type": str(row.get("topic_type", row.get("type", ""))),
-                        },
-                        "value": int(row.get("value", 0)),
-                        "term": term,
-                    }
-                    if bucket_name == "top":
-                        top.append(item)
-                    else:
-                        rising.append(item)
-    # Keep unique by topic title + type + term; keep highest value
-    def dedupe(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        best: Dict[str, Dict[str, Any]] = {}
-        for it in items:
-            key = f'{it["term"]}|{it["topic"]["title"]}|{it["topic"]["type"]}'
-            if key not in best or it["value"] > best[key]["value"]:
-                best[key] = it
-        return sorted(best.values(), key=lambda x: x["value"], reverse=True)
+                frames[bucket_name].append(build(term, df.fillna("")))
+    return frames
 
-    return {"top": dedupe(top), "rising": dedupe(rising)}
+def _dedupe(frames: List[pd.DataFrame], key_cols: List[str]) -> pd.DataFrame:
+    """
+    Keep the first highest-value row per key, then order by value (desc).
+    Ties keep the order in which each key first appeared.
+    """
+    if not frames:
+        return pd.DataFrame()
+    items = pd.concat(frames, ignore_index=True)
+    key = items[key_cols[0]]
+    for col in key_cols[1:]:
+        key = key + "|" + items[col]
+    best = items.loc[items.groupby(key, sort=False)["value"].idxmax().to_numpy()]
+    return best.sort_values("value", ascending=False, kind="stable")
 
-def related_queries_to_list(related_queries: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, List[Dict[str, Any]]]:
+@timed("trends_conversion_seconds", converter="related_topics_to_list")
+def related_topics_to_list(related_topics: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Convert related_queries dict to top/rising arrays.
+    Convert related_topics dict to top/rising arrays.
+    Structure from pytrends: { '<term>': {'top': df, 'rising': df}, ...}
+    We merge across terms and keep top scores.
     """
-    top: List[Dict[str, Any]] = []
-    rising: List[Dict[str, Any]] = []
+    def build(term: str, df: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "title": _column(df, "topic_title", "title").astype(str).to_numpy(),
+                "type": _column(df, "topic_type", "type").astype(str).to_numpy(),
+                "value": _column(df, "value", default=0).astype("int64").to_numpy(),
+                "term": term,
+            }
+        )
 
-    for term, buckets in (related_queries or {}).items():
-        for bucket_name in ["top", "rising"]:
-            df = buckets.get(bucket_name)
-            if isinstance(df, pd.DataFrame) and not df.empty:
-                df = df.copy().fillna("")
-                for _, row in df.iterrows():
-                    item = {
-                        "query": str(row.get("query", "")),
-                        "value": int(row.get("value", 0)),
-                        "formattedValue": str(row.get("formattedValue", "")) or str(row.get("value", "")),
-                        "term": term,
-                    }
-                    if bucket_name == "top":
-                        top.append(item)
-                    else:
-                        rising.append(item)
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for bucket_name, frames in _collect(related_topics, build).items():
+        best = _dedupe(frames, ["term", "title", "type"])
+        if best.empty:
+            out[bucket_name] = []
+            continue
+        out[bucket_name] = [
+            {"topic": {"title": title, "type": typ}, "value": value, "term": term}
+            for title, typ, value, term in zip(
+                best["title"].tolist(), best["type"].tolist(), best["value"].tolist(), best["term"].tolist()
+            )
+        ]
+    return out
 
-    def dedupe(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        best: Dict[str, Dict[str, Any]] = {}
-        for it in items:
-            key = f'{it["term"]}|{it["query"]}'
-            if key not in best or it["value"] > best[key]["value"]:
-                best[key] = it
-        return sorted(best.values(), key=lambda x: x["value"], reverse=True)
+@timed("trends_conversion_seconds", converter="related_queries_to_list")
+def related_queries_to_list(related_queries: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Convert related_queries dict to top/rising arrays.
+    """
+    def build(term: str, df: pd.DataFrame) -> pd.DataFrame:
+        value = _column(df, "value", default=0)
+        formatted = _column(df, "formattedValue").astype(str)
+        formatted = formatted.where(formatted != "", _column(df, "value").astype(str))
+        return pd.DataFrame(
+            {
+                "query": _column(df, "query").astype(str).to_numpy(),
+                "value": value.astype("int64").to_numpy(),
+                "formattedValue": formatted.to_numpy(),
+                "term": term,
+            }
+        )
 
-    return {"top": dedupe(top), "rising": dedupe(rising)}
\ No newline at end of file
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for bucket_name, frames in _collect(related_queries, build).items():
+        best = _dedupe(frames, ["term", "query"])
+        if best.empty:
+            out[bucket_name] = []
+            continue
+        out[bucket_name] = [
+            {"query": query, "value": value, "formattedValue": formatted, "term": term}
+            for query, value, formatted, term in zip(
+                best["query"].tolist(), best["value"].tolist(), best["formattedValue"].tolist(), best["term"].tolist()
+            )
+        ]
+    return out
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .compact import COMPACT_TYPES
+
+@dataclass(frozen=True)
+class RequestKey:
+    """
+    Canonical identity of one backend request: the sorted, case-folded
+    keywords plus the effective options and sections. Inputs that differ
+    only in spelling (plain term vs. explore URL, keyword order, case,
+    whitespace) map to the same key.
+    """
+    keywords: Tuple[str, ...]
+    hl: str
+    tz: int
+    geo: str
+    timeframe: str
+    gprop: str
+    category: int
+    sections: Tuple[str, ...] = ()
+
+    @classmethod
+    def of(cls, kw_list: Iterable[str], opts: Any, sections: Iterable[str] = ()) -> "RequestKey":
+        return cls(
+            keywords=tuple(sorted(norm_term(t) for t in kw_list)),
+            hl=(opts.hl or "").strip(),
+            tz=int(opts.tz or 0),
+            geo=(opts.geo or "").strip().upper(),
+            timeframe=" ".join((opts.timeframe or "").split()),
+            gprop=(opts.gprop or "").strip(),
+            category=int(opts.category or 0),
+            sections=tuple(sections),
+        )
+
+def norm_term(term: str) -> str:
+    return " ".join(str(term).split()).lower()
+
+class SingleFlight:
+    """
+    Collapse identical requests: concurrent callers with the same key wait
+    for the one call in flight, and the last ``keep`` results are kept so
+    later duplicates in the same batch are answered without a fetch.
+    """
+
+    def __init__(self, keep: int = 256) -> None:
+        self.keep = keep
+        self.requests = 0
+        self.fetched = 0
+        self._lock = threading.Lock()
+        self._flights: Dict[Any, Future] = {}
+        self._done: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Return (result, shared); ``shared`` is True when another call's
+        result was reused. Errors propagate to every waiting caller but are
+        not remembered, so a later duplicate retries.
+        """
+        with self._lock:
+            self.requests += 1
+            if key in self._done:
+                self._done.move_to_end(key)
+                return self._done[key], True
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+                self.fetched += 1
+        if not leader:
+            return flight.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._flights[key]
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            del self._flights[key]
+            if self.keep > 0:
+                self._done[key] = result
+                while len(self._done) > self.keep:
+                    self._done.popitem(last=False)
+        flight.set_result(result)
+        return result, False
+
+    @property
+    def saved(self) -> int:
+        return self.requests - self.fetched
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "fetched": self.fetched, "saved": self.saved}
+
+def keyword_order(fetched: List[str], wanted: List[str]) -> List[int]:
+    """
+    Positions in ``fetched`` of each keyword of ``wanted`` (same key, so
+    the same keywords up to order and case).
+    """
+    pending: Dict[str, List[int]] = {}
+    for i, t in enumerate(fetched):
+        pending.setdefault(norm_term(t), []).append(i)
+    return [pending[norm_term(t)].pop(0) for t in wanted]
+
+RELATED_SECTIONS = ("related_topics", "related_queries")
+
+def relabel_related(value: Any, wanted: List[str]) -> Any:
+    """
+    Give the items of a converted related section ({top, rising}) the
+    ``term`` spelling of ``wanted``. Request and cache keys fold case and
+    whitespace, so a shared or cached result may carry another caller's
+    spelling ("python" for "Python").
+    """
+    spelling = {norm_term(t): t for t in wanted}
+    out: Dict[str, Any] = {}
+    for bucket, items in (value or {}).items():
+        relabeled = []
+        for it in items or []:
+            term = spelling.get(norm_term(it.get("term", "")))
+            relabeled.append(dict(it, term=term) if term is not None and term != it.get("term") else it)
+        out[bucket] = relabeled
+    return out
+
+def reorder_sections(data: Dict[str, Any], fetched: List[str], wanted: List[str]) -> Dict[str, Any]:
+    """
+    Permute the per-keyword value columns of converted sections fetched for
+    ``fetched`` into the keyword order of ``wanted``, and relabel related
+    items with the spelling of ``wanted`` (see relabel_related).
+    """
+    order = keyword_order(fetched, wanted)
+    n = len(order)
+    in_order = order == list(range(n))
+    out: Dict[str, Any] = {}
+    for section, value in data.items():
+        if section in RELATED_SECTIONS:
+            out[section] = relabel_related(value, wanted)
+        elif in_order:
+            out[section] = value
+        elif isinstance(value, COMPACT_TYPES):
+            out[section] = value.select(order + list(range(n, value.width)))
+        elif section in ("timeline", "subregion", "city"):
+            rows = []
+            for it in value or []:
+                vals = list(it.get("value", []))
+                fvals = list(it.get("formattedValue", []))
+                rows.append(
+                    dict(
+                        it,
+                        value=[vals[i] for i in order] + vals[n:],
+                        formattedValue=[fvals[i] for i in order] + fvals[n:],
+                    )
+                )
+            out[section] = rows
+        else:
+            out[section] = value
+    return out
@@ -1,36 +1,122 @@
 from __future__ import annotations
 
+import csv
+import gzip
+import io
 import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from lxml import etree
+
+from .compact import COMPACT_TYPES, RegionArray, TimelineArray, json_default
+from utils.metrics import METRICS, timed
+
+if TYPE_CHECKING:
+    from lxml import etree
 
 def ensure_dir(path: str | Path) -> Path:
     p = Path(path)
     p.mkdir(parents=True, exist_ok=True)
     return p
 
-def export_json(payloads: List[Dict[str, Any]], out_path: str | Path) -> Path:
-    out_path = Path(out_path)
+# File suffix added by each export compression (JSON, NDJSON and CSV only).
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+def check_compression(compression: str) -> None:
+    """
+    Fail early on an unknown compression or a missing zstandard module.
+    """
+    if compression and compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression!r}. Choose from: {', '.join(COMPRESSION_SUFFIXES)}")
+    if compression == "zstd":
+        _zstandard()
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compression requires zstandard (pip install zstandard).") from e
+    return zstandard
+
+def compressed_path(path: str | Path, compression: str = "") -> Path:
+    path = Path(path)
+    if not compression:
+        return path
+    check_compression(compression)
+    return path.with_name(path.name + COMPRESSION_SUFFIXES[compression])
+
+def open_text(path: Path, compression: str = "", newline: Optional[str] = None) -> IO[str]:
+    """
+    Open an export file for writing text, through gzip or zstd when asked.
+    """
+    if not compression:
+        return open(path, "w", encoding="utf-8", newline=newline)
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", newline=newline)
+    if compression == "zstd":
+        raw = _zstandard().ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8", newline=newline)
+    check_compression(compression)
+    return open(path, "w", encoding="utf-8", newline=newline)
+
+def as_dict(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Materialize a payload (plain dict or lazy TrendsResult) for serialization.
+    Only the sections present in the payload are included.
+    """
+    return payload if isinstance(payload, dict) else {k: payload[k] for k in payload}
+
+def _array_element(payload: Mapping[str, Any], first: bool) -> str:
+    # one element of json.dump(payloads, indent=2); encoding each payload with
+    # dumps spares the millions of tiny writes json.dump makes when indenting
+    text = json.dumps(as_dict(payload), ensure_ascii=False, indent=2, default=json_default)
+    return ("[" if first else ",") + "\n  " + text.replace("\n", "\n  ")
+
+@timed("trends_export_seconds", format="json")
+def export_json(payloads: Iterable[Mapping[str, Any]], out_path: str | Path, compression: str = "") -> Path:
+    out_path = compressed_path(out_path, compression)
     ensure_dir(out_path.parent)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(payloads, f, ensure_ascii=False, indent=2)
+    with open_text(out_path, compression) as f:
+        count = 0
+        for p in payloads:
+            f.write(_array_element(p, not count))
+            count += 1
+        f.write("\n]" if count else "[]")
     return out_path
 
-def export_csv(df: pd.DataFrame, out_path: str | Path) -> Path:
-    out_path = Path(out_path)
+@timed("trends_export_seconds", format="csv")
+def export_csv(df: pd.DataFrame, out_path: str | Path, compression: str = "") -> Path:
+    out_path = compressed_path(out_path, compression)
     ensure_dir(out_path.parent)
-    df.to_csv(out_path, index=False)
+    with open_text(out_path, compression, newline="") as f:
+        df.to_csv(f, index=False)
     return out_path
 
 def export_excel(df: pd.DataFrame, out_path: str | Path) -> Path:
-    out_path = Path(out_path)
-    ensure_dir(out_path.parent)
-    df.to_excel(out_path, index=False)
-    return out_path
+    """
+    Summary table as .xlsx, streamed row by row through ExcelRowWriter.
+    """
+    writer = ExcelRowWriter(out_path)
+    columns = [str(c) for c in df.columns]
+    if not columns:
+        writer.close()
+        return writer.path
+    for values in df.itertuples(index=False, name=None):
+        writer.write(dict(zip(columns, values)))
+    writer.close()
+    return writer.path
 
+@timed("trends_export_seconds", format="html")
 def export_html(df: pd.DataFrame, out_path: str | Path) -> Path:
     out_path = Path(out_path)
     ensure_dir(out_path.parent)
@@ -39,24 +125,498 @@ def export_html(df: pd.DataFrame, out_path: str | Path) -> Path:
         f.write(html)
     return out_path
 
-def export_xml(payloads: List[Dict[str, Any]], out_path: str | Path) -> Path:
+def _result_element(payload: Mapping[str, Any]) -> etree._Element:
+    from lxml import etree  # only needed when XML is exported
+
+    item = etree.Element("Result")
+    for key, val in as_dict(payload).items():
+        node = etree.SubElement(item, key)
+        if isinstance(val, (dict, list) + COMPACT_TYPES):
+            node.text = json.dumps(val, ensure_ascii=False, default=json_default)
+        else:
+            node.text = str(val)
+    return item
+
+# Framing of the XML export, shared by export_xml and XMLStreamWriter.
+XML_DECLARATION = b"<?xml version='1.0' encoding='utf-8'?>\n"
+XML_OPEN, XML_CLOSE, XML_EMPTY = b"<GoogleTrendsResults>\n", b"</GoogleTrendsResults>\n", b"<GoogleTrendsResults/>\n"
+
+def _result_bytes(payload: Mapping[str, Any]) -> bytes:
+    # one <Result> indented to level 1 of the document, on its own lines
+    from lxml import etree
+
+    item = _result_element(payload)
+    etree.indent(item, space="  ", level=1)
+    return b"  " + etree.tostring(item, encoding="utf-8") + b"\n"
+
+@timed("trends_export_seconds", format="xml")
+def export_xml(payloads: Iterable[Mapping[str, Any]], out_path: str | Path) -> Path:
     """
     Basic XML export of the JSON payloads.
+    Sections missing from a payload are simply not emitted. Results are
+    serialized one at a time into the pretty-printed document, so only
+    one <Result> tree is held in memory.
     """
     out_path = Path(out_path)
     ensure_dir(out_path.parent)
 
-    root = etree.Element("GoogleTrendsResults")
-    for p in payloads:
-        item = etree.SubElement(root, "Result")
-        for key, val in p.items():
-            node = etree.SubElement(item, key)
-            if isinstance(val, (dict, list)):
-                node.text = json.dumps(val, ensure_ascii=False)
+    with open(out_path, "wb") as f:
+        f.write(XML_DECLARATION)
+        count = 0
+        for p in payloads:
+            if not count:
+                f.write(XML_OPEN)
+            f.write(_result_bytes(p))
+            count += 1
+        f.write(XML_CLOSE if count else XML_EMPTY)
+    return out_path
+
+class NDJSONWriter:
+    """
+    Streaming JSON export: one payload per line, flushed as it is written,
+    so a crashed run keeps every payload fetched so far.
+    """
+
+    def __init__(self, out_path: str | Path, compression: str = "") -> None:
+        self.path = compressed_path(out_path, compression)
+        ensure_dir(self.path.parent)
+        self._f = open_text(self.path, compression)
+
+    @timed("trends_export_seconds", format="ndjson")
+    def write(self, payload: Mapping[str, Any]) -> None:
+        self._f.write(json.dumps(as_dict(payload), ensure_ascii=False, default=json_default) + "\n")
+        self._f.flush()
+
+    @timed("trends_export_seconds", format="ndjson")
+    def close(self) -> None:
+        self._f.close()
+
+class JSONArrayWriter:
+    """
+    Incremental export_json: writes the same indented JSON array one
+    payload at a time instead of serialising the whole list at once.
+    """
+
+    def __init__(self, out_path: str | Path, compression: str = "") -> None:
+        self.path = compressed_path(out_path, compression)
+        ensure_dir(self.path.parent)
+        self._f = open_text(self.path, compression)
+        self._count = 0
+
+    @timed("trends_export_seconds", format="json")
+    def write(self, payload: Mapping[str, Any]) -> None:
+        self._f.write(_array_element(payload, not self._count))
+        self._count += 1
+
+    @timed("trends_export_seconds", format="json")
+    def close(self) -> None:
+        self._f.write("\n]" if self._count else "[]")
+        self._f.close()
+
+class XMLStreamWriter:
+    """
+    Streaming XML export, byte for byte the document export_xml writes,
+    flushed one <Result> at a time.
+    """
+
+    def __init__(self, out_path: str | Path) -> None:
+        import lxml  # noqa: F401 (fail before fetching, not at the first result)
+
+        self.path = Path(out_path)
+        ensure_dir(self.path.parent)
+        self._f = open(self.path, "wb")
+        self._f.write(XML_DECLARATION)
+        self._count = 0
+
+    @timed("trends_export_seconds", format="xml")
+    def write(self, payload: Mapping[str, Any]) -> None:
+        if not self._count:
+            self._f.write(XML_OPEN)
+        self._f.write(_result_bytes(payload))
+        self._f.flush()
+        self._count += 1
+
+    @timed("trends_export_seconds", format="xml")
+    def close(self) -> None:
+        self._f.write(XML_CLOSE if self._count else XML_EMPTY)
+        self._f.close()
+
+class CSVRowWriter:
+    """
+    Append summary rows (see TrendsClient.summary_row) to a CSV file one at
+    a time; the header is taken from the first row.
+    """
+
+    def __init__(self, out_path: str | Path, compression: str = "") -> None:
+        self.path = compressed_path(out_path, compression)
+        ensure_dir(self.path.parent)
+        self._f = open_text(self.path, compression, newline="")
+        self._writer: Optional[csv.DictWriter] = None
+
+    @timed("trends_export_seconds", format="csv")
+    def write(self, row: Dict[str, Any]) -> None:
+        if self._writer is None:
+            # same line endings as export_csv (pandas writes os.linesep)
+            self._writer = csv.DictWriter(self._f, fieldnames=list(row), lineterminator=os.linesep)
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._f.flush()
+
+    @timed("trends_export_seconds", format="csv")
+    def close(self) -> None:
+        self._f.close()
+
+def _excel_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None  # NaN: empty cell, like DataFrame.to_excel
+    return value
+
+class ExcelRowWriter:
+    """
+    Append summary rows to an .xlsx workbook one at a time through
+    openpyxl's write-only mode, which streams rows to a temporary file
+    instead of keeping a cell tree in memory. The header is taken from the
+    first row; the workbook is written on close().
+    """
+
+    def __init__(self, out_path: str | Path) -> None:
+        from openpyxl import Workbook
+
+        self.path = Path(out_path)
+        ensure_dir(self.path.parent)
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Sheet1")
+        self._columns: Optional[List[str]] = None
+
+    @timed("trends_export_seconds", format="excel")
+    def write(self, row: Dict[str, Any]) -> None:
+        if self._columns is None:
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+
+            self._columns = list(row)
+            header = []
+            for name in self._columns:
+                cell = WriteOnlyCell(self._ws, value=name)
+                cell.font = Font(bold=True)
+                header.append(cell)
+            self._ws.append(header)
+        self._ws.append([_excel_value(row.get(c)) for c in self._columns])
+
+    @timed("trends_export_seconds", format="excel")
+    def close(self) -> None:
+        self._wb.save(self.path)
+
+# Partition value used for worldwide (geo == "") results.
+WORLDWIDE_PARTITION = "WORLD"
+
+def _payload_terms(payload: Mapping[str, Any]) -> List[str]:
+    return [t.strip() for t in str(payload.get("searchTerm", "")).split(",")]
+
+def _constant_columns(cols: Dict[str, List[Any]], payload: Mapping[str, Any], opts: Mapping[str, Any], n: int) -> None:
+    cols["input"].extend([payload.get("inputUrlOrTerm", "")] * n)
+    cols["geo"].extend([opts.get("geo", "") or WORLDWIDE_PARTITION] * n)
+    cols["timeframe"].extend([opts.get("timeframe", "")] * n)
+    cols["gprop"].extend([opts.get("gprop", "")] * n)
+    cols["category"].extend([int(opts.get("category", 0) or 0)] * n)
+
+def timeline_long_rows(payload: Mapping[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Long-format timeline of one payload: one row per (term, timestamp).
+    """
+    opts = payload.get("options") or {}
+    terms = _payload_terms(payload)
+    cols: Dict[str, List[Any]] = {k: [] for k in ("input", "term", "geo", "timeframe", "gprop", "category", "timestamp", "value", "isPartial")}
+    timeline = payload.get("interestOverTime_timelineData")
+    if isinstance(timeline, TimelineArray):
+        # straight from the arrays: point-major, one row per term column
+        k = min(len(terms), timeline.width)
+        n = len(timeline) * k
+        _constant_columns(cols, payload, opts, n)
+        cols["term"] = terms[:k] * len(timeline)
+        cols["timestamp"] = np.repeat(timeline.times, k).tolist()
+        cols["value"] = timeline.values[:, :k].ravel().tolist()
+        cols["isPartial"] = np.repeat(timeline.partial, k).tolist()
+        return cols
+    for point in timeline or []:
+        for term, value in zip(terms, point.get("value", [])):
+            cols["input"].append(payload.get("inputUrlOrTerm", ""))
+            cols["term"].append(term)
+            cols["geo"].append(opts.get("geo", "") or WORLDWIDE_PARTITION)
+            cols["timeframe"].append(opts.get("timeframe", ""))
+            cols["gprop"].append(opts.get("gprop", ""))
+            cols["category"].append(int(opts.get("category", 0) or 0))
+            cols["timestamp"].append(int(point["time"]))
+            cols["value"].append(int(value))
+            cols["isPartial"].append(bool(point.get("isPartial", False)))
+    return cols
+
+def region_long_rows(payload: Mapping[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Long-format subregion/city interest of one payload: one row per (term, region).
+    """
+    opts = payload.get("options") or {}
+    terms = _payload_terms(payload)
+    cols: Dict[str, List[Any]] = {k: [] for k in ("input", "term", "geo", "timeframe", "gprop", "category", "resolution", "geoCode", "geoName", "value")}
+    for key, resolution in (("interestBySubregion", "REGION"), ("interestByCity", "CITY")):
+        regions = payload.get(key)
+        if isinstance(regions, RegionArray):
+            k = min(len(terms), regions.width)
+            n = len(regions) * k
+            _constant_columns(cols, payload, opts, n)
+            cols["resolution"].extend([resolution] * n)
+            cols["term"].extend(terms[:k] * len(regions))
+            cols["geoCode"].extend(c or "" for c in regions.codes for _ in range(k))
+            cols["geoName"].extend(name for name in regions.names for _ in range(k))
+            cols["value"].extend(regions.values[:, :k].ravel().tolist())
+            continue
+        for region in regions or []:
+            for term, value in zip(terms, region.get("value", [])):
+                cols["input"].append(payload.get("inputUrlOrTerm", ""))
+                cols["term"].append(term)
+                cols["geo"].append(opts.get("geo", "") or WORLDWIDE_PARTITION)
+                cols["timeframe"].append(opts.get("timeframe", ""))
+                cols["gprop"].append(opts.get("gprop", ""))
+                cols["category"].append(int(opts.get("category", 0) or 0))
+                cols["resolution"].append(resolution)
+                cols["geoCode"].append(region.get("geoCode") or "")
+                cols["geoName"].append(region.get("geoName", ""))
+                cols["value"].append(int(value))
+    return cols
+
+class ColumnarWriter:
+    """
+    Long-format Parquet / Arrow IPC export of timelines and regional data.
+
+    Two datasets are written under ``out_dir``: ``timeline`` (term, geo,
+    timeframe, timestamp, value, isPartial, ...) and ``regions``. Both are
+    hive-partitioned by run_date and geo, repeated strings are dictionary
+    encoded, and rows are flushed every ``flush_every`` payloads so the
+    writer can be fed from a streaming run.
+    """
+    TIMELINE_STRINGS = ("input", "term", "timeframe", "gprop")
+    REGION_STRINGS = ("input", "term", "timeframe", "gprop", "resolution", "geoCode", "geoName")
+
+    def __init__(self, out_dir: str | Path, fmt: str = "parquet", run_date: str = "", flush_every: int = 500) -> None:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Parquet/Arrow export requires pyarrow (pip install pyarrow).") from e
+        if fmt not in ("parquet", "arrow"):
+            raise ValueError("fmt must be 'parquet' or 'arrow'")
+        self.path = ensure_dir(out_dir)
+        self.fmt = fmt
+        self.run_date = run_date or datetime.utcnow().strftime("%Y-%m-%d")
+        self.run_id = datetime.utcnow().strftime("%H%M%S%f")
+        self.flush_every = max(int(flush_every), 1)
+        self._pending: List[Mapping[str, Any]] = []
+        self._flushes = 0
+
+    def write(self, payload: Mapping[str, Any]) -> None:
+        self._pending.append(payload)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def _table(self, cols: Dict[str, List[Any]], strings: Tuple[str, ...], extra: Dict[str, Any]):
+        import pyarrow as pa
+
+        arrays = {}
+        for name, values in cols.items():
+            if name in strings:
+                arrays[name] = pa.array(values, pa.string()).dictionary_encode()
+            elif name == "timestamp":
+                arrays[name] = pa.array(values, pa.timestamp("s", tz="UTC"))
+            elif name in ("value", "category"):
+                arrays[name] = pa.array(values, pa.int32())
             else:
-                node.text = str(val)
+                arrays[name] = pa.array(values)
+        n = len(next(iter(cols.values()), []))
+        for name, value in extra.items():
+            arrays[name] = pa.array([value] * n, pa.string())
+        return pa.table(arrays)
 
-    xml_bytes = etree.tostring(root, pretty_print=True, xml_declaration=True, encoding="utf-8")
-    with open(out_path, "wb") as f:
-        f.write(xml_bytes)
-    return out_path
\ No newline at end of file
+    @timed("trends_export_seconds", format="columnar")
+    def _write_dataset(self, table, name: str) -> None:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if table.num_rows == 0:
+            return
+        ext = "parquet" if self.fmt == "parquet" else "arrow"
+        ds.write_dataset(
+            table,
+            str(self.path / name),
+            format="parquet" if self.fmt == "parquet" else "ipc",
+            partitioning=ds.partitioning(pa.schema([("run_date", pa.string()), ("geo", pa.string())]), flavor="hive"),
+            basename_template=f"part-{self.run_id}-{self._flushes}-{{i}}.{ext}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        timeline: Dict[str, List[Any]] = {}
+        regions: Dict[str, List[Any]] = {}
+        for p in self._pending:
+            for acc, rows in ((timeline, timeline_long_rows(p)), (regions, region_long_rows(p))):
+                for k, v in rows.items():
+                    acc.setdefault(k, []).extend(v)
+        self._pending = []
+        extra = {"run_date": self.run_date}
+        if timeline:
+            self._write_dataset(self._table(timeline, self.TIMELINE_STRINGS, extra), "timeline")
+        if regions:
+            self._write_dataset(self._table(regions, self.REGION_STRINGS, extra), "regions")
+        self._flushes += 1
+
+    def close(self) -> None:
+        self.flush()
+
+def export_columnar(
+    payloads: Iterable[Mapping[str, Any]], out_dir: str | Path, fmt: str = "parquet", run_date: str = ""
+) -> Path:
+    # one file per partition for in-memory lists, bounded batches for streams
+    flush_every = max(len(payloads), 1) if isinstance(payloads, list) else 500
+    writer = ColumnarWriter(out_dir, fmt=fmt, run_date=run_date, flush_every=flush_every)
+    for p in payloads:
+        writer.write(p)
+    writer.close()
+    return writer.path
+
+class ThreadedWriter:
+    """
+    Run a streaming writer (anything with write() and close()) on its own
+    thread behind a bounded queue, so one pass over the payloads feeds
+    several formats at once. write() blocks once the writer is ``maxsize``
+    items behind; a writer error is raised by the next write() or close().
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, writer: Any, maxsize: int = 64) -> None:
+        self.writer = writer
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(int(maxsize), 1))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=f"export-{type(writer).__name__}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._CLOSE:
+                break
+            if self._error is None:
+                try:
+                    self.writer.write(item)
+                except BaseException as e:
+                    self._error = e
+        try:
+            self.writer.close()
+        except BaseException as e:
+            self._error = self._error or e
+
+    def write(self, item: Any) -> None:
+        if self._error is not None:
+            raise self._error
+        self._queue.put(item)
+
+    def close(self) -> None:
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+# Formats export_formats can write, in the order they are reported.
+EXPORT_FORMATS = ("json", "csv", "excel", "html", "xml", "parquet", "arrow")
+# Formats written from the summary table rather than the payloads.
+TABLE_FORMATS = ("csv", "excel", "html")
+# Writers that are CPU-bound Python (json's indenting encoder, lxml trees,
+# openpyxl cells); they get worker processes instead of sharing the GIL.
+PROCESS_FORMATS = ("json", "xml", "excel")
+
+@dataclass
+class ExportDataset:
+    """
+    A finished batch materialized once for every export format: the
+    payloads as plain dicts and the summary table shared by CSV, Excel
+    and HTML.
+    """
+    payloads: List[Dict[str, Any]]
+    table: pd.DataFrame
+
+# Dataset of an export worker process, handed over once by the pool initializer.
+_WORKER_DATASET: Optional[ExportDataset] = None
+
+def _init_worker(dataset: ExportDataset) -> None:
+    global _WORKER_DATASET
+    _WORKER_DATASET = dataset
+
+def write_format(fmt: str, dataset: ExportDataset, base: Path, compression: str = "") -> Path:
+    """
+    Write one export format of ``dataset`` next to ``base`` (compression
+    applies to JSON and CSV).
+    """
+    if fmt == "json":
+        return export_json(dataset.payloads, f"{base}.json", compression)
+    if fmt == "csv":
+        return export_csv(dataset.table, f"{base}.csv", compression)
+    if fmt == "excel":
+        return export_excel(dataset.table, f"{base}.xlsx")
+    if fmt == "html":
+        return export_html(dataset.table, f"{base}.html")
+    if fmt == "xml":
+        return export_xml(dataset.payloads, f"{base}.xml")
+    if fmt in ("parquet", "arrow"):
+        return export_columnar(dataset.payloads, base.parent / fmt, fmt=fmt)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def _write_in_worker(fmt: str, base: Path, compression: str) -> Tuple[Path, float]:
+    started = time.perf_counter()
+    path = write_format(fmt, _WORKER_DATASET, base, compression)
+    return path, time.perf_counter() - started
+
+def export_formats(
+    dataset: ExportDataset, formats: Iterable[str], base: Path, compression: str = "", processes: bool = True
+) -> Dict[str, Path]:
+    """
+    Write every requested format of ``dataset`` at the same time, so the
+    export takes about as long as the slowest writer rather than the sum.
+
+    With ``processes`` the PROCESS_FORMATS writers run in worker processes
+    that receive the dataset once, through the pool initializer (inherited
+    without a copy where processes are forked); the other writers run in
+    threads. Table formats are skipped when the table is empty. Returns the
+    path written for each format.
+    """
+    wanted = [
+        f for f in EXPORT_FORMATS
+        if f in set(formats) and (f not in TABLE_FORMATS or not dataset.table.empty)
+    ]
+    in_process = [f for f in wanted if f in PROCESS_FORMATS] if processes and len(wanted) > 1 else []
+    futures: Dict[str, Future] = {}
+    with ExitStack() as stack:
+        if in_process:
+            procs = stack.enter_context(
+                ProcessPoolExecutor(max_workers=len(in_process), initializer=_init_worker, initargs=(dataset,))
+            )
+            for fmt in in_process:
+                futures[fmt] = procs.submit(_write_in_worker, fmt, base, compression)
+        threads = stack.enter_context(
+            ThreadPoolExecutor(max_workers=max(len(wanted) - len(in_process), 1), thread_name_prefix="export")
+        )
+        for fmt in wanted:
+            if fmt not in futures:
+                futures[fmt] = threads.submit(write_format, fmt, dataset, base, compression)
+
+    written: Dict[str, Path] = {}
+    for fmt in wanted:
+        if fmt in in_process:
+            path, seconds = futures[fmt].result()
+            # the worker's own timings stay in the worker process
+            METRICS.observe("trends_export_seconds", seconds, format=fmt)
+        else:
+            path = futures[fmt].result()
+        written[fmt] = path
+    return written
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+# Internal region sections requested on a sweep's parent geo, keyed by the
+# depth of the swept geos (countries, regions of a country, metros of a region).
+GEO_LEVEL_SECTIONS = {1: "geo_country", 2: "geo_region", 3: "geo_metro"}
+# interest_by_region resolution of each of those sections.
+GEO_LEVEL_RESOLUTIONS = {"geo_country": "COUNTRY", "geo_region": "REGION", "geo_metro": "DMA"}
+
+# "US-*" sweeps every region of US, "*" every country.
+WILDCARD = "*"
+
+def parent_geo(geo: str) -> str:
+    """
+    Geo one level up: "US-CA" -> "US", "US-CA-803" -> "US-CA", "DE" -> ""
+    (worldwide).
+    """
+    return geo.rpartition("-")[0]
+
+@dataclass
+class SweepGroup:
+    parent: str
+    section: str  # region section requested on the parent (see GEO_LEVEL_SECTIONS)
+    geos: List[str] = field(default_factory=list)  # explicitly listed geos, in request order
+    wildcard: bool = False  # also every other region the parent breakdown returns
+
+@dataclass
+class SweepTarget:
+    geo: str
+    parent: str
+    row: Optional[Dict[str, Any]] = None  # the geo's row of the parent breakdown
+
+def plan_geo_sweep(geos: Iterable[str]) -> List[SweepGroup]:
+    """
+    Group the geos of a sweep by parent so the region breakdown of each
+    parent is requested once, whatever the number of geos under it.
+    Geos are upper-cased and deduplicated; ``US-*`` stands for every
+    region of US and ``*`` for every country.
+    """
+    groups: Dict[str, SweepGroup] = {}
+    seen = set()
+    for raw in geos:
+        geo = raw.strip().upper()
+        if not geo or geo in seen:
+            continue
+        seen.add(geo)
+        wildcard = geo == WILDCARD or geo.endswith("-" + WILDCARD)
+        parent = parent_geo(geo) if geo != WILDCARD else ""
+        level = parent.count("-") + 2 if parent else 1
+        section = GEO_LEVEL_SECTIONS.get(level)
+        if section is None or WILDCARD in parent:
+            raise ValueError(f"Cannot sweep {raw.strip()!r}: use a geo code up to three levels deep (e.g. US-CA-803) or PARENT-*.")
+        group = groups.setdefault(parent, SweepGroup(parent, section))
+        if wildcard:
+            group.wildcard = True
+        else:
+            group.geos.append(geo)
+    return list(groups.values())
+
+def _full_code(code: str, parent: str) -> str:
+    # metro rows carry the bare code ("803" for US-CA-803)
+    code = code.upper()
+    if parent and not code.startswith(parent + "-"):
+        return f"{parent}-{code}"
+    return code
+
+def match_targets(group: SweepGroup, rows: Iterable[Dict[str, Any]]) -> List[SweepTarget]:
+    """
+    Pair the group's geos with their rows of the parent breakdown, matched
+    on geoCode; a geo missing from the breakdown gets ``row=None``. A
+    wildcard group then adds every other row that has a code.
+    """
+    by_code: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        if row.get("geoCode"):
+            by_code.setdefault(_full_code(str(row["geoCode"]), group.parent), row)
+    targets = [SweepTarget(geo, group.parent, by_code.get(geo)) for geo in group.geos]
+    if group.wildcard:
+        listed = set(group.geos)
+        targets.extend(SweepTarget(code, group.parent, row) for code, row in by_code.items() if code not in listed)
+    return targets
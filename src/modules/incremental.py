@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from .compact import TimelineArray, timeline_arrays
+from .stitching import normalize_peak, overlap_scale, relative_drift, resample_mean
+
+# Google serves daily points for windows up to ~9 months; stay well inside it.
+MAX_DAILY_WINDOW_DAYS = 250
+DAY = 24 * 60 * 60
+
+@dataclass
+class TimelineHistory:
+    """
+    Locally stored timeline of one request (keyword list + options).
+    Values are kept as unrounded floats on the scale of the first fetch;
+    they are renormalized to 0-100 only when a payload is built.
+    """
+    terms: List[str]
+    step: int
+    times: List[int] = field(default_factory=list)
+    values: List[List[float]] = field(default_factory=list)
+    partial: List[bool] = field(default_factory=list)
+
+    @classmethod
+    def from_timeline(cls, terms: List[str], timeline: Any) -> "TimelineHistory":
+        times, values, partial = timeline_arrays(timeline)
+        return cls(
+            terms=list(terms),
+            step=infer_step(times.tolist()),
+            times=times.tolist(),
+            values=values.tolist(),
+            partial=partial.tolist(),
+        )
+
+    def complete_until(self) -> int:
+        """
+        Index one past the last complete (non-partial) point.
+        """
+        n = len(self.times)
+        while n and self.partial[n - 1]:
+            n -= 1
+        return n
+
+@dataclass
+class HistoryStore:
+    """
+    One JSON file per request key under ``root``.
+    """
+    root: Path
+
+    def __post_init__(self) -> None:
+        self.root = Path(self.root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str) -> Optional[TimelineHistory]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return TimelineHistory(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, key: str, history: TimelineHistory) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(history), f)
+        os.replace(tmp, path)
+
+def infer_step(times: List[int]) -> int:
+    if len(times) < 2:
+        return DAY
+    return int(np.median(np.diff(np.asarray(times, dtype=np.int64))))
+
+def window_timeframe(history: TimelineHistory, overlap_points: int, today: Optional[date] = None) -> Optional[str]:
+    """
+    Daily-resolution timeframe covering the last ``overlap_points`` complete
+    stored points through today, or None if that window would be too long
+    for Google to return daily data.
+    """
+    end = history.complete_until()
+    if end < overlap_points or overlap_points < 1:
+        return None
+    start = datetime.fromtimestamp(history.times[end - overlap_points], tz=timezone.utc).date()
+    today = today or datetime.now(timezone.utc).date()
+    if (today - start).days > MAX_DAILY_WINDOW_DAYS or history.step < DAY:
+        return None
+    return f"{start:%Y-%m-%d} {today:%Y-%m-%d}"
+
+def merge_window(
+    history: TimelineHistory, window: Any, threshold: float
+) -> Tuple[Optional[TimelineHistory], float]:
+    """
+    Rescale a freshly fetched recent window onto the stored history using
+    the overlapping complete points, then append/replace the newer points.
+    Returns (updated history or None when it cannot be stitched, drift).
+    """
+    if not window:
+        return None, float("inf")
+    w_times, w_values, w_partial = timeline_arrays(window)
+    if w_values.ndim != 2 or w_values.shape[1] != len(history.terms):
+        return None, float("inf")
+    w_step = infer_step(w_times.tolist())
+    if w_step > history.step:
+        return None, float("inf")
+
+    if w_step < history.step:
+        # e.g. daily points into the stored weekly buckets
+        per_bucket = history.step // w_step
+        t, v, counts = resample_mean(w_times, w_values, history.times[0], history.step)
+        bucket_of = (w_times - history.times[0]) // history.step
+        has_partial = np.asarray([w_partial[bucket_of == b].any() for b in (t - history.times[0]) // history.step])
+        complete = (counts >= per_bucket) & ~has_partial
+        w_times, w_values = t, v
+        # the first bucket usually starts mid-period: usable neither for fit nor as data
+        keep = np.ones(len(t), dtype=bool)
+        if len(t) and not complete[0]:
+            keep[0] = False
+        w_times, w_values, w_partial = w_times[keep], w_values[keep], ~complete[keep]
+
+    stored_end = history.complete_until()
+    h_times = np.asarray(history.times[:stored_end], dtype=np.int64)
+    h_values = np.asarray(history.values[:stored_end], dtype=float).reshape(len(h_times), -1)
+    common, h_idx, w_idx = np.intersect1d(h_times, w_times[~w_partial], return_indices=True)
+    if common.size == 0:
+        return None, float("inf")
+    w_complete = w_values[~w_partial]
+    ref, new = h_values[h_idx], w_complete[w_idx]
+    k = overlap_scale(ref, new)
+    if not np.isfinite(k):
+        return None, float("inf")
+    drift = relative_drift(ref, new * k)
+    if drift > threshold:
+        return None, drift
+
+    last_complete = int(h_times[-1])
+    fresh = w_times > last_complete
+    merged = TimelineHistory(
+        terms=history.terms,
+        step=history.step,
+        times=history.times[:stored_end] + w_times[fresh].tolist(),
+        values=history.values[:stored_end] + (w_values[fresh] * k).tolist(),
+        partial=history.partial[:stored_end] + w_partial[fresh].tolist(),
+    )
+    return merged, drift
+
+_SPAN = re.compile(r"^(today|now)\s+(\d+)-([ymdH])$")
+_RANGE = re.compile(r"^(\d{4}-\d{2}-\d{2})\s+(\d{4}-\d{2}-\d{2})$")
+
+def timeframe_bounds(timeframe: str, now: Optional[datetime] = None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    (start, end) epoch seconds covered by a timeframe; None means unbounded.
+    """
+    tf = " ".join((timeframe or "").split())
+    now = now or datetime.now(timezone.utc)
+    m = _SPAN.match(tf)
+    if m:
+        n, unit = int(m.group(2)), m.group(3)
+        delta = {
+            "y": timedelta(days=365 * n),
+            "m": timedelta(days=365 * n / 12),
+            "d": timedelta(days=n),
+            "H": timedelta(hours=n),
+        }[unit]
+        return int((now - delta).timestamp()), None
+    m = _RANGE.match(tf)
+    if m:
+        start = datetime.fromisoformat(m.group(1)).replace(tzinfo=timezone.utc)
+        end = datetime.fromisoformat(m.group(2)).replace(tzinfo=timezone.utc) + timedelta(days=1)
+        return int(start.timestamp()), int(end.timestamp())
+    return None, None
+
+def history_to_timeline(history: TimelineHistory, timeframe: str) -> TimelineArray:
+    """
+    Slice the history to ``timeframe`` and renormalize it to 0-100 the way
+    Google normalizes a single request, in timeline_to_list's schema.
+    """
+    if not history.times:
+        return TimelineArray([], [])
+    times = np.asarray(history.times, dtype=np.int64)
+    start, end = timeframe_bounds(timeframe)
+    # keep the bucket that contains ``start``, like Google does
+    mask = np.ones(len(times), dtype=bool)
+    if start is not None:
+        mask &= times + history.step > start
+    if end is not None:
+        mask &= times < end
+    values = np.asarray(history.values, dtype=float).reshape(len(times), -1)[mask]
+    ints = np.rint(normalize_peak(values)).astype(np.int64)
+    return TimelineArray(times[mask], ints, np.asarray(history.partial, dtype=bool)[mask])
+
+def daily_windows(timeframe: str, window_days: int = MAX_DAILY_WINDOW_DAYS, overlap_days: int = 30) -> Optional[List[str]]:
+    """
+    Split a ``YYYY-MM-DD YYYY-MM-DD`` timeframe into consecutive windows of
+    at most ``window_days`` days, each overlapping the previous one by
+    ``overlap_days``. Returns None when the timeframe is not a date range or
+    already fits in a single daily-resolution window.
+    """
+    m = _RANGE.match(" ".join((timeframe or "").split()))
+    if not m:
+        return None
+    start, end = date.fromisoformat(m.group(1)), date.fromisoformat(m.group(2))
+    window_days = min(max(window_days, 2), MAX_DAILY_WINDOW_DAYS)
+    overlap_days = min(max(overlap_days, 1), window_days - 1)
+    if (end - start).days + 1 <= window_days:
+        return None
+    out: List[str] = []
+    lo = start
+    while True:
+        hi = min(lo + timedelta(days=window_days - 1), end)
+        out.append(f"{lo:%Y-%m-%d} {hi:%Y-%m-%d}")
+        if hi >= end:
+            return out
+        lo = hi - timedelta(days=overlap_days - 1)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+log = logging.getLogger("trends")
+
+# Input file formats by extension; anything else is read as JSON.
+FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".tsv": "tsv"}
+# Header names accepted for the input column of CSV files.
+INPUT_COLUMNS = ("input", "term", "keyword", "url")
+# Per-input options recognised in JSONL/CSV records.
+OPTION_KEYS = ("hl", "tz", "geo", "timeframe", "gprop", "category", "sleep")
+
+# Largest single element the JSON reader buffers before giving up.
+MAX_ELEMENT_CHARS = 16 << 20
+
+Record = Tuple[str, Dict[str, Any]]
+
+def input_format(path: str | Path, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt.lower()
+    return FORMATS.get(Path(path).suffix.lower(), "json")
+
+def iter_records(path: str | Path, fmt: Optional[str] = None) -> Iterator[Record]:
+    """
+    Stream (input, options) records from a batch input file without loading
+    it whole. ``options`` is the raw option dict of the record merged over
+    the broadcast options in effect ({**broadcast, **specific}).
+
+    - JSON: the three shapes of parse_input_file, decoded element by element
+    - JSONL: one JSON string or {"input", "options"} object per line; a line
+      with "options" but no "input" sets the broadcast for the lines after it
+    - CSV/TSV: a header with an input column (input/term/keyword/url) and
+      optional option columns; empty cells inherit the broadcast, and a row
+      with an empty input but some options sets the broadcast instead
+    """
+    fmt = input_format(path, fmt)
+    if fmt == "jsonl":
+        yield from _jsonl_records(path)
+    elif fmt in ("csv", "tsv"):
+        yield from _csv_records(path, "\t" if fmt == "tsv" else ",")
+    elif fmt == "json":
+        yield from _json_records(path)
+    else:
+        raise ValueError(f"Unsupported input format: {fmt!r}")
+
+def _record(item: Any, broadcast: Dict[str, Any]) -> Optional[Record]:
+    if isinstance(item, str):
+        return item, dict(broadcast)
+    if isinstance(item, dict):
+        specific = item.get("options") or {}
+        return item.get("input", ""), {**broadcast, **(specific if isinstance(specific, dict) else {})}
+    return None
+
+def _jsonl_records(path: str | Path) -> Iterator[Record]:
+    broadcast: Dict[str, Any] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                log.warning(f"{path}:{lineno}: skipping malformed line ({e})")
+                continue
+            if isinstance(item, dict) and "input" not in item and isinstance(item.get("options"), dict):
+                broadcast = {**broadcast, **item["options"]}
+                continue
+            rec = _record(item, broadcast)
+            if rec is not None:
+                yield rec
+
+def _csv_records(path: str | Path, delimiter: str) -> Iterator[Record]:
+    broadcast: Dict[str, Any] = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        fields = {(name or "").strip().lower(): name for name in reader.fieldnames or []}
+        column = next((fields[c] for c in INPUT_COLUMNS if c in fields), None)
+        if column is None:
+            raise ValueError(f"CSV input needs one of the columns {', '.join(INPUT_COLUMNS)}.")
+        options = {k: fields[k] for k in OPTION_KEYS if k in fields}
+        for row in reader:
+            specific = {k: row[name].strip() for k, name in options.items() if (row.get(name) or "").strip()}
+            term = (row.get(column) or "").strip()
+            if not term:
+                broadcast = {**broadcast, **specific}
+                continue
+            yield term, {**broadcast, **specific}
+
+def _json_records(path: str | Path) -> Iterator[Record]:
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JSONStream(f)
+        first = stream.peek()
+        if first == "[":
+            for item in stream.array():
+                rec = _record(item, {})
+                if rec is not None:
+                    yield rec
+            return
+        if first != "{":
+            raise ValueError("Unsupported input file structure.")
+
+        broadcast: Optional[Dict[str, Any]] = None
+        deferred = False
+        for key in stream.members():
+            if key == "options":
+                value = stream.value()
+                broadcast = value if isinstance(value, dict) else {}
+            elif key == "inputs" and broadcast is not None:
+                yield from _inputs(stream, broadcast)
+            elif key == "inputs":
+                # options may still follow; skip for now and take a second pass
+                for _ in stream.array():
+                    pass
+                deferred = True
+            else:
+                stream.value()
+        if not deferred:
+            return
+
+        f.seek(0)
+        stream = _JSONStream(f)
+        for key in stream.members():
+            if key == "inputs":
+                yield from _inputs(stream, broadcast or {})
+            else:
+                stream.value()
+
+def _inputs(stream: "_JSONStream", broadcast: Dict[str, Any]) -> Iterator[Record]:
+    for item in stream.array():
+        rec = _record(item, broadcast)
+        if rec is not None:
+            yield rec
+
+class _JSONStream:
+    """
+    Minimal pull parser over a text file: walks the members of top-level
+    objects and arrays and decodes each element with raw_decode from a
+    buffer refilled in chunks, so only one element is in memory at a time.
+    """
+
+    def __init__(self, f: IO[str], chunk_size: int = 1 << 16) -> None:
+        self._f = f
+        self._chunk = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        data = self._f.read(self._chunk)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Invalid JSON input: expected {' or '.join(chars)!s}, got {c or 'end of file'!r}")
+        self._pos += 1
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # most likely cut off by the chunk boundary; a broken file
+                # fails once the element outgrows MAX_ELEMENT_CHARS
+                if len(self._buf) - self._pos < MAX_ELEMENT_CHARS and self._fill():
+                    continue
+                raise
+            # a number may continue in the next chunk ("1." + "5e3")
+            if isinstance(value, (int, float)) and self._buf[end:end + 1] in ("", *".eE+-0123456789") and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def array(self) -> Iterator[Any]:
+        if self.peek() != "[":
+            self.value()  # not a list: ignored like parse_input_file does
+            return
+        self._expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._expect(",]") == "]":
+                return
+
+    def members(self) -> Iterator[str]:
+        """
+        Yield the keys of an object; the caller consumes each value (with
+        value() or array()) before asking for the next key.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .compact import COMPACT_TYPES, TimelineArray
+
+# Google Trends compares at most five keywords per payload.
+MAX_TERMS = 5
+
+def options_key(opts: Any) -> Tuple[Any, ...]:
+    """
+    Options that must be identical for keywords to share a payload.
+    (``sleep`` only affects retry backoff, not the request itself.)
+    """
+    return (opts.hl, int(opts.tz or 0), opts.geo, opts.timeframe, opts.gprop, int(opts.category or 0))
+
+@dataclass
+class PackMember:
+    index: int  # position of the input in the batch
+    input: str
+    terms: List[str]
+    alias: bool = False  # duplicate of an earlier member; shares its columns
+
+@dataclass
+class PackedGroup:
+    opts: Any
+    members: List[PackMember] = field(default_factory=list)
+    anchor: str = ""
+
+    @property
+    def kw_list(self) -> List[str]:
+        kws = [t for m in self.members if not m.alias for t in m.terms]
+        return kws + [self.anchor] if self.anchor else kws
+
+    @property
+    def packed(self) -> bool:
+        return sum(1 for m in self.members if not m.alias) > 1 or bool(self.anchor)
+
+    def position(self, member: PackMember) -> int:
+        """
+        Column of ``member``'s keyword in kw_list (aliases share the column
+        of the member they duplicate).
+        """
+        term = _norm(member.terms[0])
+        kws = self.kw_list
+        return next(i for i, t in enumerate(kws) if _norm(t) == term)
+
+def plan_packs(
+    items: Iterable[Tuple[str, Any]],
+    resolve: Callable[[str, Any], Tuple[List[str], Any]],
+    max_terms: int = MAX_TERMS,
+    anchor: str = "",
+) -> List[PackedGroup]:
+    """
+    Group single-keyword inputs with identical options into shared payloads.
+
+    ``items`` are (input, options) pairs as returned by parse_input_file and
+    ``resolve`` turns one into (keyword list, effective options). Inputs that
+    already carry several keywords (comparison URLs) or fail to resolve are
+    kept as groups of their own. With ``anchor`` set, every packed group
+    also carries that keyword so values can be compared across groups.
+    A keyword repeated with identical options joins the group that already
+    requests it as an alias instead of being fetched again.
+    """
+    capacity = max(min(max_terms, MAX_TERMS) - (1 if anchor else 0), 1)
+    groups: List[PackedGroup] = []
+    open_groups: Dict[Tuple[Any, ...], List[PackedGroup]] = {}
+    planned: Dict[Tuple[Any, ...], PackedGroup] = {}
+
+    for index, (raw, opts) in enumerate(items):
+        try:
+            kw_list, eff = resolve(raw, opts)
+        except ValueError:
+            groups.append(PackedGroup(opts=opts, members=[PackMember(index, raw, [])]))
+            continue
+        if len(kw_list) != 1 or (anchor and _norm(kw_list[0]) == _norm(anchor)):
+            groups.append(PackedGroup(opts=eff, members=[PackMember(index, raw, kw_list)]))
+            continue
+
+        term = kw_list[0]
+        seen = planned.get(options_key(eff) + (_norm(term),))
+        if seen is not None:
+            seen.members.append(PackMember(index, raw, [term], alias=True))
+            continue
+        candidates = open_groups.setdefault(options_key(eff), [])
+        target: Optional[PackedGroup] = None
+        for g in candidates:
+            # pytrends keys columns by keyword, so a term may appear once per payload
+            if all(_norm(m.terms[0]) != _norm(term) for m in g.members):
+                target = g
+                break
+        if target is None:
+            target = PackedGroup(opts=eff, anchor=anchor)
+            candidates.append(target)
+            groups.append(target)
+        target.members.append(PackMember(index, raw, [term]))
+        planned[options_key(eff) + (_norm(term),)] = target
+        if len(target.kw_list) - (1 if target.anchor else 0) >= capacity:
+            candidates.remove(target)
+
+    for g in groups:
+        # a lone keyword gains nothing from an anchor
+        if len(g.kw_list) == 2 and g.anchor:
+            g.anchor = ""
+    return groups
+
+def _norm(term: str) -> str:
+    return term.strip().lower()
+
+def _pick(items: Any, pos: int, n: int) -> Any:
+    if isinstance(items, COMPACT_TYPES):
+        return items.select([pos] + list(range(n, items.width)))
+    out: List[Dict[str, Any]] = []
+    for it in items:
+        vals = list(it.get("value", []))
+        fvals = list(it.get("formattedValue", []))
+        # keep any trailing non-keyword columns exactly as a single fetch would
+        out.append(dict(it, value=vals[pos:pos + 1] + vals[n:], formattedValue=fvals[pos:pos + 1] + fvals[n:]))
+    return out
+
+def split_sections(data: Dict[str, Any], kw_list: List[str], pos: int) -> Dict[str, Any]:
+    """
+    Extract the sections of keyword ``kw_list[pos]`` from a combined payload.
+    """
+    n = len(kw_list)
+    term = _norm(kw_list[pos])
+    out: Dict[str, Any] = {}
+    for section, value in data.items():
+        if section in ("timeline", "subregion", "city"):
+            out[section] = _pick(value or [], pos, n)
+        elif section in ("related_topics", "related_queries"):
+            out[section] = {
+                bucket: [it for it in (value or {}).get(bucket, []) if _norm(str(it.get("term", ""))) == term]
+                for bucket in ("top", "rising")
+            }
+        else:
+            out[section] = value
+    return out
+
+def rescale_to_anchor(timeline: Any, anchor_pos: int) -> Any:
+    """
+    Rescale a combined timeline so the anchor keyword peaks at 100.
+    Groups sharing the same anchor then have directly comparable values
+    (members that outperform the anchor may exceed 100).
+    """
+    if isinstance(timeline, TimelineArray):
+        if timeline.width <= anchor_pos or not len(timeline):
+            return timeline
+        peak = int(timeline.values[:, anchor_pos].max())
+        if peak <= 0:
+            return timeline
+        # round half to even, like round() on the list form
+        return timeline.with_values(np.rint(timeline.values * (100.0 / peak)).astype(np.int64))
+    peak = max((it["value"][anchor_pos] for it in timeline if len(it.get("value", [])) > anchor_pos), default=0)
+    if peak <= 0:
+        return timeline
+    factor = 100.0 / peak
+    out: List[Dict[str, Any]] = []
+    for it in timeline:
+        vals = [int(round(v * factor)) for v in it.get("value", [])]
+        out.append(dict(it, value=vals, formattedValue=[str(v) for v in vals]))
+    return out
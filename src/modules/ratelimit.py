@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+log = logging.getLogger("trends")
+
+@dataclass
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every request a process makes.
+
+    ``rate`` tokens are added per second up to ``burst``; each backend call
+    takes one token and blocks until one is available.
+    """
+    rate: float = 1.0
+    burst: int = 1
+    _tokens: float = field(init=False, repr=False)
+    _updated: float = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.rate <= 0:
+            raise ValueError("rate must be positive")
+        self.burst = max(int(self.burst), 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: int = 1) -> "TokenBucket":
+        return cls(rate=float(requests_per_minute) / 60.0, burst=burst)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until ``tokens`` are available; returns the time spent waiting.
+        The bucket never holds more than ``burst``, so larger requests are
+        taken in steps of at most ``burst`` tokens.
+        """
+        waited = 0.0
+        while tokens > self.burst:
+            waited += self._take(self.burst)
+            tokens -= self.burst
+        return waited + self._take(tokens)
+
+    def _take(self, tokens: float) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+@dataclass
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    TokenBucket whose rate is learned from responses (AIMD): every success
+    while the bucket is drained adds ``increase`` requests/minute, a 429 or
+    5xx multiplies the rate by ``decrease`` (at most once per
+    ``cut_interval`` seconds, so one burst of failing in-flight calls
+    counts once). When ``breaker_errors`` errors
+    land within ``breaker_window`` seconds the circuit opens: acquire()
+    blocks everyone for ``cooldown`` seconds, doubling on each consecutive
+    opening up to ``max_cooldown``. The learned rate can be persisted with
+    save()/load() so the next run starts where this one ended.
+    """
+    min_rate: float = 1.0 / 60.0
+    max_rate: float = 10.0
+    increase: float = 1.0  # requests/minute added per success
+    decrease: float = 0.5
+    cut_interval: float = 5.0
+    breaker_errors: int = 5
+    breaker_window: float = 60.0
+    cooldown: float = 60.0
+    max_cooldown: float = 15 * 60.0
+    successes: int = 0
+    throttles: int = 0
+    breaker_opened: int = 0
+    _errors: List[float] = field(init=False, repr=False)
+    _last_cut: float = field(init=False, repr=False)
+    _open_until: float = field(init=False, repr=False)
+    _streak: int = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self.rate = min(max(self.rate, self.min_rate), self.max_rate)
+        self._errors = []
+        self._last_cut = float("-inf")
+        self._open_until = 0.0
+        self._streak = 0
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: int = 1, **kwargs: Any) -> "AdaptiveRateLimiter":
+        for key in ("min_rate", "max_rate"):
+            if key in kwargs:
+                kwargs[key] = float(kwargs[key]) / 60.0
+        return cls(rate=float(requests_per_minute) / 60.0, burst=burst, **kwargs)
+
+    @property
+    def rate_per_minute(self) -> float:
+        return self.rate * 60.0
+
+    @property
+    def open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def _take(self, tokens: float) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                pause = self._open_until - time.monotonic()
+            if pause <= 0:
+                break
+            time.sleep(pause)
+            waited += pause
+        return waited + super()._take(tokens)
+
+    def feedback(self, status: int) -> None:
+        """
+        Report the HTTP status of one response (0 for a connection error).
+        """
+        if status == 429 or status == 0 or status >= 500:
+            self.record_throttle(status)
+        elif 200 <= status < 400:
+            self.record_success()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            now = time.monotonic()
+            if now >= self._open_until:
+                self._streak = 0
+            self._refill(now)
+            # only grow while the limit is what holds callers back
+            if self._tokens < 1.0:
+                self.rate = min(self.rate + self.increase / 60.0, self.max_rate)
+
+    def record_throttle(self, status: int = 429) -> None:
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            self._refill(now)
+            if now - self._last_cut >= self.cut_interval:
+                self._last_cut = now
+                self.rate = max(self.rate * self.decrease, self.min_rate)
+                self._tokens = 0.0  # no burst right after a throttle
+                log.info(f"Rate limit: got {status or 'connection error'}, cut to {self.rate_per_minute:.1f}/min")
+            self._errors = [t for t in self._errors if now - t < self.breaker_window] + [now]
+            if len(self._errors) >= self.breaker_errors and now >= self._open_until:
+                pause = min(self.cooldown * (2 ** self._streak), self.max_cooldown)
+                self._streak += 1
+                self.breaker_opened += 1
+                self._open_until = now + pause
+                self._errors.clear()
+                log.warning(f"Rate limit: circuit open for {pause:.0f}s after clustered errors")
+
+    def describe(self) -> str:
+        state = "open" if self.open else "closed"
+        return f"rate {self.rate_per_minute:.1f}/min, circuit {state}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_minute": round(self.rate_per_minute, 2),
+            "successes": self.successes,
+            "throttles": self.throttles,
+            "breaker_opened": self.breaker_opened,
+        }
+
+    def load(self, path: str | Path) -> bool:
+        """
+        Start from the rate learned by a previous run, if recorded.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            learned = float(state["rate_per_minute"]) / 60.0
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self.rate = min(max(learned, self.min_rate), self.max_rate)
+        return True
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"rate_per_minute": round(self.rate_per_minute, 3), "saved": int(time.time())}, f)
+        os.replace(tmp, path)
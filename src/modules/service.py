@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compact import json_default
+from .sessions import THROTTLE_ERRORS
+from .trends_parser import TrendsClient, normalize_sections, options_from_dict
+from utils.metrics import METRICS
+
+log = logging.getLogger("trends")
+
+METRICS.describe("trends_service_requests_total", "Service requests by endpoint and status.")
+METRICS.describe("trends_service_queue_seconds", "Time fetch jobs waited in the service queue.")
+
+ENDPOINTS = ("/fetch", "/health", "/metrics")
+
+class QueueFull(Exception):
+    pass
+
+@dataclass
+class _Job:
+    input: str
+    options: Dict[str, Any]
+    sections: Optional[List[str]]
+    future: Future = field(default_factory=Future)
+    queued: float = field(default_factory=time.perf_counter)
+
+class TrendsService:
+    """
+    Long-running front end for TrendsClient.fetch, so callers skip the
+    per-process import, settings and handshake cost of the CLI. Jobs go
+    through a bounded queue served by a fixed set of worker threads that
+    share one warm client (sessions, cache, limiter and single-flight).
+
+        POST /fetch    {"input": "...", "options": {...}, "sections": [...]}
+        GET  /health   queue depth, job counts, session/cache/dedup/rate stats
+        GET  /metrics  Prometheus text exposition of the run metrics
+
+    A full queue answers 503 with Retry-After instead of piling up requests.
+    """
+
+    def __init__(self, client: TrendsClient, workers: int = 4, queue_size: int = 64, timeout: float = 120.0) -> None:
+        self.client = client
+        self.workers = max(int(workers), 1)
+        self.timeout = timeout
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=max(int(queue_size), 1))
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {"accepted": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"trends-service-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def warm(self) -> None:
+        """
+        Open one session up front so the first request skips the handshake.
+        """
+        opts = self.client.opts
+        try:
+            with self.client.pool.lease(opts.hl, opts.tz, self.client.proxy, throttle=self.client._throttle):
+                pass
+        except Exception as e:
+            log.warning(f"Could not warm a session: {e}")
+
+    def submit(self, input_url_or_term: str, options: Optional[Dict[str, Any]] = None, sections: Optional[List[str]] = None) -> Future:
+        """
+        Queue one fetch; raises QueueFull when the queue is at capacity and
+        ValueError for options/sections that can never succeed.
+        """
+        if sections is not None:
+            normalize_sections(sections)
+        merged = {**asdict(self.client.opts), **(options or {})}
+        options_from_dict(merged)  # reject bad tz/category/sleep before queueing
+        job = _Job(input_url_or_term, merged, sections)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.counts["rejected"] += 1
+            raise QueueFull() from None
+        with self._lock:
+            self.counts["accepted"] += 1
+        return job.future
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue  # the caller gave up while it was queued
+            METRICS.observe("trends_service_queue_seconds", time.perf_counter() - job.queued)
+            try:
+                payload = self.client.fetch(job.input, override=options_from_dict(job.options), sections=job.sections)
+            except BaseException as e:
+                with self._lock:
+                    self.counts["failed"] += 1
+                job.future.set_exception(e)
+            else:
+                with self._lock:
+                    self.counts["done"] += 1
+                job.future.set_result(payload)
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout=self.timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        client = self.client
+        with self._lock:
+            out: Dict[str, Any] = {
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "jobs": dict(self.counts),
+            }
+        out["sessions"] = client.pool.stats()
+        if client.cache is not None:
+            out["cache"] = client.cache.stats()
+        if client.flights is not None:
+            out["dedup"] = client.flights.stats()
+        if client.limiter is not None and hasattr(client.limiter, "stats"):
+            out["rate_limit"] = client.limiter.stats()
+        return out
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    service: TrendsService
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 (BaseHTTPRequestHandler signature)
+        log.debug(f"{self.address_string()} {format % args}")
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send(self, status: int, body: Any, content_type: str = "application/json; charset=utf-8", headers: Optional[Dict[str, str]] = None) -> None:
+        data = (body if isinstance(body, str) else json.dumps(body, ensure_ascii=False, default=json_default)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+        path = self.path.split("?", 1)[0]
+        METRICS.inc("trends_service_requests_total", endpoint=path if path in ENDPOINTS else "other", status=status)
+
+    def _error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, {"error": message}, headers=headers)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send(200, self.service.stats())
+        elif path == "/metrics":
+            self._send(200, METRICS.to_prometheus(), "text/plain; version=0.0.4")
+        else:
+            self._error(404, "not found")
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if self.path.split("?", 1)[0] != "/fetch":
+            self._error(404, "not found")
+            return
+        try:
+            body = json.loads(raw or b"{}")
+            if not isinstance(body, dict) or not isinstance(body.get("input"), str) or not body["input"].strip():
+                raise ValueError("expected a JSON object with a non-empty 'input'")
+            options = body.get("options") or {}
+            if not isinstance(options, dict):
+                raise ValueError("'options' must be an object")
+            sections = body.get("sections")
+            if sections is not None and not isinstance(sections, list):
+                raise ValueError("'sections' must be a list")
+            timeout = float(body.get("timeout") or self.service.timeout)
+            future = self.service.submit(body["input"], options, sections)
+        except QueueFull:
+            self._error(503, "queue full", headers={"Retry-After": "1"})
+            return
+        except (ValueError, TypeError) as e:
+            self._error(400, str(e))
+            return
+
+        try:
+            payload = future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            self._error(504, f"no result within {timeout:g}s")
+        except THROTTLE_ERRORS as e:
+            self._error(429, f"throttled by Google Trends: {e}", headers={"Retry-After": "60"})
+        except ValueError as e:
+            self._error(400, str(e))
+        except Exception as e:
+            log.warning(f"Service fetch failed for {body['input']!r}: {e}")
+            self._error(502, f"{type(e).__name__}: {e}")
+        else:
+            self._send(200, payload)
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service: TrendsService, address: str) -> Tuple[socketserver.BaseServer, str]:
+    """
+    Bind ``address`` ("host:port" or "unix:/path/to.sock"); returns the
+    server and a printable URL.
+    """
+    handler = type("Handler", (ServiceHandler,), {"service": service})
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            os.remove(path)  # stale socket of a previous run
+        return ThreadingUnixHTTPServer(path, handler), address
+    host, _, port = address.rpartition(":")
+    server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+    server.daemon_threads = True
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}"
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pytrends import exceptions
+from pytrends.request import BASE_TRENDS_URL, TrendReq
+
+from utils.metrics import METRICS
+
+# Raised once urllib3's retries are exhausted on 429s, or by pytrends itself.
+THROTTLE_ERRORS = (exceptions.TooManyRequestsError, requests.exceptions.RetryError)
+
+class SessionTrendReq(TrendReq):
+    """
+    TrendReq that keeps a single requests.Session for its whole lifetime.
+
+    Stock pytrends opens a new session (and TCP/TLS connection) for every
+    call; here the cookie handshake and connection pool are paid once and
+    reused for every payload built on this object.
+    """
+
+    def __init__(
+        self,
+        hl: str = "en-US",
+        tz: int = 0,
+        timeout: Tuple[float, float] = (2, 5),
+        proxy: str = "",
+        retries: int = 2,
+        backoff_factor: float = 0.0,
+        base_url: str = "",
+        feedback: Optional[Callable[[int], None]] = None,
+        retry_throttled: bool = True,
+    ) -> None:
+        # stand-in for BASE_TRENDS_URL, e.g. a local replay server
+        self.base_url = base_url.rstrip("/")
+        # receives every response status (0 = connection error), e.g. AdaptiveRateLimiter.feedback
+        self.feedback = feedback
+        self.session = requests.Session()
+        if retries > 0 or backoff_factor > 0:
+            retry = Retry(
+                total=retries,
+                read=retries,
+                connect=retries,
+                backoff_factor=backoff_factor,
+                # with retry_throttled=False a 429 surfaces at once, so the caller can slow down first
+                status_forcelist=[c for c in TrendReq.ERROR_CODES if retry_throttled or c != 429],
+                allowed_methods=frozenset(["GET", "POST"]),
+            )
+            adapter = HTTPAdapter(max_retries=retry)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        if proxy:
+            self.session.proxies.update({"https": proxy})
+        started = time.perf_counter()
+        super().__init__(hl=hl, tz=tz, timeout=timeout, retries=retries, backoff_factor=backoff_factor)
+        self.handshake_seconds = time.perf_counter() - started
+        self.session.headers.update(self.headers)
+
+    def GetGoogleCookie(self) -> Dict[str, str]:
+        with METRICS.timer("trends_handshake_seconds"):
+            resp = self._request("GET", f"{BASE_TRENDS_URL}/explore/?geo={self.hl[-2:]}", timeout=self.timeout)
+        return {k: v for k, v in resp.cookies.items() if k == "NID"}
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send one request and record latency, status codes (including the
+        attempts urllib3 retried), retries and bytes received.
+        """
+        if self.base_url and url.startswith(BASE_TRENDS_URL):
+            url = self.base_url + url[len(BASE_TRENDS_URL):]
+        endpoint = url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1] or "explore"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            METRICS.inc("trends_http_errors_total", endpoint=endpoint, error=type(e).__name__)
+            if self.feedback is not None:
+                self.feedback(429 if isinstance(e, requests.exceptions.RetryError) else 0)
+            raise
+        finally:
+            METRICS.observe("trends_http_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+        retries = getattr(response.raw, "retries", None)
+        for attempt in getattr(retries, "history", ()) or ():
+            METRICS.inc("trends_http_retries_total", endpoint=endpoint)
+            if attempt.status is not None:
+                METRICS.inc("trends_http_responses_total", endpoint=endpoint, status=attempt.status)
+                if self.feedback is not None:
+                    self.feedback(attempt.status)
+        METRICS.inc("trends_http_responses_total", endpoint=endpoint, status=response.status_code)
+        if self.feedback is not None:
+            self.feedback(response.status_code)
+        METRICS.inc("trends_http_bytes_received_total", len(response.content), endpoint=endpoint)
+        return response
+
+    def _get_data(self, url: str, method: str = TrendReq.GET_METHOD, trim_chars: int = 0, **kwargs: Any) -> Any:
+        http_method = "POST" if method == TrendReq.POST_METHOD else "GET"
+        response = self._request(
+            http_method, url, timeout=self.timeout, cookies=self.cookies, **kwargs, **self.requests_args
+        )
+        content_type = response.headers.get("Content-Type", "")
+        if response.status_code == 200 and any(
+            t in content_type for t in ("application/json", "application/javascript", "text/javascript")
+        ):
+            # some responses start with garbage characters, like ")]}',"
+            return json.loads(response.text[trim_chars:])
+        if response.status_code == requests.codes.too_many_requests:
+            raise exceptions.TooManyRequestsError.from_response(response)
+        raise exceptions.ResponseError.from_response(response)
+
+    def close(self) -> None:
+        self.session.close()
+
+@dataclass
+class _Pooled:
+    py: SessionTrendReq
+    created: float
+    uses: int = 0
+
+@dataclass
+class SessionPool:
+    """
+    Pool of warm SessionTrendReq objects keyed by (hl, tz, proxy).
+
+    A leased session is used by one thread at a time. Sessions are
+    recycled after ``max_uses`` leases, after ``max_age`` seconds, or
+    immediately when the lease ends in a 429.
+    """
+    max_uses: int = 200
+    max_age: float = 30 * 60.0
+    max_idle: int = 8  # idle sessions kept per key
+    timeout: Tuple[float, float] = (2, 5)
+    retries: int = 2
+    backoff_factor: float = 1.0
+    base_url: str = ""  # replaces https://trends.google.com/trends when set
+    feedback: Optional[Callable[[int], None]] = None  # status callback for every session
+    retry_throttled: bool = True  # let urllib3 retry 429s itself
+    handshakes: int = 0
+    handshake_seconds: float = 0.0
+    reuses: int = 0
+    recycled: int = 0
+    _idle: Dict[Tuple[str, int, str], List[_Pooled]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def _healthy(self, entry: _Pooled) -> bool:
+        return entry.uses < self.max_uses and time.monotonic() - entry.created < self.max_age
+
+    def _checkout(self, key: Tuple[str, int, str], throttle: Optional[Callable[[], None]] = None) -> _Pooled:
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                entry = idle.pop()
+                if self._healthy(entry):
+                    self.reuses += 1
+                    return entry
+                self.recycled += 1
+                entry.py.close()
+        if throttle is not None:
+            throttle()  # only a new session makes the cookie handshake request
+        hl, tz, proxy = key
+        py = SessionTrendReq(
+            hl=hl,
+            tz=tz,
+            timeout=self.timeout,
+            proxy=proxy,
+            retries=self.retries,
+            backoff_factor=self.backoff_factor,
+            base_url=self.base_url,
+            feedback=self.feedback,
+            retry_throttled=self.retry_throttled,
+        )
+        with self._lock:
+            self.handshakes += 1
+            self.handshake_seconds += py.handshake_seconds
+        return _Pooled(py=py, created=time.monotonic())
+
+    @contextmanager
+    def lease(
+        self, hl: str, tz: int, proxy: str = "", throttle: Optional[Callable[[], None]] = None
+    ) -> Iterator[SessionTrendReq]:
+        """
+        Lease a warm session, or a new one; ``throttle`` is called before
+        the cookie handshake of a new session (e.g. to take a rate-limit token).
+        """
+        key = (hl, int(tz), proxy)
+        entry = self._checkout(key, throttle)
+        throttled = False
+        try:
+            yield entry.py
+        except THROTTLE_ERRORS:
+            throttled = True
+            raise
+        finally:
+            entry.uses += 1
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if throttled or not self._healthy(entry) or len(idle) >= self.max_idle:
+                    self.recycled += 1
+                    entry.py.close()
+                else:
+                    idle.append(entry)
+
+    def close(self) -> None:
+        with self._lock:
+            for idle in self._idle.values():
+                for entry in idle:
+                    entry.py.close()
+            self._idle.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            avg = self.handshake_seconds / self.handshakes if self.handshakes else 0.0
+            return {
+                "handshakes": self.handshakes,
+                "reuses": self.reuses,
+                "recycled": self.recycled,
+                "avg_handshake_seconds": round(avg, 3),
+                "handshake_seconds_saved": round(avg * self.reuses, 3),
+            }
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+import numpy as np
+
+def overlap_scale(ref: np.ndarray, new: np.ndarray) -> float:
+    """
+    Least-squares factor ``k`` minimizing ``|ref - k * new|`` over the points
+    where both series have signal. Works column-wise on 2-D input and returns
+    one factor for all columns (they share Google's normalization).
+    Returns NaN when the overlap carries no signal.
+    """
+    ref = np.asarray(ref, dtype=float)
+    new = np.asarray(new, dtype=float)
+    mask = (ref > 0) & (new > 0)
+    if not mask.any():
+        return float("nan")
+    denom = float(np.sum(new[mask] ** 2))
+    return float(np.sum(ref[mask] * new[mask]) / denom) if denom > 0 else float("nan")
+
+def relative_drift(ref: np.ndarray, fitted: np.ndarray) -> float:
+    """
+    Mean absolute error of ``fitted`` against ``ref``, relative to the mean
+    level of ``ref`` (0 = perfect agreement).
+    """
+    ref = np.asarray(ref, dtype=float)
+    fitted = np.asarray(fitted, dtype=float)
+    if ref.size == 0:
+        return float("inf")
+    level = max(float(np.mean(np.abs(ref))), 1.0)
+    return float(np.mean(np.abs(ref - fitted)) / level)
+
+def normalize_peak(values: np.ndarray, peak: float = 100.0) -> np.ndarray:
+    """
+    Rescale so the maximum is ``peak`` (Google's 0-100 convention).
+    """
+    values = np.asarray(values, dtype=float)
+    top = float(values.max()) if values.size else 0.0
+    return values * (peak / top) if top > 0 else values
+
+def resample_mean(times: np.ndarray, values: np.ndarray, origin: int, step: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Average a finer series into buckets of ``step`` seconds aligned on
+    ``origin`` (e.g. daily points into the weeks of a stored weekly series).
+    Returns (bucket start times, bucket means, points per bucket).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=float).reshape(len(times), -1)
+    if times.size == 0:
+        return times, values, np.zeros(0, dtype=np.int64)
+    bucket = (times - origin) // step
+    uniq, inverse, counts = np.unique(bucket, return_inverse=True, return_counts=True)
+    sums = np.zeros((len(uniq), values.shape[1]))
+    np.add.at(sums, inverse, values)
+    return origin + uniq * step, sums / counts[:, None], counts
+
+def stitch_windows(windows: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, List[float]]:
+    """
+    Chain overlapping, independently normalized windows into one series.
+
+    ``windows`` are (times, values[n, terms]) pairs ordered by start time.
+    Each window is scaled onto the series stitched so far using its overlap
+    (see overlap_scale); overlapping points are averaged. Returns the union
+    of times, the stitched values (scale of the first window) and the factor
+    applied to each window. A window without usable overlap keeps factor 1.
+    """
+    all_times = np.unique(np.concatenate([np.asarray(t, dtype=np.int64) for t, _ in windows]))
+    width = max(np.asarray(v).reshape(len(t), -1).shape[1] for t, v in windows)
+    sums = np.zeros((len(all_times), width))
+    counts = np.zeros(len(all_times))
+    factors: List[float] = []
+    for times, values in windows:
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=float).reshape(len(times), -1)
+        idx = np.searchsorted(all_times, times)
+        seen = counts[idx] > 0
+        k = 1.0
+        if seen.any():
+            current = sums[idx[seen]] / counts[idx[seen], None]
+            fitted = overlap_scale(current, values[seen])
+            if np.isfinite(fitted):
+                k = fitted
+        factors.append(k)
+        sums[idx] += values * k
+        counts[idx] += 1
+    stitched = sums / np.maximum(counts, 1)[:, None]
+    return all_times, stitched, factors
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .exporter import WORLDWIDE_PARTITION, _payload_terms, region_long_rows, timeline_long_rows
+from .geosweep import GEO_LEVEL_RESOLUTIONS, GEO_LEVEL_SECTIONS
+from utils.metrics import METRICS
+
+DAY = 86400
+
+# Columns identifying one request; with the term they prefix every key.
+REQUEST_COLUMNS = ("geo", "timeframe", "gprop", "category", "comparison", "mode")
+# How a payload was fetched (its fetchMode); plain fetches carry none.
+PLAIN_MODE = "plain"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timeline (
+    term TEXT NOT NULL,
+    geo TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    gprop TEXT NOT NULL,
+    category INTEGER NOT NULL,
+    comparison TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    is_partial INTEGER NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (term, geo, timeframe, gprop, category, comparison, mode, timestamp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS timeline_fetched ON timeline (term, geo, fetched_at);
+
+CREATE TABLE IF NOT EXISTS regions (
+    term TEXT NOT NULL,
+    geo TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    gprop TEXT NOT NULL,
+    category INTEGER NOT NULL,
+    comparison TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    geo_name TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    geo_code TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (term, geo, timeframe, gprop, category, comparison, mode, resolution, geo_name, timestamp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS regions_fetched ON regions (term, geo, fetched_at);
+
+CREATE TABLE IF NOT EXISTS related (
+    term TEXT NOT NULL,
+    geo TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    gprop TEXT NOT NULL,
+    category INTEGER NOT NULL,
+    comparison TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    label TEXT NOT NULL,
+    topic_type TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    value INTEGER,
+    formatted_value TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (term, geo, timeframe, gprop, category, comparison, mode, kind, bucket, label, topic_type, timestamp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS related_fetched ON related (term, geo, fetched_at);
+"""
+
+# Columns written per table, key columns first (see SCHEMA).
+COLUMNS = {
+    "timeline": ("term", *REQUEST_COLUMNS, "timestamp", "value", "is_partial", "fetched_at"),
+    "regions": ("term", *REQUEST_COLUMNS, "resolution", "geo_name", "timestamp", "geo_code", "value", "fetched_at"),
+    "related": (
+        "term", *REQUEST_COLUMNS, "kind", "bucket", "label", "topic_type", "timestamp",
+        "rank", "value", "formatted_value", "fetched_at",
+    ),
+}
+KEY_LENGTHS = {"timeline": 8, "regions": 10, "related": 12}
+# Row order of query results.
+ORDER = {
+    "timeline": COLUMNS["timeline"][:8],
+    "regions": COLUMNS["regions"][:10],
+    "related": ("term", *REQUEST_COLUMNS, "kind", "bucket", "timestamp", "rank"),
+}
+SECTIONS = tuple(COLUMNS)
+
+# Payload keys of the related lists: (kind, bucket).
+RELATED_KEYS = {
+    "relatedTopics_top": ("topics", "top"),
+    "relatedTopics_rising": ("topics", "rising"),
+    "relatedQueries_top": ("queries", "top"),
+    "relatedQueries_rising": ("queries", "rising"),
+}
+
+METRICS.describe("trends_store_rows_total", "Rows upserted into the history store, by table.")
+
+def _upsert(table: str) -> str:
+    cols = COLUMNS[table]
+    key = cols[:KEY_LENGTHS[table]]
+    updates = ", ".join(f"{c} = excluded.{c}" for c in cols[len(key):])
+    return (
+        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates} "
+        f"WHERE excluded.fetched_at >= {table}.fetched_at"
+    )
+
+def _request(cols: Dict[str, List[Any]], i: int, comparison: str, mode: str) -> Tuple[Any, ...]:
+    return (cols["geo"][i], cols["timeframe"][i], cols["gprop"][i], cols["category"][i], comparison, mode)
+
+def _sweep_resolution(geo: str) -> str:
+    # resolution of the parent breakdown a swept geo's row came from
+    return GEO_LEVEL_RESOLUTIONS[GEO_LEVEL_SECTIONS[geo.count("-") + 1]]
+
+class TrendStore:
+    """
+    Local SQLite history of fetched results, one row per point:
+
+    - ``timeline``: (term, request, timestamp) -> value, is_partial
+    - ``regions``: (term, request, resolution, region, fetch day) -> value
+    - ``related``: (term, request, topics/queries, top/rising, label, fetch day) -> rank, value
+
+    A request is (geo, timeframe, gprop, category, comparison, mode), where
+    ``comparison`` is the full set of terms the values were scaled against
+    (the payload's searchTerm, or the packedSearchTerm of a packed request
+    including its anchor) and ``mode`` the payload's fetchMode (plain,
+    packed, long_range, incremental): values are only comparable within
+    one comparison fetched one way. Writes
+    are upserts, so points that repeated fetches have in common are kept
+    once, holding the most recent fetch; region and related rows have no
+    time of their own and are kept once per day they were fetched.
+    Worldwide results are stored under geo WORLD, as in the columnar
+    exports.
+
+    Writes are committed every ``commit_every`` payloads and on close().
+    A ``readonly`` store opens an existing file for queries only, without
+    creating the schema or touching the journal mode.
+    """
+
+    def __init__(self, path: str | Path, commit_every: int = 50, readonly: bool = False) -> None:
+        self.path = Path(path)
+        self.commit_every = max(int(commit_every), 1)
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._pending = 0
+        if readonly:
+            self._conn = sqlite3.connect(self.path.resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "TrendStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def rows(payload: Mapping[str, Any], fetched_at: int) -> Dict[str, List[Tuple[Any, ...]]]:
+        """
+        Rows of one payload for each table, in COLUMNS order.
+        """
+        opts = payload.get("options") or {}
+        comparison = str(payload.get("packedSearchTerm") or payload.get("searchTerm", ""))
+        mode = str(payload.get("fetchMode") or PLAIN_MODE)
+        day = fetched_at - fetched_at % DAY
+        out: Dict[str, List[Tuple[Any, ...]]] = {table: [] for table in COLUMNS}
+
+        t = timeline_long_rows(payload)
+        out["timeline"] = [
+            (t["term"][i], *_request(t, i, comparison, mode), t["timestamp"][i], t["value"][i], int(t["isPartial"][i]), fetched_at)
+            for i in range(len(t["term"]))
+        ]
+        r = region_long_rows(payload)
+        out["regions"] = [
+            (r["term"][i], *_request(r, i, comparison, mode), r["resolution"][i], r["geoName"][i], day, r["geoCode"][i], r["value"][i], fetched_at)
+            for i in range(len(r["term"]))
+        ]
+
+        geo = opts.get("geo", "") or WORLDWIDE_PARTITION
+        base = (geo, opts.get("timeframe", ""), opts.get("gprop", ""), int(opts.get("category", 0) or 0), comparison, mode)
+        if payload.get("interestBy"):
+            # geo sweep: the geo's row of its parent's breakdown, stored with that breakdown
+            parent = (payload.get("interestByParent") or WORLDWIDE_PARTITION, *base[1:])
+            resolution = _sweep_resolution(opts.get("geo", ""))
+            for row in payload["interestBy"]:
+                for term, value in zip(_payload_terms(payload), row.get("value", [])):
+                    out["regions"].append(
+                        (term, *parent, resolution, row.get("geoName", ""), day, row.get("geoCode") or "", int(value), fetched_at)
+                    )
+        for key, (kind, bucket) in RELATED_KEYS.items():
+            for rank, item in enumerate(payload.get(key) or [], 1):
+                topic = item.get("topic") or {}
+                label = topic.get("title", "") if kind == "topics" else item.get("query", "")
+                out["related"].append(
+                    (
+                        str(item.get("term", "")), *base, kind, bucket, str(label), str(topic.get("type", "")), day,
+                        rank, item.get("value"), str(item.get("formattedValue", item.get("value", ""))), fetched_at,
+                    )
+                )
+        return out
+
+    def write(self, payload: Mapping[str, Any], fetched_at: Optional[float] = None) -> int:
+        """
+        Upsert one payload; returns the number of rows written.
+        """
+        rows = self.rows(payload, int(fetched_at if fetched_at is not None else time.time()))
+        written = 0
+        with self._lock:
+            for table, values in rows.items():
+                if values:
+                    self._conn.executemany(_upsert(table), values)
+                    METRICS.inc("trends_store_rows_total", len(values), table=table)
+                    written += len(values)
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+        return written
+
+    def write_many(self, payloads: Iterable[Mapping[str, Any]]) -> int:
+        return sum(self.write(p) for p in payloads)
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if not self.readonly:
+                self._conn.commit()
+            self._conn.close()
+
+    def query(
+        self,
+        section: str,
+        term: Optional[str] = None,
+        geo: Optional[str] = None,
+        timeframe: Optional[str] = None,
+        gprop: Optional[str] = None,
+        category: Optional[int] = None,
+        comparison: Optional[str] = None,
+        mode: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        fetched_since: Optional[int] = None,
+        latest: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stored rows of one section (timeline, regions or related) in key
+        order; None filters match anything. ``since``/``until`` bound the
+        row timestamp (the point time of timelines, the fetch day
+        otherwise) and ``fetched_since`` the time of the fetch that wrote
+        it. With ``latest`` only the most recent fetch day of every
+        request is returned for regions and related.
+        """
+        if section not in COLUMNS:
+            raise ValueError(f"Unknown store section: {section!r}. Choose from: {', '.join(SECTIONS)}")
+        where: List[str] = []
+        params: List[Any] = []
+        filters = (
+            ("term = ?", term),
+            ("geo = ?", (geo or WORLDWIDE_PARTITION) if geo is not None else None),
+            ("timeframe = ?", timeframe),
+            ("gprop = ?", gprop),
+            ("category = ?", category),
+            ("comparison = ?", comparison),
+            ("mode = ?", mode),
+            ("timestamp >= ?", since),
+            ("timestamp <= ?", until),
+            ("fetched_at >= ?", fetched_since),
+        )
+        for clause, value in filters:
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if latest and section != "timeline":
+            group = ", ".join(("term", *REQUEST_COLUMNS))
+            where.append(
+                f"timestamp = (SELECT MAX(timestamp) FROM {section} AS l "
+                f"WHERE ({', '.join('l.' + c for c in ('term', *REQUEST_COLUMNS))}) = ({group}))"
+            )
+        sql = f"SELECT {', '.join(COLUMNS[section])} FROM {section}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(ORDER[section])
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def timeline(self, term: Optional[str] = None, geo: Optional[str] = None, **filters: Any) -> List[Dict[str, Any]]:
+        return list(self.query("timeline", term, geo, **filters))
+
+    def regions(self, term: Optional[str] = None, geo: Optional[str] = None, **filters: Any) -> List[Dict[str, Any]]:
+        return list(self.query("regions", term, geo, **filters))
+
+    def related(self, term: Optional[str] = None, geo: Optional[str] = None, **filters: Any) -> List[Dict[str, Any]]:
+        return list(self.query("related", term, geo, **filters))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in COLUMNS}
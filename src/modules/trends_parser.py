@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-import json
+import copy
+import logging
 import re
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
+import numpy as np
 import pandas as pd
 from pytrends.request import TrendReq
 
@@ -16,6 +22,52 @@ from .data_cleaner import (
     related_topics_to_list,
     related_queries_to_list,
 )
+from .cache import ResponseCache
+from .dedup import RELATED_SECTIONS, RequestKey, SingleFlight, relabel_related, reorder_sections
+from .ratelimit import TokenBucket
+from .sessions import THROTTLE_ERRORS, SessionPool
+from .packing import PackedGroup, split_sections, rescale_to_anchor
+from .incremental import (
+    MAX_DAILY_WINDOW_DAYS,
+    HistoryStore,
+    TimelineHistory,
+    daily_windows,
+    history_to_timeline,
+    merge_window,
+    window_timeframe,
+)
+from .inputs import iter_records
+from .stitching import normalize_peak, stitch_windows
+from .compact import TimelineArray, compact_section, timeline_arrays
+from .geosweep import GEO_LEVEL_RESOLUTIONS, SweepTarget, match_targets, plan_geo_sweep
+from utils.metrics import METRICS
+
+log = logging.getLogger("trends")
+
+# Independent result sections, in the order fetch() requests them.
+SECTIONS = ("timeline", "subregion", "city", "related_topics", "related_queries")
+
+# Payload keys filled by each section.
+SECTION_KEYS: Dict[str, Tuple[str, ...]] = {
+    "timeline": ("interestOverTime_timelineData",),
+    "subregion": ("interestBySubregion",),
+    "city": ("interestByCity",),
+    "related_topics": ("relatedTopics_top", "relatedTopics_rising"),
+    "related_queries": ("relatedQueries_top", "relatedQueries_rising"),
+}
+
+def normalize_sections(sections: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Validate section names and return them in canonical order.
+    None or an empty selection means every section.
+    """
+    wanted = {s.strip().lower() for s in (sections or []) if s and s.strip()}
+    if not wanted:
+        return SECTIONS
+    unknown = wanted.difference(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(SECTIONS)}")
+    return tuple(s for s in SECTIONS if s in wanted)
 
 @dataclass
 class TrendsOptions:
@@ -27,9 +79,35 @@ class TrendsOptions:
     category: int = 0
     sleep: float = 1.0
 
+def options_from_dict(d: Dict[str, Any]) -> TrendsOptions:
+    return TrendsOptions(
+        hl=d.get("hl", "en-US"),
+        tz=int(d.get("tz", 0)),
+        geo=d.get("geo", ""),
+        timeframe=d.get("timeframe", "today 12-m"),
+        gprop=d.get("gprop", ""),
+        category=int(d.get("category", 0)),
+        sleep=float(d.get("sleep", 1.0)),
+    )
+
 @dataclass
 class TrendsClient:
     opts: TrendsOptions = field(default_factory=TrendsOptions)
+    cache: Optional[ResponseCache] = None
+    limiter: Optional[TokenBucket] = None  # shared across threads
+    pool: SessionPool = field(default_factory=SessionPool)
+    proxy: str = ""
+    sections: Tuple[str, ...] = SECTIONS  # default selection for fetch()
+    history: Optional[HistoryStore] = None  # timeline store for fetch_incremental()
+    flights: Optional[SingleFlight] = None  # collapses identical requests across inputs
+    throttle_retries: int = 0  # per-section retries after a 429, paced by the limiter
+    section_workers: int = 1  # concurrent section requests per payload (1 = one after another)
+
+    def _throttle(self, calls: int = 1) -> None:
+        if self.limiter is not None:
+            waited = self.limiter.acquire(calls)
+            if waited:
+                METRICS.inc("trends_throttle_wait_seconds_total", waited)
 
     def _from_url(self, url: str) -> Tuple[List[str], TrendsOptions]:
         """
@@ -56,6 +134,10 @@ class TrendsClient:
         return terms or [qs.get("q", "")], opts
 
     def _build(self, py: TrendReq, kw_list: List[str], opts: TrendsOptions) -> None:
+        self._throttle()
+        # build_payload keeps the previous geo when given "" (worldwide), so a
+        # pooled session would carry the last input's country over
+        py.geo = opts.geo
         py.build_payload(
             kw_list=kw_list,
             cat=opts.category,
@@ -64,10 +146,9 @@ class TrendsClient:
             gprop=opts.gprop,
         )
 
-    def fetch(self, input_url_or_term: str, override: Optional[TrendsOptions] = None) -> Dict[str, Any]:
+    def resolve(self, input_url_or_term: str, override: Optional[TrendsOptions] = None) -> Tuple[List[str], TrendsOptions]:
         """
-        Fetch data from Google Trends for a term or a Trends URL.
-        Returns a dictionary aligned with the README's expected output schema.
+        Resolve a term or Trends URL into the keyword list and effective options.
         """
         opts = override or self.opts
         terms = [input_url_or_term]
@@ -83,32 +164,280 @@ class TrendsClient:
         kw_list = [t for t in terms if t]
         if not kw_list:
             raise ValueError("No valid search term(s) parsed from input.")
+        return kw_list, opts
+
+    def _fetch_section(self, py: TrendReq, section: str) -> Any:
+        """
+        Run the backend call(s) for one section and convert to the output schema.
+        """
+        with METRICS.timer("trends_section_seconds", section=section):
+            return self._run_section(py, section)
+
+    def _run_section(self, py: TrendReq, section: str) -> Any:
+        if section == "related_topics":
+            self._throttle(max(len(py.related_topics_widget_list), 1))
+        elif section == "related_queries":
+            self._throttle(max(len(py.related_queries_widget_list), 1))
+        else:
+            self._throttle()
+        if section == "timeline":
+            iot_df = df_reset_and_fill(py.interest_over_time())
+            return timeline_to_list(iot_df, [c for c in iot_df.columns if c not in ("date", "isPartial")])
+        if section in ("subregion", "city"):
+            resolution = "REGION" if section == "subregion" else "CITY"
+            region_df = df_reset_and_fill(py.interest_by_region(resolution=resolution))
+            if "geoCode" not in region_df.columns and not region_df.empty:
+                # Attempt to preserve ISO codes if present in index names (not always available)
+                region_df["geoCode"] = None
+            return region_to_list(region_df)
+        if section in GEO_LEVEL_RESOLUTIONS:
+            # parent breakdown of a geo sweep: every geo with its code, low volume included
+            resolution = GEO_LEVEL_RESOLUTIONS[section]
+            # pytrends applies the resolution for worldwide and US requests;
+            # elsewhere the widget already defaults to the next level down
+            region_df = df_reset_and_fill(py.interest_by_region(resolution=resolution, inc_low_vol=True, inc_geo_code=True))
+            return region_to_list(region_df)
+        if section == "related_topics":
+            return related_topics_to_list(py.related_topics())
+        if section == "related_queries":
+            return related_queries_to_list(py.related_queries())
+        raise ValueError(f"Unknown section: {section}")
+
+    def _fetch_sections(
+        self, kw_list: List[str], opts: TrendsOptions, sections: Optional[Tuple[str, ...]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch the requested sections for one payload (up to five keywords).
+        Identical requests (see RequestKey) share one fetch when the client
+        has a SingleFlight.
+        """
+        sections = tuple(sections or self.sections)
+
+        def run() -> Tuple[List[str], Dict[str, Any]]:
+            fetcher = _SectionFetcher(self, kw_list, opts)
+            try:
+                return list(kw_list), fetcher.get_many(sections, self.section_workers)
+            finally:
+                fetcher.close()
+
+        if self.flights is None:
+            return run()[1]
+        (fetched, data), shared = self.flights.do(RequestKey.of(kw_list, opts, sections), run)
+        if shared:
+            log.debug(f"Reusing the result of an identical request for {', '.join(kw_list)}.")
+            data = reorder_sections(data, fetched, kw_list)
+        return data
+
+    def fetch(
+        self,
+        input_url_or_term: str,
+        override: Optional[TrendsOptions] = None,
+        sections: Optional[List[str]] = None,
+        lazy: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Fetch data from Google Trends for a term or a Trends URL.
+        Returns a dictionary aligned with the README's expected output schema.
+
+        Only the given ``sections`` (default: the client's) are requested and
+        present in the result. With ``lazy=True`` a TrendsResult is returned
+        that requests each section the first time one of its keys is read.
+        """
+        kw_list, opts = self.resolve(input_url_or_term, override)
+        selected = normalize_sections(sections) if sections is not None else self.sections
+        if lazy:
+            return TrendsResult(self, input_url_or_term, kw_list, opts, selected)
+        data = self._fetch_sections(kw_list, opts, selected)
+        return self._assemble(input_url_or_term, kw_list, opts, data)
+
+    def fetch_incremental(
+        self,
+        input_url_or_term: str,
+        override: Optional[TrendsOptions] = None,
+        overlap_points: int = 4,
+        drift_threshold: float = 0.15,
+    ) -> Dict[str, Any]:
+        """
+        Like fetch(), but the timeline is refreshed against the locally stored
+        history: only a short daily window overlapping the stored series is
+        requested, rescaled on the overlap and appended. The full timeframe is
+        refetched when there is no history yet, the window cannot be stitched,
+        or the rescaled overlap drifts more than ``drift_threshold``.
+        The payload carries fetchMode "incremental".
+        """
+        if self.history is None:
+            raise ValueError("Incremental mode needs a HistoryStore (TrendsClient.history).")
+        kw_list, opts = self.resolve(input_url_or_term, override)
+        key = ResponseCache.key(kw_list, opts)
+
+        stored = self.history.load(key)
+        merged: Optional[TimelineHistory] = None
+        if stored is not None and stored.terms == kw_list:
+            tf = window_timeframe(stored, overlap_points)
+            if tf is not None:
+                window = self._fetch_sections(kw_list, replace(opts, timeframe=tf), ("timeline",))["timeline"]
+                merged, drift = merge_window(stored, window, drift_threshold)
+                if merged is None:
+                    log.info(f"Incremental refresh of {', '.join(kw_list)} drifted ({drift:.2f}); refetching.")
+        if merged is None:
+            full = self._fetch_sections(kw_list, opts, ("timeline",))["timeline"]
+            merged = TimelineHistory.from_timeline(kw_list, full)
+        self.history.save(key, merged)
+
+        data = {"timeline": history_to_timeline(merged, opts.timeframe)}
+        others = tuple(s for s in self.sections if s != "timeline")
+        if others:
+            data.update(self._fetch_sections(kw_list, opts, others))
+        return dict(self._assemble(input_url_or_term, kw_list, opts, data), fetchMode="incremental")
 
-        py = TrendReq(hl=opts.hl, tz=opts.tz, retries=2, backoff_factor=opts.sleep)
+    def fetch_long_range(
+        self,
+        input_url_or_term: str,
+        override: Optional[TrendsOptions] = None,
+        window_days: int = MAX_DAILY_WINDOW_DAYS,
+        overlap_days: int = 30,
+        workers: int = 4,
+    ) -> Dict[str, Any]:
+        """
+        Like fetch(), but a ``YYYY-MM-DD YYYY-MM-DD`` timeframe longer than
+        one daily-resolution window gets a daily timeline: the range is split
+        into overlapping windows that are fetched concurrently (under the
+        shared limiter; one after another with ``workers`` <= 1) and
+        chained onto one scale on their overlaps; such payloads carry
+        fetchMode "long_range". Other timeframes fall back to fetch().
+        """
+        kw_list, opts = self.resolve(input_url_or_term, override)
+        windows = daily_windows(opts.timeframe, window_days, overlap_days) if "timeline" in self.sections else None
+        if not windows:
+            return self.fetch(input_url_or_term, override)
+
+        def fetch_window(tf: str) -> List[Dict[str, Any]]:
+            return self._fetch_sections(kw_list, replace(opts, timeframe=tf), ("timeline",))["timeline"]
 
-        self._build(py, kw_list, opts)
+        if workers <= 1:
+            parts = [fetch_window(tf) for tf in windows]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(windows))) as pool:
+                parts = list(pool.map(fetch_window, windows))
+        log.info(f"Fetched {', '.join(kw_list)} as {len(windows)} daily windows.")
+
+        data = {"timeline": self._stitch_timeline(parts, len(kw_list))}
+        others = tuple(s for s in self.sections if s != "timeline")
+        if others:
+            data.update(self._fetch_sections(kw_list, opts, others))
+        return dict(self._assemble(input_url_or_term, kw_list, opts, data), fetchMode="long_range")
 
-        # Timeline
-        iot_df = df_reset_and_fill(py.interest_over_time())
+    def sweep_targets(
+        self, input_url_or_term: str, geos: Iterable[str], override: Optional[TrendsOptions] = None
+    ) -> List[SweepTarget]:
+        """
+        Plan a geo sweep of one input: the region breakdown of each parent
+        geo is requested once (e.g. REGION of US for US-CA, US-NY, ...) and
+        every swept geo is paired with its row of it (see plan_geo_sweep).
+        """
+        kw_list, opts = self.resolve(input_url_or_term, override)
+        targets: List[SweepTarget] = []
+        for group in plan_geo_sweep(geos):
+            rows = self._fetch_sections(kw_list, replace(opts, geo=group.parent), (group.section,))[group.section]
+            matched = match_targets(group, rows)
+            missing = [t.geo for t in matched if t.row is None]
+            if missing:
+                log.warning(f"No interest for {', '.join(missing)} in the {group.parent or 'worldwide'} breakdown.")
+            targets.extend(matched)
+        return targets
 
-        # Regions
-        subregion_df = df_reset_and_fill(py.interest_by_region(resolution="REGION"))
-        if "geoCode" not in subregion_df.columns and not subregion_df.empty:
-            # Attempt to preserve ISO codes if present in index names (not always available)
-            subregion_df["geoCode"] = None
+    def fetch_sweep_target(
+        self,
+        input_url_or_term: str,
+        target: SweepTarget,
+        override: Optional[TrendsOptions] = None,
+        sections: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Payload of one swept geo: its row of the parent breakdown as
+        ``interestBy`` (scaled against the parent's other regions), plus
+        the given sections fetched for the geo itself. Without sections no
+        request is made.
+        """
+        kw_list, opts = self.resolve(input_url_or_term, override)
+        opts = replace(opts, geo=target.geo)
+        selected = normalize_sections(sections) if sections else ()
+        data = self._fetch_sections(kw_list, opts, selected) if selected else {}
+        payload = self._assemble(input_url_or_term, kw_list, opts, data)
+        payload["interestBy"] = [target.row] if target.row is not None else []
+        payload["interestByParent"] = target.parent
+        return payload
 
-        city_df = df_reset_and_fill(py.interest_by_region(resolution="CITY"))
-        if "geoCode" not in city_df.columns and not city_df.empty:
-            city_df["geoCode"] = None
+    def fetch_geo_sweep(
+        self,
+        input_url_or_term: str,
+        geos: Iterable[str],
+        override: Optional[TrendsOptions] = None,
+        sections: Iterable[str] = (),
+        workers: int = 4,
+    ) -> List[Dict[str, Any]]:
+        """
+        One payload per swept geo (see sweep_targets and fetch_sweep_target);
+        per-geo sections are fetched concurrently under the shared limiter.
+        """
+        targets = self.sweep_targets(input_url_or_term, geos, override)
+        if not targets:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets)))) as pool:
+            return list(pool.map(lambda t: self.fetch_sweep_target(input_url_or_term, t, override, sections), targets))
 
-        # Related topics / queries
-        rt = py.related_topics()
-        rq = py.related_queries()
+    @staticmethod
+    def _stitch_timeline(parts: List[List[Dict[str, Any]]], width: int) -> List[Dict[str, Any]]:
+        """
+        Chain per-window timelines (ordered by start) into one 0-100 series.
+        """
+        windows = []
+        partial: Dict[int, bool] = {}
+        for part in parts:
+            if not part:
+                continue
+            times, values, flags = timeline_arrays(part)
+            if values.shape[1] != width:
+                raise ValueError("Window timelines disagree on the number of terms.")
+            windows.append((times, values))
+            # the newest window decides whether a point is still partial
+            partial.update(zip(times.tolist(), flags.tolist()))
+        if not windows:
+            return TimelineArray([], [])
+        times, values, _ = stitch_windows(windows)
+        flags = [partial.get(int(t), False) for t in times.tolist()]
+        return TimelineArray(times, np.rint(normalize_peak(values)).astype(np.int64), flags)
 
-        related_topics = related_topics_to_list(rt)
-        related_queries = related_queries_to_list(rq)
+    def fetch_packed(self, group: PackedGroup, sections: Optional[List[str]] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Fetch a planned group of inputs with a single payload and split the
+        combined sections back into one payload per input; payloads of a
+        packed request carry fetchMode "packed" and the packedSearchTerm
+        their values were scaled against.
+        Returns (input index, payload) pairs.
+        """
+        kw_list = group.kw_list
+        if not kw_list:
+            raise ValueError("No valid search term(s) parsed from input.")
+        selected = normalize_sections(sections) if sections is not None else self.sections
+        data = self._fetch_sections(kw_list, group.opts, selected)
+        if not group.packed:
+            # one keyword list, possibly repeated by alias members
+            return [(m.index, self._assemble(m.input, m.terms, group.opts, data)) for m in group.members]
+        if group.anchor and "timeline" in data:
+            data = dict(data, timeline=rescale_to_anchor(data["timeline"], len(kw_list) - 1))
+        out: List[Tuple[int, Dict[str, Any]]] = []
+        for member in group.members:
+            part = split_sections(data, kw_list, group.position(member))
+            payload = self._assemble(member.input, member.terms, group.opts, part)
+            # values are scaled against the whole request, not the member's term alone
+            payload.update(fetchMode="packed", packedSearchTerm=", ".join(kw_list))
+            out.append((member.index, payload))
+        return out
 
-        result: Dict[str, Any] = {
+    @staticmethod
+    def _header(input_url_or_term: str, kw_list: List[str], opts: TrendsOptions) -> Dict[str, Any]:
+        return {
             "inputUrlOrTerm": input_url_or_term,
             "searchTerm": ", ".join(kw_list),
             "options": {
@@ -119,98 +448,309 @@ class TrendsClient:
                 "gprop": opts.gprop,
                 "category": opts.category,
             },
-            "interestOverTime_timelineData": timeline_to_list(iot_df, [c for c in iot_df.columns if c != "date"]),
-            "interestBySubregion": region_to_list(subregion_df),
-            "interestByCity": region_to_list(city_df),
-            "relatedTopics_top": related_topics["top"],
-            "relatedTopics_rising": related_topics["rising"],
-            "relatedQueries_top": related_queries["top"],
-            "relatedQueries_rising": related_queries["rising"],
         }
+
+    @staticmethod
+    def _section_fields(section: str, value: Any) -> Dict[str, Any]:
+        """
+        Map one converted section onto its payload key(s).
+        """
+        keys = SECTION_KEYS[section]
+        if section in ("related_topics", "related_queries"):
+            value = value or {}
+            return {keys[0]: value.get("top", []), keys[1]: value.get("rising", [])}
+        return {keys[0]: value or []}
+
+    @classmethod
+    def _assemble(cls, input_url_or_term: str, kw_list: List[str], opts: TrendsOptions, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the output payload; sections that were not requested are omitted.
+        """
+        result: Dict[str, Any] = cls._header(input_url_or_term, kw_list, opts)
+        for section in SECTIONS:
+            if section in data:
+                result.update(cls._section_fields(section, data[section]))
         return result
 
+    @staticmethod
+    def summary_row(p: Mapping) -> Dict[str, Any]:
+        """
+        Summary metrics of one payload (a row of to_rows_for_tabular).
+        """
+        # a payload fetched without the timeline section has no average
+        timeline = p.get("interestOverTime_timelineData", []) or []
+        avg_value: Any = 0 if "interestOverTime_timelineData" in p else ""
+        if isinstance(timeline, TimelineArray):
+            mean = timeline.mean()
+            if mean is not None:
+                avg_value = mean
+        elif timeline:
+            all_vals = [v for item in timeline for v in item.get("value", [])]
+            if all_vals:
+                avg_value = sum(all_vals) / max(len(all_vals), 1)
+
+        top_query = next(iter(p.get("relatedQueries_top", [])), {})
+        rising_query = next(iter(p.get("relatedQueries_rising", [])), {})
+
+        row = {
+            "input": p.get("inputUrlOrTerm", ""),
+            "searchTerm": p.get("searchTerm", ""),
+            "geo": (p.get("options") or {}).get("geo", ""),
+            "timeframe": (p.get("options") or {}).get("timeframe", ""),
+            "avgInterest": round(avg_value, 2) if avg_value != "" else "",
+            "topRelatedQuery": top_query.get("query", ""),
+            "topRelatedQueryValue": top_query.get("value", ""),
+            "risingRelatedQuery": rising_query.get("query", ""),
+            "risingRelatedQueryValue": rising_query.get("value", ""),
+        }
+        if "interestBy" in p:
+            # geo sweeps: interest relative to the other regions of the parent geo
+            values = [v for item in p.get("interestBy") or [] for v in item.get("value", [])]
+            row["geoInterest"] = round(sum(values) / len(values), 2) if values else ""
+        return row
+
     @staticmethod
     def to_rows_for_tabular(payloads: List[Dict[str, Any]]) -> pd.DataFrame:
         """
         Flatten payloads into a simple tabular dataframe (one row per input),
         capturing a few key summary metrics for CSV/Excel export.
         """
-        rows: List[Dict[str, Any]] = []
-        for p in payloads:
-            timeline = p.get("interestOverTime_timelineData", []) or []
-            avg_value = 0
-            if timeline:
-                all_vals = [v for item in timeline for v in item.get("value", [])]
-                if all_vals:
-                    avg_value = sum(all_vals) / max(len(all_vals), 1)
-
-            top_query = next(iter(p.get("relatedQueries_top", [])), {})
-            rising_query = next(iter(p.get("relatedQueries_rising", [])), {})
-
-            rows.append(
-                {
-                    "input": p.get("inputUrlOrTerm", ""),
-                    "searchTerm": p.get("searchTerm", ""),
-                    "geo": (p.get("options") or {}).get("geo", ""),
-                    "timeframe": (p.get("options") or {}).get("timeframe", ""),
-                    "avgInterest": round(avg_value, 2),
-                    "topRelatedQuery": top_query.get("query", ""),
-                    "topRelatedQueryValue": top_query.get("value", ""),
-                    "risingRelatedQuery": rising_query.get("query", ""),
-                    "risingRelatedQueryValue": rising_query.get("value", ""),
-                }
-            )
-        return pd.DataFrame(rows)
+        return pd.DataFrame([TrendsClient.summary_row(p) for p in payloads])
+
+    @staticmethod
+    def iter_input_file(
+        path: str,
+        fmt: Optional[str] = None,
+        on_invalid: Optional[Callable[[str, ValueError], None]] = None,
+    ) -> Iterator[Tuple[str, TrendsOptions]]:
+        """
+        Stream (input, options) pairs from a batch input file (JSON, JSONL
+        or CSV; see modules.inputs.iter_records). Per-input options are
+        merged over the broadcast options key by key.
+
+        An input whose options do not validate (e.g. a non-numeric tz) is
+        passed to ``on_invalid`` and skipped, so the inputs after it are
+        still read; without ``on_invalid`` the error is raised. Only a
+        malformed file ends the stream.
+        """
+        for term, options in iter_records(path, fmt):
+            try:
+                opts = options_from_dict(options)
+            except (TypeError, ValueError) as e:
+                error = ValueError(f"Invalid options {options!r}: {e}")
+                if on_invalid is None:
+                    raise error from e
+                on_invalid(term, error)
+                continue
+            yield term, opts
 
     @staticmethod
-    def parse_input_file(path: str) -> List[Tuple[str, TrendsOptions]]:
+    def parse_input_file(path: str, fmt: Optional[str] = None) -> List[Tuple[str, TrendsOptions]]:
         """
         Parse a JSON file supporting either:
         - ["term1", "term2"]
         - [{"input": "term", "options": {...}}, ...]
         - {"inputs": [...], "options": {...}}  # broadcast options
+        (or a JSONL/CSV file) into a list; prefer iter_input_file for large batches.
         """
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        def opts_from_dict(d: Dict[str, Any]) -> TrendsOptions:
-            return TrendsOptions(
-                hl=d.get("hl", "en-US"),
-                tz=int(d.get("tz", 0)),
-                geo=d.get("geo", ""),
-                timeframe=d.get("timeframe", "today 12-m"),
-                gprop=d.get("gprop", ""),
-                category=int(d.get("category", 0)),
-                sleep=float(d.get("sleep", 1.0)),
-            )
+        return list(TrendsClient.iter_input_file(path, fmt))
+
+class _SectionFetcher:
+    """
+    Fetch sections of one payload on demand, building the payload on the
+    first cache miss and holding the leased session until closed.
+    """
+
+    def __init__(self, client: TrendsClient, kw_list: List[str], opts: TrendsOptions) -> None:
+        self.client = client
+        self.kw_list = kw_list
+        self.opts = opts
+        self.key = client.cache.key(kw_list, opts) if client.cache else ""
+        self._stack = ExitStack()
+        self._py: Optional[TrendReq] = None
 
-        results: List[Tuple[str, TrendsOptions]] = []
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, str):
-                    results.append((item, TrendsOptions()))
-                elif isinstance(item, dict):
-                    results.append((item.get("input", ""), opts_from_dict(item.get("options", {}))))
-        elif isinstance(data, dict):
-            broadcast = opts_from_dict(data.get("options", {}))
-            inputs = data.get("inputs", [])
-            if isinstance(inputs, list):
-                for it in inputs:
-                    if isinstance(it, str):
-                        results.append((it, broadcast))
-                    elif isinstance(it, dict):
-                        # merge specific options over broadcast
-                        specific = opts_from_dict(it.get("options", {}))
-                        merged = TrendsOptions(
-                            hl=specific.hl or broadcast.hl,
-                            tz=specific.tz if specific.tz is not None else broadcast.tz,
-                            geo=specific.geo or broadcast.geo,
-                            timeframe=specific.timeframe or broadcast.timeframe,
-                            gprop=specific.gprop or broadcast.gprop,
-                            category=specific.category or broadcast.category,
-                            sleep=specific.sleep or broadcast.sleep,
-                        )
-                        results.append((it.get("input", ""), merged))
+    def get(self, section: str) -> Any:
+        cached = self._cached(section)
+        if cached is not None:
+            return cached
+        return self._store(section, self._fetch_retrying(section))
+
+    def get_many(self, sections: Iterable[str], workers: int = 1) -> Dict[str, Any]:
+        """
+        Fetch several sections. With ``workers`` > 1 the payload is built
+        once and the section requests run concurrently on views of the same
+        session, so the wall time approaches the slowest section instead of
+        the sum. Each request still takes its token from the shared limiter.
+        """
+        sections = list(sections)
+        out: Dict[str, Any] = {}
+        missing: List[str] = []
+        for section in sections:
+            cached = self._cached(section)
+            if cached is None:
+                missing.append(section)
+            else:
+                out[section] = cached
+
+        if workers > 1 and len(missing) > 1:
+            throttled: Optional[BaseException] = None
+            try:
+                py = self._payload()
+            except THROTTLE_ERRORS as e:
+                self._release(e)
+                throttled = e
+            else:
+                with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+                    futures = {s: pool.submit(self.client._fetch_section, _section_view(py), s) for s in missing}
+                errors = {s: f.exception() for s, f in futures.items()}
+                for section, err in errors.items():
+                    if err is None:
+                        out[section] = self._store(section, futures[section].result())
+                    elif isinstance(err, THROTTLE_ERRORS):
+                        throttled = err
+                fatal = next((e for e in errors.values() if e is not None and not isinstance(e, THROTTLE_ERRORS)), None)
+                if fatal is not None:
+                    raise fatal
+                if throttled is not None:
+                    self._release(throttled)
+            if throttled is not None:
+                # the concurrent round counts as the first attempt
+                if self.client.throttle_retries < 1:
+                    raise throttled
+                missing = [s for s in missing if s not in out]
+                log.info(f"Throttled on {', '.join(missing)} for {', '.join(self.kw_list)}; retry 1.")
+                for section in missing:
+                    out[section] = self._store(section, self._fetch_retrying(section, attempt=1))
         else:
-            raise ValueError("Unsupported input file structure.")
-        return results
\ No newline at end of file
+            for section in missing:
+                out[section] = self._store(section, self._fetch_retrying(section))
+        return {section: out[section] for section in sections}
+
+    def _cached(self, section: str) -> Any:
+        cache = self.client.cache
+        if not cache:
+            return None
+        cached = cache.get(self.key, section)
+        METRICS.inc("trends_cache_lookups_total", result="miss" if cached is None else "hit")
+        if cached is not None and section in RELATED_SECTIONS:
+            # the key folds case, the stored term labels do not
+            return relabel_related(cached, self.kw_list)
+        return compact_section(section, cached)
+
+    def _store(self, section: str, data: Any) -> Any:
+        if self.client.cache:
+            self.client.cache.put(self.key, section, self.opts.timeframe, data)
+        return data
+
+    def _fetch_retrying(self, section: str, attempt: int = 0) -> Any:
+        while True:
+            try:
+                return self._fetch(section)
+            except THROTTLE_ERRORS as e:
+                # hand the throttled session back so the pool recycles it
+                self._release(e)
+                if attempt >= self.client.throttle_retries:
+                    raise
+                attempt += 1
+                log.info(f"Throttled on {section} for {', '.join(self.kw_list)}; retry {attempt}.")
+
+    def _payload(self) -> TrendReq:
+        if self._py is None:
+            py = self._stack.enter_context(
+                self.client.pool.lease(self.opts.hl, self.opts.tz, self.client.proxy, throttle=self.client._throttle)
+            )
+            self.client._build(py, self.kw_list, self.opts)
+            self._py = py
+        return self._py
+
+    def _fetch(self, section: str) -> Any:
+        return self.client._fetch_section(self._payload(), section)
+
+    def _release(self, error: BaseException) -> None:
+        self._py = None
+        stack, self._stack = self._stack, ExitStack()
+        try:
+            stack.__exit__(type(error), error, error.__traceback__)
+        except THROTTLE_ERRORS:
+            pass
+
+    def close(self) -> None:
+        self._py = None
+        self._stack.close()
+
+def _section_view(py: TrendReq) -> TrendReq:
+    """
+    Copy of a built TrendReq for one concurrent section request. It shares
+    the session and tokens; the region widget is copied because
+    interest_by_region() writes the resolution into it.
+    """
+    view = copy.copy(py)
+    view.interest_by_region_widget = copy.deepcopy(py.interest_by_region_widget)
+    return view
+
+class TrendsResult(Mapping):
+    """
+    Read-only payload whose sections are fetched on first access.
+
+    Header keys (inputUrlOrTerm, searchTerm, options) are available at once;
+    reading e.g. ``result["interestByCity"]`` triggers only the city request.
+    The leased session is returned to the pool once every selected section
+    has been fetched, or on close().
+    """
+
+    def __init__(
+        self,
+        client: TrendsClient,
+        input_url_or_term: str,
+        kw_list: List[str],
+        opts: TrendsOptions,
+        sections: Tuple[str, ...],
+    ) -> None:
+        self._header = TrendsClient._header(input_url_or_term, kw_list, opts)
+        self._sections = sections
+        self._owner = {key: s for s in sections for key in SECTION_KEYS[s]}
+        self._fields: Dict[str, Any] = {}
+        self._done: set = set()
+        self._fetcher = _SectionFetcher(client, kw_list, opts)
+        self._lock = threading.Lock()
+
+    def _load(self, section: str) -> None:
+        with self._lock:
+            if section in self._done:
+                return
+            try:
+                value = self._fetcher.get(section)
+            except Exception:
+                self.close()
+                raise
+            self._fields.update(TrendsClient._section_fields(section, value))
+            self._done.add(section)
+            if len(self._done) == len(self._sections):
+                self._fetcher.close()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._header:
+            return self._header[key]
+        section = self._owner.get(key)
+        if section is None:
+            raise KeyError(key)
+        self._load(section)
+        return self._fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._header
+        for section in self._sections:
+            yield from SECTION_KEYS[section]
+
+    def __len__(self) -> int:
+        return len(self._header) + len(self._owner)
+
+    @property
+    def loaded_sections(self) -> Tuple[str, ...]:
+        return tuple(s for s in self._sections if s in self._done)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+    def close(self) -> None:
+        self._fetcher.close()
@@ -0,0 +1,15 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+# Settings used when no --config is given.
+DEFAULT_SETTINGS = Path(__file__).resolve().parents[1] / "config" / "settings.json"
+
+def load_settings(config_path: Path = DEFAULT_SETTINGS) -> Dict[str, Any]:
+    """
+    Read a JSON settings file; a missing file means all defaults.
+    """
+    if config_path.exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import bisect
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict[str, Any]) -> LabelSet:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels: LabelSet, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate of the ``q`` quantile, interpolated linearly inside its
+        bucket like Prometheus' histogram_quantile() (capped at the max seen).
+        """
+        if not self.count:
+            return 0.0
+        rank, seen, lower = q * self.count, 0, 0.0
+        for bound, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                return round(min(lower + (bound - lower) * (rank - seen) / n, self.max), 6)
+            seen += n
+            lower = bound
+        return round(self.max, 6)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+        }
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms for one run, keyed by metric name
+    and label set. Exposed as a Prometheus textfile and a JSON report.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self.started = time.time()
+
+    def describe(self, name: str, text: str) -> None:
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+        self.started = time.time()
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets, hist.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Any]:
+        def label_str(labels: LabelSet) -> str:
+            return ",".join(f"{k}={v}" for k, v in labels) or "total"
+
+        with self._lock:
+            return {
+                "counters": {
+                    name: {label_str(k): v for k, v in sorted(series.items())}
+                    for name, series in sorted(self._counters.items())
+                },
+                "histograms": {
+                    name: {label_str(k): h.to_dict() for k, h in sorted(series.items())}
+                    for name, series in sorted(self._histograms.items())
+                },
+            }
+
+    def write_textfile(self, path: str | Path) -> Path:
+        """
+        Write the Prometheus text exposition atomically (node_exporter's
+        textfile collector may read it at any time).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+    def write_report(self, path: str | Path, extra: Optional[Dict[str, Any]] = None) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            **(extra or {}),
+            **self.to_dict(),
+        }
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+# Process-wide registry used by the instrumented modules.
+METRICS = MetricsRegistry()
+METRICS.describe("trends_section_seconds", "Wall time per fetched section, including backend calls and conversion.")
+METRICS.describe("trends_handshake_seconds", "Cookie handshake time of new sessions.")
+METRICS.describe("trends_http_request_seconds", "Latency of individual HTTP requests to Google Trends.")
+METRICS.describe("trends_http_responses_total", "HTTP responses by status code, including retried attempts.")
+METRICS.describe("trends_http_retries_total", "HTTP attempts retried by the session's Retry policy.")
+METRICS.describe("trends_http_bytes_received_total", "Response body bytes received.")
+METRICS.describe("trends_conversion_seconds", "DataFrame to output-schema conversion time.")
+METRICS.describe("trends_export_seconds", "Time spent writing each export format.")
+METRICS.describe("trends_throttle_wait_seconds_total", "Time spent waiting on the shared rate limiter.")
+METRICS.describe("trends_cache_lookups_total", "Response cache lookups by result.")
+METRICS.describe("trends_inputs_total", "Batch inputs by outcome.")
+METRICS.describe("trends_input_seconds", "Wall time to fetch one batch input (a packed request counts for each member).")
+
+def timed(name: str, **labels: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator recording the call time of a function into histogram ``name``.
+    """
+
+    def wrap(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            with METRICS.timer(name, **labels):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+class ProfileCollector:
+    """
+    Aggregates cProfile stats over many calls of the hot path. Only one
+    profiler can be active per process, so profiled calls must not overlap
+    (run with a single worker).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                with self._lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(prof)
+                    else:
+                        self._stats.add(prof)
+
+        return inner
+
+    def dump(self, path: str | Path, top: int = 40) -> Optional[Path]:
+        """
+        Write the raw stats (for snakeviz/pstats) to ``path`` and a text
+        summary sorted by cumulative time next to it.
+        """
+        if self._stats is None:
+            return None
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._stats.dump_stats(str(path))
+        buf = io.StringIO()
+        pstats.Stats(str(path), stream=buf).sort_stats("cumulative").print_stats(top)
+        path.with_name(path.name + ".txt").write_text(buf.getvalue(), encoding="utf-8")
+        return path
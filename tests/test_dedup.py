@@ -0,0 +1,94 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modules.compact import TimelineArray
+from modules.dedup import RequestKey, SingleFlight, reorder_sections
+
+def _timeline(rows):
+    return [{"time": str(i), "value": list(v), "formattedValue": [str(x) for x in v]} for i, v in enumerate(rows)]
+
+def test_request_key_folds_spelling():
+    opts = SimpleNamespace(hl="en-US", tz=360, geo="us", timeframe="today  12-m", gprop="", category=0)
+    assert RequestKey.of(["Python", " java "], opts) == RequestKey.of(["java", "python"], opts)
+    assert RequestKey.of(["python"], opts) != RequestKey.of(["python"], opts, sections=("timeline",))
+
+def test_single_flight_keeps_results():
+    flights = SingleFlight(keep=1)
+    calls = []
+
+    def fetch(v):
+        return lambda: calls.append(v) or v
+
+    assert flights.do("a", fetch(1)) == (1, False)
+    assert flights.do("a", fetch(2)) == (1, True)
+    assert flights.do("b", fetch(3)) == (3, False)
+    # "a" was evicted by "b"
+    assert flights.do("a", fetch(4)) == (4, False)
+    assert calls == [1, 3, 4]
+    assert flights.stats() == {"requests": 4, "fetched": 3, "saved": 1}
+
+def test_single_flight_without_keep_only_collapses_calls_in_flight():
+    flights = SingleFlight(keep=0)
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "x"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    follower.start()
+    # the follower waits on the leader's call instead of starting its own
+    deadline = time.monotonic() + 5
+    while flights.requests < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert sorted(results) == [("x", False), ("x", True)]
+    assert flights.do("k", lambda: "y") == ("y", False)
+    assert len(calls) == 1
+
+def test_single_flight_errors_are_not_kept():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("k", fail)
+    assert flights.do("k", lambda: 1) == (1, False)
+
+def test_reorder_sections_permutes_columns():
+    rows = [(1, 2, 3), (4, 5, 6)]
+    data = {"timeline": _timeline(rows), "subregion": TimelineArray.from_list(_timeline(rows)), "tags": ["t"]}
+    out = reorder_sections(data, ["a", "b", "c"], ["C", "a", "b"])
+    assert [it["value"] for it in out["timeline"]] == [[3, 1, 2], [6, 4, 5]]
+    assert [it["formattedValue"] for it in out["timeline"]] == [["3", "1", "2"], ["6", "4", "5"]]
+    assert out["subregion"].values.tolist() == [[3, 1, 2], [6, 4, 5]]
+    assert out["tags"] == ["t"]
+
+def test_reorder_sections_relabels_related_terms():
+    data = {
+        "timeline": _timeline([(1, 2)]),
+        "related_queries": {
+            "top": [{"term": "python", "query": "x"}, {"term": "java", "query": "y"}],
+            "rising": [],
+        },
+    }
+    out = reorder_sections(data, ["python", "java"], ["Python", "java"])
+    # same order: value columns are passed through, related terms still take the caller's spelling
+    assert out["timeline"] is data["timeline"]
+    assert [it["term"] for it in out["related_queries"]["top"]] == ["Python", "java"]
+    assert out["related_queries"]["top"][1] is data["related_queries"]["top"][1]
+    assert data["related_queries"]["top"][0]["term"] == "python"
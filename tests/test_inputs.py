@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+
+from modules.inputs import _JSONStream, iter_records
+from modules.trends_parser import TrendsClient
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+def test_json_stream_across_chunk_boundaries():
+    doc = {"options": {"geo": "US"}, "skip": {"a": [1, 2, {"b": "}]"}]}, "inputs": ["x" * 50, 1.5e3, {"input": "y"}]}
+    stream = _JSONStream(io.StringIO(json.dumps(doc)), chunk_size=7)
+    seen = {}
+    for key in stream.members():
+        seen[key] = list(stream.array()) if key == "inputs" else stream.value()
+    assert seen == doc
+
+def test_json_stream_numbers_split_by_chunks():
+    stream = _JSONStream(io.StringIO("[1.25e2, -30, 7]"), chunk_size=3)
+    assert list(stream.array()) == [125.0, -30, 7]
+
+def test_json_stream_rejects_bad_structure():
+    stream = _JSONStream(io.StringIO('[1, 2 3]'))
+    with pytest.raises(ValueError):
+        list(stream.array())
+
+def test_json_records_options_after_inputs(tmp_path):
+    path = _write(tmp_path, "in.json", json.dumps({"inputs": ["a", {"input": "b", "options": {"tz": 60}}], "options": {"geo": "US"}}))
+    assert list(iter_records(path)) == [("a", {"geo": "US"}), ("b", {"geo": "US", "tz": 60})]
+
+def test_jsonl_records_broadcast_and_bad_lines(tmp_path):
+    lines = ['"a"', '{"options": {"geo": "US"}}', "{not json", '{"input": "b", "options": {"geo": "DE"}}', "", '"c"']
+    path = _write(tmp_path, "in.jsonl", "\n".join(lines) + "\n")
+    assert list(iter_records(path)) == [("a", {}), ("b", {"geo": "DE"}), ("c", {"geo": "US"})]
+
+def test_csv_records_broadcast_rows_and_empty_cells(tmp_path):
+    path = _write(tmp_path, "in.csv", "Keyword,geo,tz\n,US,60\na,,\nb,DE,\n")
+    assert list(iter_records(path)) == [("a", {"geo": "US", "tz": "60"}), ("b", {"geo": "DE", "tz": "60"})]
+
+def test_csv_records_need_an_input_column(tmp_path):
+    path = _write(tmp_path, "in.csv", "name,geo\na,US\n")
+    with pytest.raises(ValueError):
+        list(iter_records(path))
+
+def test_invalid_options_fail_one_input(tmp_path):
+    path = _write(tmp_path, "in.csv", "input,tz\na,60\nb,abc\nc,\n")
+    rejected = []
+    items = list(TrendsClient.iter_input_file(str(path), on_invalid=lambda term, e: rejected.append(term)))
+    assert [(term, opts.tz) for term, opts in items] == [("a", 60), ("c", 0)]
+    assert rejected == ["b"]
+    with pytest.raises(ValueError):
+        TrendsClient.parse_input_file(str(path))
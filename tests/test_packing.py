@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from modules.compact import TimelineArray
+from modules.packing import plan_packs, rescale_to_anchor, split_sections
+
+def _opts(**kw):
+    base = dict(hl="en-US", tz=360, geo="", timeframe="today 12-m", gprop="", category=0)
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+def _resolve(raw, opts):
+    if not raw:
+        raise ValueError("empty input")
+    return [t.strip() for t in raw.split(",")], opts
+
+def _timeline(rows):
+    return [{"time": str(i), "value": list(v), "formattedValue": [str(x) for x in v]} for i, v in enumerate(rows)]
+
+def test_plan_packs_groups_by_options_and_capacity():
+    opts, other = _opts(), _opts(geo="US")
+    items = [(f"t{i}", opts) for i in range(6)] + [("u", other), ("a, b", opts), ("", opts)]
+    groups = plan_packs(items, _resolve)
+    assert [g.kw_list for g in groups] == [
+        ["t0", "t1", "t2", "t3", "t4"],
+        ["t5"],
+        ["u"],
+        ["a", "b"],
+        [],
+    ]
+    assert [g.packed for g in groups] == [True, False, False, False, False]
+
+def test_plan_packs_anchor_and_aliases():
+    opts = _opts()
+    items = [("a", opts), ("b", opts), ("A", opts), ("c", opts), ("d", opts), ("e", opts), ("ref", opts)]
+    groups = plan_packs(items, _resolve, anchor="ref")
+    # four members plus the anchor fill a payload; the duplicate joins as an alias
+    assert groups[0].kw_list == ["a", "b", "c", "d", "ref"]
+    alias = groups[0].members[2]
+    assert alias.alias and groups[0].position(alias) == 0
+    # a lone keyword drops the anchor, and the anchor itself is fetched on its own
+    assert groups[1].kw_list == ["e"] and not groups[1].anchor
+    assert groups[2].kw_list == ["ref"]
+
+def test_split_sections_list_and_compact():
+    kw_list = ["a", "b", "ref"]
+    rows = [(10, 20, 30), (40, 50, 60)]
+    data = {
+        "timeline": _timeline(rows),
+        "subregion": TimelineArray.from_list(_timeline(rows)),
+        "related_queries": {
+            "top": [{"term": "a", "query": "x"}, {"term": "B", "query": "y"}],
+            "rising": [{"term": "b", "query": "z"}],
+        },
+    }
+    part = split_sections(data, kw_list, 1)
+    assert [it["value"] for it in part["timeline"]] == [[20], [50]]
+    assert [it["formattedValue"] for it in part["timeline"]] == [["20"], ["50"]]
+    assert part["subregion"].values.tolist() == [[20], [50]]
+    assert part["related_queries"] == {
+        "top": [{"term": "B", "query": "y"}],
+        "rising": [{"term": "b", "query": "z"}],
+    }
+
+def test_rescale_to_anchor_list_and_compact_agree():
+    rows = [(10, 25, 50), (30, 5, 40), (0, 0, 0)]
+    scaled = rescale_to_anchor(_timeline(rows), 2)
+    assert [it["value"] for it in scaled] == [[20, 50, 100], [60, 10, 80], [0, 0, 0]]
+    assert scaled[0]["formattedValue"] == ["20", "50", "100"]
+    compact = rescale_to_anchor(TimelineArray.from_list(_timeline(rows)), 2)
+    assert compact.values.tolist() == [it["value"] for it in scaled]
+
+def test_rescale_to_anchor_without_anchor_signal():
+    rows = [(10, 0), (20, 0)]
+    timeline = _timeline(rows)
+    assert rescale_to_anchor(timeline, 1) is timeline
+    assert rescale_to_anchor(timeline, 5) is timeline
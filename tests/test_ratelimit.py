@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+from modules.ratelimit import AdaptiveRateLimiter, TokenBucket
+
+def _acquire_within(limiter: TokenBucket, tokens: float, timeout: float = 5.0) -> float:
+    # run in a thread so a limiter that never grants the tokens fails the test instead of hanging it
+    result = []
+    t = threading.Thread(target=lambda: result.append(limiter.acquire(tokens)), daemon=True)
+    t.start()
+    t.join(timeout)
+    assert result, f"acquire({tokens}) did not return within {timeout}s"
+    return result[0]
+
+@pytest.mark.parametrize("cls", [TokenBucket, AdaptiveRateLimiter])
+def test_acquire_more_tokens_than_burst(cls):
+    # related sections take one token per widget, which can exceed a burst of 1
+    limiter = cls(rate=10.0, burst=1)
+    waited = _acquire_within(limiter, 3)
+    assert 0.15 <= waited < 1.0
+
+def test_acquire_within_burst_does_not_wait():
+    bucket = TokenBucket(rate=1.0, burst=5)
+    assert _acquire_within(bucket, 5) == 0.0
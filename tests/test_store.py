@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from modules.store import TrendStore
+
+OPTIONS = {"hl": "en-US", "tz": 360, "geo": "", "timeframe": "today 12-m", "gprop": "", "category": 0}
+
+def _payload(search_term, values, **extra):
+    # values: one list per timeline point, one column per term of search_term
+    return {
+        "inputUrlOrTerm": search_term,
+        "searchTerm": search_term,
+        "options": dict(OPTIONS),
+        "interestOverTime_timelineData": [
+            {"time": str(1000 + i), "value": list(v), "formattedValue": [str(x) for x in v]} for i, v in enumerate(values)
+        ],
+        "relatedQueries_top": [{"term": search_term.split(",")[0], "query": "q", "value": 100, "formattedValue": "100"}],
+        **extra,
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    with TrendStore(tmp_path / "trends.db") as s:
+        yield s
+
+def _values(store, **filters):
+    return [(r["mode"], r["comparison"], r["timestamp"], r["value"]) for r in store.timeline("python", **filters)]
+
+def test_upsert_keeps_the_latest_fetch(store):
+    store.write(_payload("python", [[10], [20]]), fetched_at=100)
+    store.write(_payload("python", [[11], [21]]), fetched_at=200)
+    # an older fetch does not overwrite a newer one
+    store.write(_payload("python", [[99], [99]]), fetched_at=150)
+    assert _values(store) == [("plain", "python", 1000, 11), ("plain", "python", 1001, 21)]
+    assert store.stats() == {"timeline": 2, "regions": 0, "related": 1}
+
+def test_packed_write_leaves_single_term_rows_untouched(store):
+    store.write(_payload("python", [[50], [100]]), fetched_at=100)
+    packed = _payload("python", [[5], [10]], fetchMode="packed", packedSearchTerm="python, java, anchor")
+    store.write(packed, fetched_at=200)
+    assert _values(store, comparison="python") == [("plain", "python", 1000, 50), ("plain", "python", 1001, 100)]
+    assert _values(store, mode="packed") == [
+        ("packed", "python, java, anchor", 1000, 5),
+        ("packed", "python, java, anchor", 1001, 10),
+    ]
+    assert {(r["mode"], r["comparison"]) for r in store.related("python")} == {
+        ("plain", "python"),
+        ("packed", "python, java, anchor"),
+    }
+
+def test_fetch_modes_are_kept_apart(store):
+    for fetched_at, mode in enumerate((None, "long_range", "incremental"), 1):
+        extra = {"fetchMode": mode} if mode else {}
+        store.write(_payload("python", [[fetched_at]], **extra), fetched_at=fetched_at)
+    assert sorted(_values(store)) == [
+        ("incremental", "python", 1000, 3),
+        ("long_range", "python", 1000, 2),
+        ("plain", "python", 1000, 1),
+    ]
+
+def test_comparison_scales_are_kept_apart(store):
+    store.write(_payload("python, java", [[40, 80]]), fetched_at=100)
+    store.write(_payload("python", [[100]]), fetched_at=100)
+    assert _values(store) == [("plain", "python", 1000, 100), ("plain", "python, java", 1000, 40)]
+    assert [r["value"] for r in store.timeline("java")] == [80]
+
+def test_readonly_store(tmp_path):
+    path = tmp_path / "trends.db"
+    with TrendStore(path) as s:
+        s.write(_payload("python", [[1]]), fetched_at=100)
+    with TrendStore(path, readonly=True) as ro:
+        assert len(ro.timeline("python")) == 1
+        with pytest.raises(sqlite3.OperationalError):
+            ro.write(_payload("python", [[2]]), fetched_at=200)